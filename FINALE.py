@@ -8,30 +8,61 @@ ADVANCED LITE++ PLAGIARISM DETECTOR
 - Professional forensic analysis dashboard
 """
 
-import matplotlib
-matplotlib.use("Agg")
+import time
+STARTUP_T0 = time.perf_counter()  # Reported once the window is on screen
 import os
 import re
 import json
-import time
 import hashlib
+import sqlite3
+import zlib
+import gzip
 import requests
-import PyPDF2
-import docx
-import matplotlib.pyplot as plt
+import importlib.util
 import numpy as np
 from datetime import datetime
-from collections import Counter
-from bs4 import BeautifulSoup
+from collections import Counter, OrderedDict
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 import random
 import math
+import gc
 import sys
-from PIL import Image, ImageTk, ImageDraw
-import matplotlib.colors as mcolors
-from mpl_toolkits.mplot3d import Axes3D
+import argparse
+import itertools
+import bisect
+import shutil
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, parse_qsl, urlencode, unquote
+from email.utils import parsedate_to_datetime
+
+EMBEDDING_MODEL_NAME = "all-mpnet-base-v2"  # Reference model; other backends are checked against it
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+# Backend name -> (runtime, model). torch-int8 quantizes Linear layers dynamically,
+# onnx needs sentence-transformers[onnx]; the MiniLM options are the distilled model.
+EMBEDDING_BACKENDS = {
+    "torch": ("torch", EMBEDDING_MODEL_NAME),
+    "torch-int8": ("int8", EMBEDDING_MODEL_NAME),
+    "onnx": ("onnx", EMBEDDING_MODEL_NAME),
+    "minilm": ("torch", "all-MiniLM-L6-v2"),
+    "minilm-int8": ("int8", "all-MiniLM-L6-v2"),
+}
+# Long-text similarity: both sides split into overlapping chunks sized to the model's token limit
+CHUNK_TOKENS = 200
+CHUNK_OVERLAP = 0.25
+CHUNK_MAX = 128  # Chunks kept per side (evenly spaced) so encode cost stays bounded
+EMBEDDING_DTYPE = np.float16  # Stored chunk embeddings; half the memory of float32, cosine error ~1e-3
+TOKENS_PER_WORD = 1.3  # Estimate when no tokenizer is loaded
+LONG_SIMILARITY_AGGREGATE = "max"  # "max" best chunk pair, "alignment" mean best match over the shorter side
+LONG_MATCH_THRESHOLD = 0.5  # Chunk pairs reported as matched passages
+LONG_MATCH_PAIRS = 5
 
 # Optional modules
 try:
@@ -40,36 +71,842 @@ try:
 except:
     DUCKSEARCH = False
 
-try:
-    from sentence_transformers import SentenceTransformer, util
-    SEMANTIC_MODEL = SentenceTransformer("all-mpnet-base-v2")
-    EMBEDS = True
-except:
-    EMBEDS = False
-
-try:
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    from sklearn.metrics.pairwise import cosine_similarity
-    VECTORIZER = TfidfVectorizer(max_features=5000)
-    TFIDF = True
-except:
-    TFIDF = False
-
-# New imports for forensic features
-try:
-    import nltk
-    from nltk import pos_tag
-    from nltk.tokenize import sent_tokenize, word_tokenize
-    from nltk.corpus import stopwords
-    NLTK_AVAILABLE = True
-except:
-    NLTK_AVAILABLE = False
-
-SCAN_TIMEOUT = 45  # Increased timeout for better web scraping
+# Model packages are only located here; ModelRegistry imports and loads them on first use
+EMBEDS = importlib.util.find_spec("sentence_transformers") is not None
+TFIDF = importlib.util.find_spec("sklearn") is not None
+PSUTIL = importlib.util.find_spec("psutil") is not None
+
+# Memory guardrails: above the soft share of the ceiling caches are dropped; at the ceiling
+# scanning stops and the heavier steps are skipped rather than risk being OOM-killed
+MEMORY_CEILING_MB = int(os.environ.get("MEMORY_CEILING_MB", 2048))
+MEMORY_SOFT_RATIO = 0.8
+STYLE_WINDOW_CHARS = 200_000  # Stylometry reads the text in windows of this size
+PDF_CHECK_PAGES = 25  # Memory is checked every this many extracted PDF pages
+
+# Forensic features use NLTK when it and its data are present (see TextTools)
+NLTK_AVAILABLE = importlib.util.find_spec("nltk") is not None
+NLTK_DATA_DIR = os.environ.get("NLTK_BUNDLE_DIR", "nltk_data")  # Local bundle, searched before NLTK's defaults
+NLTK_DOWNLOAD = os.environ.get("NLTK_DOWNLOAD", "").lower() in ("1", "true", "yes")  # Fetch missing resources into NLTK_DATA_DIR; off for air-gapped nodes
+# Each resource: (download name, data paths tried in order; newer NLTK releases renamed them)
+NLTK_RESOURCES = {
+    "punkt": [("punkt_tab", "tokenizers/punkt_tab/english/"), ("punkt", "tokenizers/punkt")],
+    "tagger": [("averaged_perceptron_tagger_eng", "taggers/averaged_perceptron_tagger_eng/"),
+               ("averaged_perceptron_tagger", "taggers/averaged_perceptron_tagger")],
+}
+
+# Prefer the C-backed lxml parser for fetched pages when it is installed
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+SCAN_BUDGET = 90  # Seconds of source scanning per document, shared by every source
+SCAN_BUDGET_WORKERS = 16  # Threads running budgeted requests, so a slow one can be abandoned
+SCAN_MIN_REQUEST = 1.0  # Don't start a request with less budget than this left
+# Stop scanning once the best match is this close and this share of the text is covered; None scans everything
+STOP_POLICY = {"top_similarity": 0.9, "coverage": 0.5, "segment_similarity": 0.6}
+SCAN_CONCURRENCY = 4  # Scanner tasks in flight at once per document (each scanner also caps its own)
+SCANNERS_ENABLED = None  # Names of the registered scanners to run; None runs them all
+SCAN_CACHE_SIZE = 4096  # Raw search results kept per process, keyed by (scanner, query)
+SCAN_CACHE_TTL = 3600
 CROSSREF_ROWS = 5
 SEMANTIC_SCHOLAR_LIMIT = 5
 DOI_REGEX = re.compile(r'\b10\.\d{4,9}/\S+\b', flags=re.IGNORECASE)
 
+# Web page fetching limits
+PAGE_MAX_BYTES = 2 * 1024 * 1024  # Stop reading a page body after 2 MB
+PAGE_CHUNK_BYTES = 64 * 1024
+PAGE_TIMEOUT = 25
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+CONTENT_HINT_REGEX = re.compile(r'content|main|post|article|story|body|entry', flags=re.IGNORECASE)
+
+# Outbound query planning (each scanner declares how many queries it takes per document)
+QUERY_MAX_WORDS = 12
+QUERY_MERGE_OVERLAP = 0.3  # Key-phrase overlap needed to fold segments into one query
+QUERY_GROUP_SIZE = 3
+KEYPHRASE_NGRAMS = (1, 3)
+# GUI animation
+ANIMATION_FRAME_MS = 33  # One scheduler tick drives every effect
+ANIMATION_FRAME_BUDGET_MS = 12  # Effects lose detail when frames keep running over this
+LOW_POWER_MODE = None  # None detects remote desktop sessions; True/False forces it
+PARTICLE_COUNT = 200
+CYBER_PULSE_POOL = 24  # Most pulse rings visible at once
+RADAR_PULSE_POOL = 4
+DEBUG_OVERLAY = False  # Live canvas item counts; toggle with F12
+
+# GUI update channel
+UI_FRAME_MS = 50  # Detector messages are applied to widgets at most 20 times a second
+UI_MAX_LOG_LINES = 5000  # Oldest console lines are dropped beyond this
+UI_STARTUP_DELAY_MS = 50  # Effects and model warm-up start this long after the first paint
+
+# Chart rendering: on-screen previews are cheap, full resolution only on export
+CHART_PREVIEW_DPI = 100
+CHART_EXPORT_DPI = 300
+
+# Report output: "json" writes the full indented report, "jsonl" streams the compact format
+REPORT_FORMAT = os.environ.get("REPORT_FORMAT", "json")
+REPORT_DOCUMENT_DIR = "report_documents"  # Submitted texts, stored once by SHA-256 next to the compact reports
+COMPACT_SNIPPET_CHARS = 200
+
+# DOI metadata resolved in bulk after each scan and cached locally
+DOI_CACHE_PATH = "doi_cache.sqlite3"
+DOI_CACHE_TTL = 30 * 24 * 3600
+DOI_NEGATIVE_TTL = 24 * 3600  # DOIs neither service knew are asked about again after a day
+DOI_CROSSREF_BATCH = 20  # DOIs per CrossRef filter query
+DOI_S2_BATCH = 100  # DOIs per Semantic Scholar batch request (the API takes up to 500)
+DOI_BUDGET = 15  # Seconds for resolving one document's DOIs
+
+# Merging duplicate hits on one source (clean_results)
+DEDUP_SHINGLE_WORDS = 3
+DEDUP_MIN_SHINGLES = 8  # Shorter snippets (titles, fragments) are merged by DOI/URL only
+DEDUP_MINHASH_PERMS = 64
+DEDUP_LSH_BANDS = 16  # 16 bands of 4 rows: snippets at 0.8 Jaccard share a band 99.9% of the time
+DEDUP_JACCARD = 0.8  # Estimated shingle overlap needed to merge two hits
+DEDUP_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref|ref_src)$")
+
+# Local store of fetched pages
+PAGE_STORE_PATH = "page_store.sqlite3"
+PAGE_STORE_TTL = 7 * 24 * 3600  # Refetch pages older than a week
+PAGE_STORE_MAX_BYTES = 256 * 1024 * 1024  # Least recently used pages are evicted beyond this
+PAGE_STORE_NEGATIVE_TTL = 24 * 3600  # URLs that had no usable content are tried again after a day
+PAGE_STORE_SWEEP_EVERY = 500  # Writes between sweeps of expired URLs (and a recount of the store size)
+
+# Service mode (--serve): local HTTP/JSON API around warm detectors
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_WORKERS = 2  # Documents analysed at the same time
+SERVICE_UPLOAD_DIR = "service_uploads"
+SERVICE_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+SERVICE_KEEP_JOBS = 200  # Finished jobs (and their uploads) kept for polling
+SERVICE_KEEPALIVE = 15  # Seconds between SSE keep-alive comments
+
+# Passage alignment (seed-and-extend over shared word k-grams)
+ALIGN_SEED_WORDS = 5
+ALIGN_GAP_WORDS = 12  # Seeds this close on both sides belong to one passage despite small edits
+ALIGN_MAX_SHIFT = 3  # Words inserted or deleted between chained seeds
+ALIGN_MIN_WORDS = 8
+ALIGN_MAX_OCCURRENCES = 8  # Seeds repeated more often in the source are too common to anchor on
+
+# Durable scan jobs (--batch / --resume, and GUI scans of the same file)
+JOB_STORE_PATH = "scan_jobs.sqlite3"
+JOB_LEASE = 900  # A running job with no checkpoint for this long is treated as stuck
+JOB_MAX_ATTEMPTS = 4
+JOB_RETRY_BASE = 30  # Backoff doubles from here after each failed attempt
+JOB_RETRY_MAX = 1800
+BATCH_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+# Cohort mode (--cohort): every submission against every other
+COHORT_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Extraction and fingerprinting processes
+COHORT_MAX_DOC_FREQ = 0.05  # Fingerprints shared by more of the cohort are boilerplate (prompt, template)
+COHORT_MIN_DOC_FREQ_CAP = 10  # ...but never fewer submissions than this, so a small copying ring still pairs up
+COHORT_MIN_SHARED = 3  # Shared fingerprints needed to verify a pair
+COHORT_SEMANTIC_NEIGHBOURS = 5  # Nearest neighbours by embedding also checked, for paraphrase
+COHORT_SEMANTIC_THRESHOLD = 0.85
+COHORT_EMBED_PASSAGES = 8  # Passages averaged into one document embedding
+COHORT_PASSAGE_GAP = 200  # Shared fingerprints closer than this many characters form one passage
+COHORT_CLUSTER_THRESHOLD = 0.1  # Pair score needed to join two submissions into a cluster
+
+# Winnowed word k-gram fingerprints
+FINGERPRINT_K = 5
+FINGERPRINT_WINDOW = 4
+FINGERPRINT_DTYPE = np.dtype([("hash", np.uint32), ("offset", np.uint32)])  # 8 bytes per fingerprint
+WINDOW_HASH_DTYPE = np.dtype([("digest", np.uint8, (16,)), ("start", np.uint32), ("end", np.uint32)])
+
+# Per-source request limits shared by every scan in the process: (requests per second, burst).
+# Scanners declare their own; entries here override them.
+SOURCE_RATE_LIMITS = {}
+RATE_LIMIT_MAX_WAIT = 10  # Give up on a request rather than queue longer than this
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN = 30
+BREAKER_MAX_COOLDOWN = 600
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how however i if in into is it its itself just may me might more
+most must my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those through
+thus to too under until up upon very was we were what when where which while who whom why will with
+within without would you your yours yourself yourselves et al
+""".split())
+
+# ---------------- MODEL LOADING ----------------
+# Bundled paraphrase check set: (sentence a, sentence b, is paraphrase)
+PARAPHRASE_CHECK_SET = [
+    ("The committee approved the new budget on Monday.", "On Monday the new budget was approved by the committee.", 1),
+    ("Global temperatures have risen sharply over the last century.", "Over the past hundred years the planet has warmed considerably.", 1),
+    ("The drug reduced symptoms in most patients.", "Most patients saw their symptoms ease after taking the medication.", 1),
+    ("Students must submit their essays before the deadline.", "Essays have to be handed in by students ahead of the due date.", 1),
+    ("The company reported record profits this quarter.", "This quarter the firm posted its highest earnings ever.", 1),
+    ("Photosynthesis converts light energy into chemical energy.", "Plants turn sunlight into chemical energy through photosynthesis.", 1),
+    ("The bridge was closed because of structural damage.", "Structural problems forced the bridge to shut.", 1),
+    ("Researchers collected samples from twelve rivers.", "Samples were gathered by the scientists from a dozen rivers.", 1),
+    ("The algorithm sorts the list in linear time.", "The committee approved the new budget on Monday.", 0),
+    ("Global temperatures have risen sharply over the last century.", "The museum opens at nine on weekdays.", 0),
+    ("The drug reduced symptoms in most patients.", "The drug was too expensive for most hospitals to stock.", 0),
+    ("Students must submit their essays before the deadline.", "Teachers graded the essays over the weekend.", 0),
+    ("The company reported record profits this quarter.", "The company moved its headquarters to Berlin.", 0),
+    ("Photosynthesis converts light energy into chemical energy.", "Cellular respiration releases energy stored in glucose.", 0),
+    ("The bridge was closed because of structural damage.", "A new bridge design won an engineering award.", 0),
+    ("Researchers collected samples from twelve rivers.", "The river flooded the town twice last year.", 0),
+]
+
+class EmbeddingBackend:
+    """One way of running a sentence embedding model on the CPU.
+
+    encode() always returns float32 numpy arrays, whichever runtime is behind
+    it, and adds its wall time to per-thread counters so each scan can report
+    how long it spent encoding.
+    """
+    def __init__(self, name=EMBEDDING_BACKEND):
+        self.name = name
+        self.runtime, self.model_name = EMBEDDING_BACKENDS[name]
+        self.local = threading.local()
+        self.model = self.load()
+
+    def load(self):
+        from sentence_transformers import SentenceTransformer
+        if self.runtime == "onnx":
+            return SentenceTransformer(self.model_name, device="cpu", backend="onnx")
+        model = SentenceTransformer(self.model_name, device="cpu")
+        if self.runtime == "int8":
+            import torch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    @property
+    def id(self):
+        return f"{self.name}:{self.model_name}"
+
+    @property
+    def max_tokens(self):
+        return getattr(self.model, "max_seq_length", None) or 256
+
+    def tokens_per_word(self, text):
+        """Tokenizer pieces per whitespace word, measured on the start of text"""
+        sample = text[:2000]
+        words = len(sample.split())
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if not words or tokenizer is None:
+            return TOKENS_PER_WORD
+        try:
+            return max(1.0, len(tokenizer.tokenize(sample)) / words)
+        except Exception:
+            return TOKENS_PER_WORD
+
+    def encode(self, texts, batch_size=32):
+        t0 = time.perf_counter()
+        vectors = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+        self.local.seconds = getattr(self.local, "seconds", 0.0) + time.perf_counter() - t0
+        self.local.texts = getattr(self.local, "texts", 0) + (1 if isinstance(texts, str) else len(texts))
+        return np.asarray(vectors, dtype=np.float32)
+
+    def reset_timing(self):
+        self.local.seconds, self.local.texts = 0.0, 0
+
+    def add_timing(self, timing):
+        """Fold in timing() taken on another thread (e.g. a scanner worker)"""
+        self.local.seconds = getattr(self.local, "seconds", 0.0) + timing["encode_seconds"]
+        self.local.texts = getattr(self.local, "texts", 0) + timing["texts_encoded"]
+
+    def timing(self):
+        """Encode time and text count on this thread since reset_timing()"""
+        return {
+            "backend": self.name,
+            "model": self.model_name,
+            "encode_seconds": round(getattr(self.local, "seconds", 0.0), 3),
+            "texts_encoded": getattr(self.local, "texts", 0)
+        }
+
+    def pair_similarities(self, pairs):
+        a = self.encode([p[0] for p in pairs])
+        b = self.encode([p[1] for p in pairs])
+        a /= np.linalg.norm(a, axis=1, keepdims=True)
+        b /= np.linalg.norm(b, axis=1, keepdims=True)
+        return (a * b).sum(axis=1)
+
+    def accuracy_check(self, reference=None, pairs=PARAPHRASE_CHECK_SET, threshold=0.7):
+        """Agreement with the reference backend (and the labels) on the bundled paraphrase set"""
+        labels = np.array([p[2] for p in pairs])
+        t0 = time.perf_counter()
+        sims = self.pair_similarities(pairs)
+        result = {
+            "backend": self.id,
+            "seconds": round(time.perf_counter() - t0, 3),
+            "label_accuracy": round(float(((sims >= threshold) == labels).mean()), 3),
+            "separation": round(float(sims[labels == 1].mean() - sims[labels == 0].mean()), 3)
+        }
+        if reference is not None:
+            t0 = time.perf_counter()
+            ref = reference.pair_similarities(pairs)
+            result.update({
+                "reference": reference.id,
+                "reference_seconds": round(time.perf_counter() - t0, 3),
+                "correlation": round(float(np.corrcoef(sims, ref)[0, 1]), 4),
+                "max_abs_diff": round(float(np.abs(sims - ref).max()), 4),
+                "decision_agreement": round(float(((sims >= threshold) == (ref >= threshold)).mean()), 3)
+            })
+        return result
+
+class ModelRegistry:
+    """Embedding model and TF-IDF tools, imported and loaded on first use.
+
+    warm_up() loads them on a background thread so the window never waits;
+    a scan that needs a model before warm-up finishes blocks on the lock
+    until it is ready.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.semantic_model = None
+        self.tfidf_tools = None
+        self.status = {"semantic": "not loaded", "tfidf": "not loaded"}
+        self.load_seconds = None
+
+    def semantic(self):
+        """The configured EmbeddingBackend, or None when it cannot be loaded"""
+        with self.lock:
+            if self.status["semantic"] == "not loaded":
+                self.status["semantic"] = "unavailable"
+                # The plain torch backend is the fallback when the configured one will not load
+                for name in dict.fromkeys((EMBEDDING_BACKEND, "torch")):
+                    if not EMBEDS:
+                        break
+                    try:
+                        self.semantic_model = EmbeddingBackend(name)
+                        self.status["semantic"] = "ready"
+                        break
+                    except Exception as e:
+                        print(f"⚠️ Embedding backend {name} unavailable: {str(e)}")
+            return self.semantic_model
+
+    def tfidf(self):
+        """(vectorizer factory, cosine_similarity), or None without scikit-learn.
+
+        A fitted vectorizer holds state, so callers make their own per call
+        rather than sharing one across scanner and service threads.
+        """
+        with self.lock:
+            if self.status["tfidf"] == "not loaded":
+                self.status["tfidf"] = "unavailable"
+                if TFIDF:
+                    try:
+                        from sklearn.feature_extraction.text import TfidfVectorizer
+                        from sklearn.metrics.pairwise import cosine_similarity
+                        self.tfidf_tools = (lambda: TfidfVectorizer(max_features=5000), cosine_similarity)
+                        self.status["tfidf"] = "ready"
+                    except Exception:
+                        pass
+            return self.tfidf_tools
+
+    def cos_sim(self, a, b):
+        """Cosine similarity matrix between the rows of a and b"""
+        a = np.atleast_2d(np.asarray(a, dtype=np.float32))
+        b = np.atleast_2d(np.asarray(b, dtype=np.float32))
+        a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+        b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+        return a @ b.T
+
+    def timing(self):
+        return self.semantic_model.timing() if self.semantic_model is not None else None
+
+    def reset_timing(self):
+        if self.semantic_model is not None:
+            self.semantic_model.reset_timing()
+
+    def add_timing(self, timing):
+        if self.semantic_model is not None and timing:
+            self.semantic_model.add_timing(timing)
+
+    def ready(self):
+        return "not loaded" not in self.status.values()
+
+    def summary(self):
+        if self.status["semantic"] == "ready":
+            return "Ready"
+        if self.status["tfidf"] == "ready":
+            return "Lexical only"
+        return "Basic"
+
+    def warm_up(self, callback=None):
+        """Load everything on a daemon thread; callback(summary, seconds) runs on that thread"""
+        def run():
+            t0 = time.perf_counter()
+            self.tfidf()
+            self.semantic()
+            self.load_seconds = time.perf_counter() - t0
+            if callback:
+                callback(self.summary(), self.load_seconds)
+        threading.Thread(target=run, daemon=True).start()
+
+MODELS = ModelRegistry()
+
+# ---------------- TEXT TOOLS ----------------
+class TextTools:
+    """Sentence/word tokenizers and a POS tagger backed by NLTK, with regex fallbacks.
+
+    NLTK data is looked up in NLTK_DATA_DIR first and checked once per process;
+    nothing is downloaded unless NLTK_DOWNLOAD is set. When punkt or the tagger
+    is missing the matching fallback is used, so stylometry still works offline
+    (the report records which backend produced it).
+    """
+    # Closing quotes and brackets after the stop stay with the sentence (lookbehinds must be fixed width)
+    SENTENCE_REGEX = re.compile(r'(?:(?<=[.!?])|(?<=[.!?]["\')\]])|(?<=[.!?]["\')\]]{2}))\s+(?=["\'(\[]?[A-Z0-9])')
+    WORD_REGEX = re.compile(r"\d+(?:[.,]\d+)*|\w+(?=n't\b)|n't\b|\w+(?:-\w+)*|'\w+|[^\w\s]")
+    ABBREVIATIONS = frozenset("mr mrs ms dr prof st vs etc fig al eg ie no vol pp jr sr inc ltd co".split())
+    CLOSED_CLASS = {
+        "DT": "a an the this that these those each every some any no another",
+        "IN": "of in on at by for with from to into over under about after before between through during without within against among since until upon",
+        "CC": "and or but nor yet so",
+        "PRP": "i you he she it we they me him her us them",
+        "PRP$": "my your his its our their",
+        "MD": "can could may might must shall should will would",
+        "VBZ": "is has does",
+        "VBP": "are have do am",
+        "VBD": "was were had did",
+        "VB": "be",
+        "VBN": "been",
+        "RB": "not very also too often never always",
+        "WDT": "which whatever",
+        "WP": "who whom what",
+        "WRB": "when where why how",
+        "EX": "there",
+    }
+    SUFFIX_TAGS = (("ing", "VBG"), ("ed", "VBD"), ("ly", "RB"), ("ous", "JJ"), ("ful", "JJ"), ("ive", "JJ"),
+                   ("able", "JJ"), ("ible", "JJ"), ("al", "JJ"), ("ic", "JJ"), ("est", "JJS"), ("ness", "NN"),
+                   ("ment", "NN"), ("tion", "NN"), ("sion", "NN"), ("ity", "NN"), ("ss", "NN"), ("s", "NNS"))
+
+    def __init__(self, data_dir=NLTK_DATA_DIR, download=NLTK_DOWNLOAD):
+        self.data_dir = data_dir
+        self.download = download
+        self.lock = threading.Lock()
+        self.checked = False
+        self.nltk_sent = None
+        self.nltk_word = None
+        self.nltk_tag = None
+        self.lexicon = {w: tag for tag, words in self.CLOSED_CLASS.items() for w in words.split()}
+
+    def ensure(self):
+        """Resolve backends on first call; later calls return at once"""
+        with self.lock:
+            if not self.checked:
+                self.checked = True
+                self.load_nltk()
+        return self.backends()
+
+    def load_nltk(self):
+        if not NLTK_AVAILABLE:
+            return
+        try:
+            import nltk
+        except Exception:
+            return
+        data_dir = os.path.abspath(self.data_dir)
+        if data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, data_dir)
+        if self.find(nltk, "punkt"):
+            from nltk.tokenize import sent_tokenize, word_tokenize
+            self.nltk_sent, self.nltk_word = sent_tokenize, word_tokenize
+        if self.find(nltk, "tagger"):
+            self.nltk_tag = nltk.pos_tag
+
+    def find(self, nltk, resource):
+        for name, path in NLTK_RESOURCES[resource]:
+            try:
+                nltk.data.find(path)
+                return True
+            except LookupError:
+                continue
+        if not self.download:
+            return False
+        for name, path in NLTK_RESOURCES[resource]:
+            try:
+                if nltk.download(name, download_dir=self.data_dir, quiet=True):
+                    nltk.data.find(path)
+                    return True
+            except Exception:
+                continue
+        return False
+
+    def backends(self):
+        return {
+            "tokenizer": "nltk" if self.nltk_word else "regex",
+            "tagger": "nltk" if self.nltk_tag else "suffix",
+        }
+
+    def sent_tokenize(self, text):
+        self.ensure()
+        if self.nltk_sent:
+            try:
+                return self.nltk_sent(text)
+            except LookupError:
+                pass
+        sentences = []
+        for piece in self.SENTENCE_REGEX.split(text):
+            piece = piece.strip()
+            if not piece:
+                continue
+            # "Dr. Smith" and "et al. 2020" are not sentence breaks
+            last = sentences[-1].rsplit(None, 1)[-1].rstrip('.').lower() if sentences else ""
+            if last in self.ABBREVIATIONS or (len(last) == 1 and last.isalpha()):
+                sentences[-1] += " " + piece
+            else:
+                sentences.append(piece)
+        return sentences
+
+    def word_tokenize(self, text):
+        self.ensure()
+        if self.nltk_word:
+            try:
+                return self.nltk_word(text)
+            except LookupError:
+                pass
+        return self.WORD_REGEX.findall(text)
+
+    def pos_tag(self, tokens):
+        """[(token, Penn Treebank tag)]"""
+        self.ensure()
+        if self.nltk_tag:
+            try:
+                return self.nltk_tag(tokens)
+            except LookupError:
+                pass
+        return [(t, self.guess_tag(t)) for t in tokens]
+
+    def guess_tag(self, token):
+        lower = token.lower()
+        if lower in self.lexicon:
+            return self.lexicon[lower]
+        if not token[0].isalnum():
+            return "." if token in ".!?" else ","
+        if token[0].isdigit():
+            return "CD"
+        if token[0].isupper():
+            return "NNP"
+        for suffix, tag in self.SUFFIX_TAGS:
+            if lower.endswith(suffix) and len(lower) > len(suffix) + 2:
+                return tag
+        return "NN"
+
+TEXT_TOOLS = TextTools()
+
+# ---------------- CHART RENDERING (runs in the render process) ----------------
+_FIGURE_TEMPLATES = {}
+
+def _pyplot():
+    """Import matplotlib on the first chart; the GUI process never needs it"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+def _chart_figure(kind, figsize):
+    """Reuse one figure per chart kind instead of building a new one per render"""
+    fig = _FIGURE_TEMPLATES.get(kind)
+    if fig is None:
+        fig = _pyplot().figure(figsize=figsize)
+        _FIGURE_TEMPLATES[kind] = fig
+    fig.clf()
+    fig.patch.set_facecolor('#0a0a1a')
+    return fig
+
+def _style_dark_axes(ax):
+    ax.set_facecolor('#0a0a1a')
+    ax.tick_params(colors='white')
+    for side in ('bottom', 'top', 'right', 'left'):
+        ax.spines[side].set_color('white')
+
+def _label_bars(ax, bars, similarities):
+    for bar, sim in zip(bars, similarities):
+        ax.text(bar.get_width() + 0.01, bar.get_y() + bar.get_height()/2,
+                f'{sim:.1%}', ha='left', va='center', color='white', fontweight='bold')
+
+def _render_overview(data):
+    fig = _chart_figure("overview", (10, 6))
+    ax = fig.add_subplot(111)
+    ax.bar(["Originality Score", "Matches Found"],
+           [data["originality"], data["matches_found"]], color=['#00ff00', '#ff4444'])
+    ax.set_title("Document Plagiarism Overview", fontsize=14, fontweight='bold')
+    ax.set_ylabel("Value", fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    return fig, '#0a0a0a'
+
+def _render_heatmap(data):
+    similarities, sources = data["similarities"], data["sources"]
+    fig = _chart_figure("heatmap", (12, 8))
+    ax = fig.add_subplot(111)
+
+    # Green to Yellow to Red
+    import matplotlib.colors as mcolors
+    cmap = mcolors.LinearSegmentedColormap.from_list("similarity", ['#00ff00', '#ffff00', '#ff0000'])
+    y_pos = np.arange(len(similarities))
+    bars = ax.barh(y_pos, similarities, color=cmap(similarities))
+
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(sources)
+    ax.set_xlabel('Similarity Score')
+    ax.set_title('Document Similarity Heatmap', fontsize=14, fontweight='bold', color='white')
+    _style_dark_axes(ax)
+    _label_bars(ax, bars, similarities)
+    return fig, '#0a0a1a'
+
+def _render_3d_network(data):
+    similarities, sources = data["similarities"], data["sources"]
+    from mpl_toolkits.mplot3d import Axes3D  # registers the '3d' projection
+    fig = _chart_figure("3d_network", (12, 8))
+    ax = fig.add_subplot(111, projection='3d')
+
+    # Generate 3D coordinates
+    x = np.random.rand(len(similarities)) * 10
+    y = np.random.rand(len(similarities)) * 10
+    z = np.array(similarities) * 10
+    scatter = ax.scatter(x, y, z, c=similarities, cmap='viridis', s=100, alpha=0.7)
+    for xi, yi, zi, source in zip(x, y, z, sources):
+        ax.text(xi, yi, zi, source, fontsize=8, color='white')
+
+    ax.set_xlabel('X Axis')
+    ax.set_ylabel('Y Axis')
+    ax.set_zlabel('Similarity')
+    ax.set_title('3D Similarity Network', color='white', fontweight='bold')
+    ax.set_facecolor('#0a0a1a')
+    ax.tick_params(colors='white')
+    ax.grid(True, alpha=0.3)
+
+    cbar = fig.colorbar(scatter, ax=ax)
+    cbar.set_label('Similarity Score', color='white')
+    cbar.ax.yaxis.set_tick_params(color='white')
+    plt = _pyplot()
+    plt.setp(plt.getp(cbar.ax.axes, 'yticklabels'), color='white')
+    return fig, '#0a0a1a'
+
+def _render_timeline(data):
+    similarities, sources = data["similarities"], data["sources"]
+    fig = _chart_figure("timeline", (12, 6))
+    ax = fig.add_subplot(111)
+
+    y_pos = np.arange(len(sources))
+    colors = _pyplot().cm.RdYlGn_r(np.array(similarities))  # Red to Green (reversed)
+    bars = ax.barh(y_pos, similarities, color=colors, alpha=0.8)
+
+    ax.set_yticks(y_pos)
+    ax.set_yticklabels(sources)
+    ax.set_xlabel('Similarity Score')
+    ax.set_title('Document Analysis Timeline', color='white', fontweight='bold')
+    _style_dark_axes(ax)
+    _label_bars(ax, bars, similarities)
+    return fig, '#0a0a1a'
+
+_CHART_RENDERERS = {
+    "overview": _render_overview,
+    "heatmap": _render_heatmap,
+    "3d_network": _render_3d_network,
+    "timeline": _render_timeline,
+}
+
+def render_chart(kind, data, path, dpi=CHART_PREVIEW_DPI):
+    """Render one chart to a PNG; module-level so the render process can unpickle it"""
+    fig, facecolor = _CHART_RENDERERS[kind](data)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches='tight', facecolor=facecolor, edgecolor='none')
+    return path
+
+class ChartRenderer:
+    """Queues chart jobs on a separate process so scans and the Tk thread never wait on matplotlib"""
+    def __init__(self):
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                try:
+                    self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+                except Exception:
+                    # No process support (frozen/sandboxed builds): still keep it off the caller's thread
+                    self.executor = ThreadPoolExecutor(max_workers=1)
+            return self.executor
+
+    def chart_data(self, report):
+        matches = report.get('matches', [])
+        return {
+            "similarities": [m.get('similarity', 0) for m in matches],
+            "sources": [m.get('source', 'Unknown') for m in matches],
+            "originality": report.get("originality_score") or 0,
+            "matches_found": report.get("matches_found") or 0
+        }
+
+    def submit(self, kind, report, path, dpi=CHART_PREVIEW_DPI, callback=None):
+        """Queue a chart; callback(path, error) runs when it is done"""
+        data = self.chart_data(report)
+        try:
+            future = self.get_executor().submit(render_chart, kind, data, path, dpi)
+        except BrokenProcessPool:
+            # The render process died (e.g. killed by the OS); start a fresh one
+            self.shutdown()
+            future = self.get_executor().submit(render_chart, kind, data, path, dpi)
+        if callback:
+            def done(f):
+                error = f.exception()
+                callback(None if error else f.result(), error)
+            future.add_done_callback(done)
+        return future
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+CHART_RENDERER = ChartRenderer()
+
+class AnimationScheduler:
+    """Drives every GUI effect from a single after() loop with a per-frame time budget.
+
+    Each registered effect exposes step(quality). Quality 2 is full detail, 1 drops
+    cosmetic work and halves background effect rates, 0 pauses everything except
+    essential effects (radar, progress bar). Quality falls when frames run over
+    budget and recovers after a stretch of cheap frames; an active scan or a
+    remote-desktop session caps it at 0.
+    """
+    def __init__(self, root, frame_ms=ANIMATION_FRAME_MS, budget_ms=ANIMATION_FRAME_BUDGET_MS, low_power=LOW_POWER_MODE):
+        self.root = root
+        self.budget_ms = budget_ms
+        self.low_power = self.detect_remote_session() if low_power is None else low_power
+        self.frame_ms = frame_ms * 2 if self.low_power else frame_ms
+        self.effects = []
+        self.quality = 2
+        self.scan_active = False
+        self.running = False
+        self.slow_frames = 0
+        self.fast_frames = 0
+        self.last_frame_ms = 0.0
+
+    def detect_remote_session(self):
+        if os.environ.get("SESSIONNAME", "").upper().startswith("RDP-"):
+            return True  # Windows Remote Desktop
+        display = os.environ.get("DISPLAY", "")
+        if display and not display.startswith(":"):
+            return True  # Forwarded or remote X display
+        return bool(os.environ.get("SSH_CONNECTION") and display)
+
+    def register(self, effect, interval_ms, essential=False):
+        self.effects.append([effect, interval_ms, essential, 0.0])
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.tick()
+
+    def stop(self):
+        self.running = False
+
+    def set_scan_active(self, active):
+        self.scan_active = active
+
+    def set_low_power(self, enabled):
+        self.low_power = enabled
+        self.frame_ms = ANIMATION_FRAME_MS * 2 if enabled else ANIMATION_FRAME_MS
+
+    def effective_quality(self):
+        if self.scan_active or self.low_power:
+            return 0
+        return self.quality
+
+    def tick(self):
+        if not self.running:
+            return
+        started = time.perf_counter()
+        elapsed = 0.0
+        try:
+            now_ms = started * 1000
+            quality = self.effective_quality()
+
+            for entry in list(self.effects):
+                effect, interval, essential, last = entry
+                if quality == 0 and not essential:
+                    continue
+                if quality == 1 and not essential:
+                    interval *= 2
+                if now_ms - last < interval:
+                    continue
+                entry[3] = now_ms
+                try:
+                    effect.step(quality)
+                except tk.TclError:
+                    pass  # Canvas destroyed while closing
+                except Exception as e:
+                    # One broken effect must not stop the others
+                    self.effects.remove(entry)
+                    print(f"⚠️ Animation {type(effect).__name__} disabled: {str(e)}")
+
+            elapsed = (time.perf_counter() - started) * 1000
+            self.last_frame_ms = elapsed
+            self.adapt(elapsed)
+        finally:
+            self.root.after(max(1, int(self.frame_ms - elapsed)), self.tick)
+
+    def adapt(self, elapsed):
+        if elapsed > self.budget_ms:
+            self.slow_frames += 1
+            self.fast_frames = 0
+            if self.slow_frames >= 3 and self.quality > 0:
+                self.quality -= 1
+                self.slow_frames = 0
+        elif elapsed < self.budget_ms / 2:
+            self.fast_frames += 1
+            self.slow_frames = 0
+            if self.fast_frames >= 90 and self.quality < 2:
+                self.quality += 1
+                self.fast_frames = 0
+
+class CanvasItemPool:
+    """Fixed set of pre-created canvas items, shown on acquire and hidden on release.
+
+    Effects borrow items from a pool instead of creating and deleting them, so
+    the number of canvas items stays flat for the lifetime of the app.
+    """
+    def __init__(self, canvas, kind, size, name=None, **options):
+        self.canvas = canvas
+        self.name = name or kind
+        create = getattr(canvas, f"create_{kind}")
+        self.items = [create(0, 0, 0, 0, state='hidden', **options) for _ in range(size)]
+        self.free = list(self.items)
+
+    def acquire(self, **config):
+        """A hidden item made visible, or None when the pool is exhausted"""
+        if not self.free:
+            return None
+        item = self.free.pop()
+        self.canvas.itemconfig(item, state='normal', **config)
+        return item
+
+    def release(self, item):
+        self.canvas.itemconfig(item, state='hidden')
+        self.free.append(item)
+
+    def in_use(self):
+        return len(self.items) - len(self.free)
+
+class CanvasDebugOverlay:
+    """Live canvas item and pool counts drawn over the background"""
+    def __init__(self, canvas, pools, scheduler, visible=DEBUG_OVERLAY):
+        self.canvas = canvas
+        self.pools = pools
+        self.scheduler = scheduler
+        self.visible = visible
+        self.text_id = canvas.create_text(12, 12, anchor='nw', fill='#ffff00', font=('Consolas', 9),
+                                          state='normal' if visible else 'hidden')
+
+    def toggle(self, event=None):
+        self.visible = not self.visible
+        self.canvas.itemconfig(self.text_id, state='normal' if self.visible else 'hidden')
+
+    def step(self, quality):
+        if not self.visible:
+            return
+        pools = "  ".join(f"{p.name} {p.in_use()}/{len(p.items)}" for p in self.pools)
+        self.canvas.itemconfig(self.text_id, text=(
+            f"canvas items {len(self.canvas.find_all())}  {pools}  "
+            f"frame {self.scheduler.last_frame_ms:.1f} ms  quality {self.scheduler.effective_quality()}"
+        ))
+        self.canvas.tag_raise(self.text_id)
+
 class CyberBackground:
     def __init__(self, canvas, width, height):
         self.canvas = canvas
@@ -82,6 +919,8 @@ class CyberBackground:
         
         # Create cyber grid network
         self.create_cyber_network()
+        self.pulse_pool = CanvasItemPool(canvas, "oval", CYBER_PULSE_POOL, name="pulses",
+                                         fill='', outline='#00ff88', width=2)
         
     def create_cyber_network(self):
         # Create network nodes
@@ -110,24 +949,26 @@ class CyberBackground:
                     
     def start(self):
         self.active = True
-        self.animate()
         
     def stop(self):
         self.active = False
+        for pulse, _, _, _ in self.pulse_effects:
+            self.pulse_pool.release(pulse)
+        self.pulse_effects = []
         
-    def animate(self):
+    def step(self, quality):
         if not self.active:
             return
             
         # Animate nodes
+        pulse_chance = 0.1 if quality >= 2 else 0.03
         for node, x, y, size in self.nodes:
-            if random.random() < 0.1:
-                # Pulse effect
-                pulse = self.canvas.create_oval(
-                    x-size*3, y-size*3, x+size*3, y+size*3,
-                    fill='', outline='#00ff88', width=2
-                )
-                self.pulse_effects.append((pulse, 0))
+            if random.random() < pulse_chance:
+                # Pulse effect, borrowed from the pool; skipped when all rings are busy
+                pulse = self.pulse_pool.acquire(outline='#00ff88')
+                if pulse is not None:
+                    self.canvas.coords(pulse, x-size*3, y-size*3, x+size*3, y+size*3)
+                    self.pulse_effects.append((pulse, 0, x, y))
                 
             # Random movement
             new_x = max(0, min(self.width, x + random.uniform(-5, 5)))
@@ -136,91 +977,128 @@ class CyberBackground:
             
         # Animate pulse effects
         new_pulses = []
-        for pulse, size in self.pulse_effects:
+        for pulse, size, x, y in self.pulse_effects:
             if size < 50:
-                _, x, y, _ = random.choice(self.nodes)
                 self.canvas.coords(pulse, x-size, y-size, x+size, y+size)
                 alpha = 1 - (size / 50)
                 color = f'#00ff{int(alpha*255):02x}'
                 self.canvas.itemconfig(pulse, outline=color)
-                new_pulses.append((pulse, size + 2))
+                new_pulses.append((pulse, size + 2, x, y))
             else:
-                self.canvas.delete(pulse)
+                self.pulse_pool.release(pulse)
         self.pulse_effects = new_pulses
         
         # Animate lines
-        for line in self.lines:
-            if random.random() < 0.3:
-                self.canvas.itemconfig(line, dashoffset=random.randint(0, 10))
-                
-        self.canvas.after(100, self.animate)
-
-class AdvancedParticle:
-    def __init__(self, canvas, width, height):
+        if quality >= 2:
+            for line in self.lines:
+                if random.random() < 0.3:
+                    self.canvas.itemconfig(line, dashoffset=random.randint(0, 10))
+
+class ParticleField:
+    """Particle system kept in NumPy arrays and stepped with vectorized bounce and pulse.
+
+    Colours come from a lookup table of quantized alpha levels, and the canvas is
+    only touched for particles that moved at least a pixel or changed level.
+    """
+    COLORS = ['#00ff88', '#0088ff', '#ff0088', '#88ff00', '#ff8800', '#8800ff']
+    ALPHA_LEVELS = 8
+    ALPHA_MIN, ALPHA_MAX = 0.3, 0.9
+
+    def __init__(self, canvas, width, height, count):
         self.canvas = canvas
         self.width = width
         self.height = height
-        self.x = random.randint(0, width)
-        self.y = random.randint(0, height)
-        self.size = random.uniform(1, 4)
-        self.speed_x = random.uniform(-2, 2)
-        self.speed_y = random.uniform(-2, 2)
-        self.alpha = random.uniform(0.3, 0.9)
-        self.pulse_speed = random.uniform(0.02, 0.05)
-        self.pulse_direction = random.choice([-1, 1])
-        self.trail_length = random.randint(3, 8)
-        self.trail = []
-        
-        # Modern color palette
-        colors = ['#00ff88', '#0088ff', '#ff0088', '#88ff00', '#ff8800', '#8800ff']
-        self.color = random.choice(colors)
-        self.glow_color = self.lighten_color(self.color)
-        
-        self.particle_id = canvas.create_oval(
-            self.x - self.size, self.y - self.size,
-            self.x + self.size, self.y + self.size,
-            fill=self.color, outline='', width=0
-        )
-        
-    def lighten_color(self, color, factor=0.3):
-        """Lighten a hex color"""
-        color = color.lstrip('#')
-        rgb = tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
-        light_rgb = tuple(min(255, int(c + (255 - c) * factor)) for c in rgb)
-        return f'#{light_rgb[0]:02x}{light_rgb[1]:02x}{light_rgb[2]:02x}'
-        
-    def move(self):
-        # Add trail effect
-        self.trail.append((self.x, self.y))
-        if len(self.trail) > self.trail_length:
-            self.trail.pop(0)
-            
-        # Update position with momentum
-        self.x += self.speed_x
-        self.y += self.speed_y
-        
-        # Bounce with damping
-        if self.x <= 0 or self.x >= self.width:
-            self.speed_x *= -0.8
-            self.x = max(0, min(self.width, self.x))
-        if self.y <= 0 or self.y >= self.height:
-            self.speed_y *= -0.8
-            self.y = max(0, min(self.height, self.y))
-            
-        # Pulsing effect
-        self.alpha += self.pulse_speed * self.pulse_direction
-        if self.alpha >= 0.9 or self.alpha <= 0.3:
-            self.pulse_direction *= -1
-            
-        # Update visual
-        self.canvas.coords(self.particle_id,
-                          self.x - self.size, self.y - self.size,
-                          self.x + self.size, self.y + self.size)
-        
-        # Color intensity based on alpha
-        intensity = int(255 * self.alpha)
-        current_color = f'#{intensity:02x}{int(self.color[3:5], 16):02x}{int(self.color[5:7], 16):02x}'
-        self.canvas.itemconfig(self.particle_id, fill=current_color)
+        self.active = False
+        self.last_step = None
+        self.frame = 0
+
+        rng = np.random.default_rng()
+        self.pos = np.column_stack([rng.uniform(0, width, count), rng.uniform(0, height, count)])
+        self.vel = rng.uniform(-2, 2, (count, 2))
+        self.size = rng.uniform(1, 4, count)
+        self.alpha = rng.uniform(self.ALPHA_MIN, self.ALPHA_MAX, count)
+        self.pulse_speed = rng.uniform(0.02, 0.05, count)
+        self.pulse_direction = rng.choice([-1.0, 1.0], count)
+        self.color_index = rng.integers(0, len(self.COLORS), count)
+        self.lut = self.build_color_lut()
+
+        self.drawn_pos = self.pos.copy()
+        self.drawn_level = self.levels()
+        boxes = np.column_stack([self.pos - self.size[:, None], self.pos + self.size[:, None]]).tolist()
+        self.ids = [
+            canvas.create_oval(*box, fill=self.lut[c][lvl], outline='', width=0)
+            for box, c, lvl in zip(boxes, self.color_index.tolist(), self.drawn_level.tolist())
+        ]
+
+    def build_color_lut(self):
+        """Hex colour per (base colour, alpha level): alpha drives the red channel"""
+        lut = []
+        for color in self.COLORS:
+            g, b = int(color[3:5], 16), int(color[5:7], 16)
+            row = []
+            for level in range(self.ALPHA_LEVELS):
+                alpha = self.ALPHA_MIN + (self.ALPHA_MAX - self.ALPHA_MIN) * level / (self.ALPHA_LEVELS - 1)
+                row.append(f'#{int(255 * alpha):02x}{g:02x}{b:02x}')
+            lut.append(row)
+        return lut
+
+    def levels(self):
+        scaled = (self.alpha - self.ALPHA_MIN) / (self.ALPHA_MAX - self.ALPHA_MIN) * (self.ALPHA_LEVELS - 1)
+        return np.clip(np.rint(scaled), 0, self.ALPHA_LEVELS - 1).astype(np.int32)
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def step(self, quality):
+        if not self.active:
+            self.last_step = None
+            return
+
+        # Speeds are tuned per 30 ms, so scale by the real frame gap
+        now = time.perf_counter()
+        dt = 1.0 if self.last_step is None else min(3.0, max(0.5, (now - self.last_step) * 1000 / 30))
+        self.last_step = now
+
+        # Update position with momentum, bounce with damping
+        self.pos += self.vel * dt
+        # Direction comes from the wall that was hit, so a particle left on a wall is not flipped back into it
+        for axis, limit in ((0, self.width), (1, self.height)):
+            speed = np.abs(self.vel[:, axis]) * 0.8
+            self.vel[:, axis] = np.where(self.pos[:, axis] <= 0, speed,
+                                         np.where(self.pos[:, axis] >= limit, -speed, self.vel[:, axis]))
+            np.clip(self.pos[:, axis], 0, limit, out=self.pos[:, axis])
+
+        # Pulsing effect; a large dt can overshoot a bound, so turn by the bound crossed and clip
+        self.alpha += self.pulse_speed * self.pulse_direction * dt
+        self.pulse_direction = np.where(self.alpha >= self.ALPHA_MAX, -1.0,
+                                        np.where(self.alpha <= self.ALPHA_MIN, 1.0, self.pulse_direction))
+        np.clip(self.alpha, self.ALPHA_MIN, self.ALPHA_MAX, out=self.alpha)
+
+        # Only redraw what changed visibly; coarser threshold at reduced quality
+        min_move = 1.5 if quality >= 2 else 3.0
+        moved = np.flatnonzero(np.abs(self.pos - self.drawn_pos).max(axis=1) >= min_move)
+        if moved.size:
+            pos = self.pos[moved]
+            size = self.size[moved, None]
+            boxes = np.column_stack([pos - size, pos + size]).tolist()
+            coords = self.canvas.coords
+            for i, box in zip(moved.tolist(), boxes):
+                coords(self.ids[i], *box)
+            self.drawn_pos[moved] = pos
+
+        # Recolour alternating halves of the field; a one-frame colour lag is invisible
+        self.frame += 1
+        if quality >= 1:
+            level = self.levels()
+            changed = np.flatnonzero(level != self.drawn_level)
+            changed = changed[changed % 2 == self.frame % 2]
+            itemconfig = self.canvas.itemconfig
+            for i, c, lvl in zip(changed.tolist(), self.color_index[changed].tolist(), level[changed].tolist()):
+                itemconfig(self.ids[i], fill=self.lut[c][lvl])
+            self.drawn_level[changed] = level[changed]
 
 class HolographicGrid:
     def __init__(self, canvas, width, height):
@@ -230,6 +1108,7 @@ class HolographicGrid:
         self.grid_lines = []
         self.grid_points = []
         self.active = False
+        self.dash_offset = 0
         
         # Create holographic grid
         grid_size = 60
@@ -252,31 +1131,25 @@ class HolographicGrid:
                 
     def start(self):
         self.active = True
-        self.animate()
         
     def stop(self):
         self.active = False
         
-    def animate(self):
+    def step(self, quality):
         if not self.active:
             return
             
-        # Animate grid lines
+        # Animate grid lines (tracked locally instead of reading the dash back from Tk)
+        self.dash_offset = (self.dash_offset + 1) % 12
         for line in self.grid_lines:
-            current_dash = self.canvas.itemcget(line, 'dash')
-            if current_dash:
-                parts = current_dash.split()
-                if len(parts) >= 2:
-                    offset = (int(parts[1]) + 1) % 12
-                    self.canvas.itemconfig(line, dashoffset=offset)
+            self.canvas.itemconfig(line, dashoffset=self.dash_offset)
                     
         # Animate grid points
-        for point in self.grid_points:
-            if random.random() > 0.7:
-                colors = ['#00ff88', '#0088ff', '#ff0088', '#88ff00']
-                self.canvas.itemconfig(point, fill=random.choice(colors))
-                
-        self.canvas.after(80, self.animate)
+        if quality >= 2:
+            colors = ['#00ff88', '#0088ff', '#ff0088', '#88ff00']
+            for point in self.grid_points:
+                if random.random() > 0.7:
+                    self.canvas.itemconfig(point, fill=random.choice(colors))
 
 class QuantumRadar:
     def __init__(self, canvas, width, height):
@@ -291,29 +1164,34 @@ class QuantumRadar:
         self.pulse_circles = []
         self.active = False
         
-    def start(self):
-        self.active = True
-        # Create multiple scan lines for quantum effect
+        # Create multiple scan lines for quantum effect once; start/stop only show and hide them
         for i in range(3):
             angle_offset = i * 120
             line = self.canvas.create_line(
                 self.center_x, self.center_y,
                 self.center_x + self.radius, self.center_y,
-                fill=f'#00ff{88 + i*20:02x}', width=2
+                fill=f'#00ff{88 + i*20:02x}', width=2, state='hidden'
             )
             self.scan_lines.append((line, angle_offset))
-        self.animate()
+        self.pulse_pool = CanvasItemPool(canvas, "oval", RADAR_PULSE_POOL, name="radar",
+                                         fill='#00ffff', outline='')
+        
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        for line, _ in self.scan_lines:
+            self.canvas.itemconfig(line, state='normal')
         
     def stop(self):
         self.active = False
         for line, _ in self.scan_lines:
-            self.canvas.delete(line)
-        for circle in self.pulse_circles:
-            self.canvas.delete(circle)
-        self.scan_lines.clear()
+            self.canvas.itemconfig(line, state='hidden')
+        for circle, _ in self.pulse_circles:
+            self.pulse_pool.release(circle)
         self.pulse_circles.clear()
         
-    def animate(self):
+    def step(self, quality):
         if not self.active:
             return
             
@@ -328,35 +1206,33 @@ class QuantumRadar:
             self.canvas.coords(line, self.center_x, self.center_y, end_x, end_y)
             
             # Color cycling
-            hue = (current_angle % 360) / 360
-            r, g, b = self.hsv_to_rgb(hue, 1.0, 1.0)
-            color = f'#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}'
-            self.canvas.itemconfig(line, fill=color)
+            if quality >= 1:
+                hue = (current_angle % 360) / 360
+                r, g, b = self.hsv_to_rgb(hue, 1.0, 1.0)
+                color = f'#{int(r*255):02x}{int(g*255):02x}{int(b*255):02x}'
+                self.canvas.itemconfig(line, fill=color)
+            
+        # Grow pulse effects (two 20 ms pulse steps per radar frame)
+        live_pulses = []
+        for circle, size in self.pulse_circles:
+            size += 10
+            if size < 100:
+                self.canvas.coords(circle,
+                                 self.center_x - size, self.center_y - size,
+                                 self.center_x + size, self.center_y + size)
+                live_pulses.append((circle, size))
+            else:
+                self.pulse_pool.release(circle)
+        self.pulse_circles = live_pulses
             
         # Add pulse effects
         if self.angle % 30 == 0:
-            pulse = self.canvas.create_oval(
-                self.center_x - 5, self.center_y - 5,
-                self.center_x + 5, self.center_y + 5,
-                fill='#00ffff', outline=''
-            )
-            self.pulse_circles.append(pulse)
-            self.animate_pulse(pulse, 0)
-            
-        self.canvas.after(40, self.animate)
-        
-    def animate_pulse(self, circle, size):
-        if circle in self.pulse_circles and size < 100:
-            self.canvas.coords(circle,
-                             self.center_x - size, self.center_y - size,
-                             self.center_x + size, self.center_y + size)
-            alpha = 1 - (size / 100)
-            self.canvas.itemconfig(circle, fill=f'#00ffff')
-            self.canvas.after(20, lambda: self.animate_pulse(circle, size + 5))
-        else:
-            if circle in self.pulse_circles:
-                self.canvas.delete(circle)
-                self.pulse_circles.remove(circle)
+            pulse = self.pulse_pool.acquire()
+            if pulse is not None:
+                self.canvas.coords(pulse,
+                                 self.center_x - 5, self.center_y - 5,
+                                 self.center_x + 5, self.center_y + 5)
+                self.pulse_circles.append((pulse, 0))
                 
     def hsv_to_rgb(self, h, s, v):
         if s == 0.0:
@@ -386,7 +1262,7 @@ class ModernProgressBar:
         self.width = width
         self.height = height
         self.value = 0
-        self.animation_id = None
+        self.pulsing = False
         
         # Create gradient background
         self.create_gradient()
@@ -411,13 +1287,14 @@ class ModernProgressBar:
         self.canvas.coords(self.glow_effect, progress_width - 20, 0, progress_width, self.height)
         
     def start_pulse(self):
-        self.pulse_animation()
+        self.pulsing = True
         
     def stop_pulse(self):
-        if self.animation_id:
-            self.canvas.after_cancel(self.animation_id)
+        self.pulsing = False
             
-    def pulse_animation(self):
+    def step(self, quality):
+        if not self.pulsing:
+            return
         # Create pulsing glow effect with color changes instead of stipple
         current_fill = self.canvas.itemcget(self.glow_effect, 'fill')
         if current_fill == '#00ff88':
@@ -426,7 +1303,23 @@ class ModernProgressBar:
             new_fill = '#00ff88'
             
         self.canvas.itemconfig(self.glow_effect, fill=new_fill)
-        self.animation_id = self.canvas.after(300, self.pulse_animation)
+
+class UIMessageBus:
+    """Thread-safe queue of GUI updates; only the Tk main thread drains it"""
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def post(self, kind, *payload):
+        self.queue.put((kind, payload))
+
+    def drain(self, limit=1000):
+        items = []
+        try:
+            while len(items) < limit:
+                items.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return items
 
 class GlassFrame(ttk.Frame):
     def __init__(self, parent, **kwargs):
@@ -479,10 +1372,18 @@ class AdvancedPlagiarismDetectorGUI:
         
         # Initialize animations list
         self.animations = []
-        self.particles = []
+        self.scheduler = AnimationScheduler(self.root)
+        
+        # Worker threads talk to widgets only through this bus
+        self.bus = UIMessageBus()
         
         # Initialize detector
         self.detector = LitePlagiarismDetector(self)
+        try:
+            self.job_store = JobStore()
+        except Exception as e:
+            self.job_store = None
+            self.log_status(f"⚠️ Scan checkpoints disabled: {str(e)}")
         
         # Setup modern styles
         self.setup_modern_styles()
@@ -493,6 +1394,9 @@ class AdvancedPlagiarismDetectorGUI:
         # Current analysis state
         self.current_report = None
         
+        # Apply queued detector updates at a fixed frame rate
+        self.pump_messages()
+        
     def setup_modern_styles(self):
         style = ttk.Style()
         style.theme_use('clam')
@@ -556,21 +1460,26 @@ class AdvancedPlagiarismDetectorGUI:
             self.bg_canvas.itemconfig(content_window, width=event.width, height=event.height)
         self.bg_canvas.bind('<Configure>', update_content_size)
         
-        # Initialize advanced animations
-        self.setup_advanced_animations()
-        
         # Create modern interface sections
         self.create_hero_section()
         self.create_control_panel()
         self.create_dashboard()
         
-        # Start animations
+        # Effects and model loading wait until the window has been drawn
+        self.root.after(UI_STARTUP_DELAY_MS, self.finish_startup)
+
+    def finish_startup(self):
+        self.log_status(f"⚡ WINDOW READY IN {time.perf_counter() - STARTUP_T0:.2f}s")
+        self.setup_advanced_animations()
         self.start_advanced_animations()
+        
+        self.model_status.set("Loading...")
+        MODELS.warm_up(lambda summary, seconds: self.bus.post("models", summary, seconds))
 
     def setup_advanced_animations(self):
         # Get actual canvas dimensions
         def get_canvas_dimensions():
-            self.bg_canvas.update()
+            self.bg_canvas.update_idletasks()
             return self.bg_canvas.winfo_width(), self.bg_canvas.winfo_height()
         
         width, height = get_canvas_dimensions()
@@ -582,8 +1491,8 @@ class AdvancedPlagiarismDetectorGUI:
         self.animations.append(self.cyber_bg)
         
         # Create quantum particles
-        for _ in range(80):  # Reduced for better performance
-            self.particles.append(AdvancedParticle(self.bg_canvas, width, height))
+        self.particles = ParticleField(self.bg_canvas, width, height, PARTICLE_COUNT)
+        self.animations.append(self.particles)
             
         # Create holographic grid
         self.hologrid = HolographicGrid(self.bg_canvas, width, height)
@@ -592,6 +1501,19 @@ class AdvancedPlagiarismDetectorGUI:
         # Create quantum radar
         self.quantum_radar = QuantumRadar(self.bg_canvas, width, height)
         self.animations.append(self.quantum_radar)
+        
+        # One scheduler tick drives every effect; the radar keeps running during scans
+        self.scheduler.register(self.cyber_bg, 100)
+        self.scheduler.register(self.particles, 40)
+        self.scheduler.register(self.hologrid, 80)
+        self.scheduler.register(self.quantum_radar, 40, essential=True)
+        
+        # Item-count overlay for long-running sessions (F12)
+        self.debug_overlay = CanvasDebugOverlay(self.bg_canvas,
+                                                [self.cyber_bg.pulse_pool, self.quantum_radar.pulse_pool],
+                                                self.scheduler)
+        self.scheduler.register(self.debug_overlay, 500, essential=True)
+        self.root.bind('<F12>', self.debug_overlay.toggle)
 
     def create_hero_section(self):
         # Hero section with modern design
@@ -625,8 +1547,10 @@ class AdvancedPlagiarismDetectorGUI:
         metrics_frame = ttk.Frame(parent, style='Card.TFrame')
         metrics_frame.pack(fill=tk.X, pady=(20, 0))
         
+        # AI Analysis tracks model warm-up
+        self.model_status = tk.StringVar(value="Starting...")
         metrics_data = [
-            ("🚀", "AI Analysis", "Ready"),
+            ("🚀", "AI Analysis", self.model_status),
             ("🛡️", "Security", "Active"),
             ("🌐", "Sources", "12,458"),
             ("⚡", "Speed", "Quantum")
@@ -638,7 +1562,10 @@ class AdvancedPlagiarismDetectorGUI:
             
             ttk.Label(metric_card, text=icon, style='Metric.TLabel', font=('Segoe UI', 14)).pack()
             ttk.Label(metric_card, text=label, style='Subtitle.TLabel').pack()
-            ttk.Label(metric_card, text=value, style='Metric.TLabel').pack()
+            if isinstance(value, tk.StringVar):
+                ttk.Label(metric_card, textvariable=value, style='Metric.TLabel').pack()
+            else:
+                ttk.Label(metric_card, text=value, style='Metric.TLabel').pack()
 
     def create_control_panel(self):
         control_frame = ttk.Frame(self.content_frame, style='Card.TFrame')
@@ -678,7 +1605,13 @@ class AdvancedPlagiarismDetectorGUI:
                                   text="🚀 QUANTUM SCAN",
                                   command=self.start_scan,
                                   style='Modern.TButton')
-        self.scan_btn.pack(side=tk.LEFT)
+        self.scan_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        export_btn = ttk.Button(button_frame,
+                               text="📤 EXPORT CHARTS",
+                               command=self.export_charts,
+                               style='Modern.TButton')
+        export_btn.pack(side=tk.LEFT)
         
         # Advanced progress visualization
         self.create_progress_section(control_frame)
@@ -691,10 +1624,14 @@ class AdvancedPlagiarismDetectorGUI:
                                        text="🟢 SYSTEM READY FOR QUANTUM ANALYSIS",
                                        style='Metric.TLabel')
         self.progress_label.pack(anchor='w')
+
+        self.coverage_label = ttk.Label(progress_section, text="", style='Metric.TLabel')
+        self.coverage_label.pack(anchor='w')
         
         # Modern progress bar
         self.progress_bar = ModernProgressBar(progress_section, width=1200, height=25)
         self.progress_bar.canvas.pack(fill=tk.X, pady=(10, 0))
+        self.scheduler.register(self.progress_bar, 300, essential=True)
 
     def create_dashboard(self):
         # Modern tabbed interface
@@ -945,13 +1882,9 @@ class AdvancedPlagiarismDetectorGUI:
     def start_advanced_animations(self):
         for animation in self.animations:
             animation.start()
-        self.animate_particles()
-        self.quantum_radar.start()
-
-    def animate_particles(self):
-        for particle in self.particles:
-            particle.move()
-        self.bg_canvas.after(30, self.animate_particles)
+        self.scheduler.start()
+        if self.scheduler.low_power:
+            self.log_status("🐢 LOW-POWER ANIMATION MODE (remote session detected)")
 
     def animate_hero_text(self):
         subtitles = [
@@ -988,257 +1921,237 @@ class AdvancedPlagiarismDetectorGUI:
             
         # Disable scan button during analysis
         self.scan_btn.config(state='disabled')
+        self.coverage_label.config(text="")
         
         # Switch to analysis tab
         self.notebook.select(0)
+        self.clear_results()
         
-        # Start quantum animations
+        # Start quantum animations; background effects pause while the scan runs
         self.progress_bar.start_pulse()
         self.quantum_radar.start()
+        self.scheduler.set_scan_active(True)
         
         self.log_status("🚀 INITIATING QUANTUM PLAGIARISM ANALYSIS...")
         self.log_status("🔮 ACTIVATING NEURAL NETWORK PROCESSORS...")
         self.log_status("🌐 ENGAGING MULTI-DIMENSIONAL SOURCE SCANNING...")
-        self.clear_results()
         
         scan_thread = threading.Thread(target=self.run_detection)
         scan_thread.daemon = True
         scan_thread.start()
         
     def run_detection(self):
+        path = self.file_path.get()
+        job_id = None
         try:
-            self.detector.detect(self.file_path.get())
+            # Re-scanning a file after a crash picks up its finished stages. The job is
+            # leased to this window, so a --batch/--resume run on the same store leaves it alone
+            if self.job_store is not None:
+                job_id = self.job_store.add(path, claim=True)
+                if job_id is None:
+                    self.log_status("⚠️ ANOTHER WORKER IS SCANNING THIS FILE - RUNNING WITHOUT CHECKPOINTS")
+            report = self.detector.detect(path, JobCheckpoint(self.job_store, job_id) if job_id else None)
+            if job_id:
+                if report is None:
+                    self.job_store.fail(job_id, "no text extracted", retry=False)
+                else:
+                    self.job_store.complete(job_id)
+            if report is None:
+                # No results will arrive to reset the scan button and animations
+                self.bus.post("scan_failed", "no text extracted")
         except Exception as e:
+            if job_id:
+                # Not requeued: the user sees the failure and decides whether to scan again
+                self.job_store.fail(job_id, e, retry=False)
             self.log_status(f"❌ QUANTUM ANALYSIS FAILURE: {str(e)}")
-            self.progress_bar.stop_pulse()
-            self.quantum_radar.stop()
-            self.scan_btn.config(state='normal')
+            self.bus.post("scan_failed", str(e))
             
     def update_progress(self, message, value=None):
-        def update():
-            self.progress_label.config(text=message)
-            if value is not None:
-                self.progress_bar.set_value(value)
-            self.root.update_idletasks()
-            
-        self.root.after(0, update)
+        """Thread-safe: queue a progress update for the next UI frame"""
+        self.bus.post("progress", message, value)
+
+    def update_coverage(self, originality, coverage, sections):
+        """Thread-safe: queue the running originality score for the next UI frame"""
+        self.bus.post("coverage", originality, coverage, sections)
         
     def log_status(self, message):
-        def update():
-            self.terminal_text.config(state=tk.NORMAL)
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            self.terminal_text.insert(tk.END, f"[{timestamp}] {message}\n")
-            self.terminal_text.see(tk.END)
-            self.terminal_text.config(state=tk.DISABLED)
-            self.root.update_idletasks()
-            
-        self.root.after(0, update)
+        """Thread-safe: queue a console line for the next UI frame"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.bus.post("log", f"[{timestamp}] {message}")
         
     def display_results(self, report):
-        def update():
-            # Re-enable scan button
-            self.scan_btn.config(state='normal')
-            
-            # Stop animations
-            self.progress_bar.stop_pulse()
-            self.quantum_radar.stop()
-            
-            # Switch to results tab
-            self.notebook.select(1)
-            
-            # Calculate final verdict
-            verdict, certainty, top_match = self.calculate_verdict(report)
-            
-            # Display verdict
-            self.verdict_text.set(verdict)
-            self.certainty_text.set(certainty)
-            
-            # Display matches with modern formatting
-            self.display_modern_matches(report, top_match)
-            
-            # Display metrics
-            self.display_modern_metrics(report)
-            
-            # Display insights
-            self.display_modern_insights(report)
-            
-            # Generate visualizations
-            self.generate_advanced_visualizations(report)
-            
-            # Store current report
-            self.current_report = report
-            
-            # Final progress update
-            self.progress_bar.set_value(100)
-            self.progress_label.config(text="✅ QUANTUM ANALYSIS COMPLETE!")
-            
-            self.log_status("🎉 QUANTUM ANALYSIS SUCCESSFULLY COMPLETED!")
-            self.log_status("📊 NEURAL INSIGHTS READY FOR REVIEW")
-            
-        self.root.after(0, update)
+        """Thread-safe: hand a finished report to the main thread"""
+        self.bus.post("results", report)
+
+    def pump_messages(self):
+        """Drain the bus on the main thread, batching console lines and coalescing progress.
+
+        A handler that raises is logged and skipped; the next frame is always scheduled.
+        """
+        try:
+            lines = []
+            progress = coverage = None
+            for kind, payload in self.bus.drain():
+                if kind == "log":
+                    lines.append(payload[0])
+                elif kind == "progress":
+                    progress = payload
+                elif kind == "coverage":
+                    coverage = payload
+                else:
+                    # Results and failures must land after the lines logged before them
+                    self.run_handler("log", self.flush_log_lines, lines)
+                    lines = []
+                    self.run_handler(kind, self.handle_message, kind, payload)
+
+            self.run_handler("log", self.flush_log_lines, lines)
+            if progress is not None:
+                self.run_handler("progress", self.show_progress, *progress)
+            if coverage is not None:
+                self.run_handler("coverage", self.show_coverage, *coverage)
+        finally:
+            self.root.after(UI_FRAME_MS, self.pump_messages)
+
+    def run_handler(self, kind, handler, *args):
+        try:
+            handler(*args)
+        except Exception as e:
+            self.log_status(f"❌ UI UPDATE FAILED ({kind}): {str(e)}")
+
+    def handle_message(self, kind, payload):
+        if kind == "results":
+            self.show_results(payload[0])
+        elif kind == "scan_failed":
+            self.scan_failed()
+        elif kind == "models":
+            self.models_ready(*payload)
+
+    def show_progress(self, message, value):
+        self.progress_label.config(text=message)
+        if value is not None:
+            self.progress_bar.set_value(value)
+
+    def show_coverage(self, originality, coverage, sections):
+        worst = sorted(sections.items(), key=lambda item: item[1], reverse=True)[:3]
+        detail = ", ".join(f"{name} {share:.0%}" for name, share in worst if share > 0)
+        self.coverage_label.config(text=f"📊 LIVE ORIGINALITY: {originality}% ({coverage:.0%} OF TEXT MATCHED)"
+                                        + (f" - MOST COVERED: {detail}" if detail else ""))
+
+    def flush_log_lines(self, lines):
+        if not lines:
+            return
+        self.terminal_text.config(state=tk.NORMAL)
+        self.terminal_text.insert(tk.END, "\n".join(lines) + "\n")
+        excess = int(self.terminal_text.index('end-1c').split('.')[0]) - UI_MAX_LOG_LINES
+        if excess > 0:
+            self.terminal_text.delete('1.0', f'{excess + 1}.0')
+        self.terminal_text.see(tk.END)
+        self.terminal_text.config(state=tk.DISABLED)
+
+    def models_ready(self, summary, seconds):
+        self.model_status.set(summary)
+        self.log_status(f"🧠 AI MODELS {summary.upper()} ({seconds:.1f}s)")
+
+    def scan_failed(self):
+        self.progress_bar.stop_pulse()
+        self.quantum_radar.stop()
+        self.scheduler.set_scan_active(False)
+        self.scan_btn.config(state='normal')
+
+    def show_results(self, report):
+        # Re-enable scan button
+        self.scan_btn.config(state='normal')
+        
+        # Stop animations
+        self.progress_bar.stop_pulse()
+        self.quantum_radar.stop()
+        self.scheduler.set_scan_active(False)
+        
+        # Switch to results tab
+        self.notebook.select(1)
+        
+        # Calculate final verdict
+        verdict, certainty, top_match = self.calculate_verdict(report)
+        
+        # Display verdict
+        self.verdict_text.set(verdict)
+        self.certainty_text.set(certainty)
+        
+        # Display matches with modern formatting
+        self.display_modern_matches(report, top_match)
+        
+        # Display metrics
+        self.display_modern_metrics(report)
+        
+        # Display insights
+        self.display_modern_insights(report)
+        
+        # Generate visualizations
+        self.generate_advanced_visualizations(report)
+        
+        # Store current report
+        self.current_report = report
+        
+        # Final progress update
+        self.progress_bar.set_value(100)
+        self.progress_label.config(text="✅ QUANTUM ANALYSIS COMPLETE!")
         
-    def generate_advanced_visualizations(self, report):
-        """Generate advanced 3D visualizations and heatmaps"""
+        self.log_status("🎉 QUANTUM ANALYSIS SUCCESSFULLY COMPLETED!")
+        self.log_status("📊 NEURAL INSIGHTS READY FOR REVIEW")
+        
+    def generate_advanced_visualizations(self, report, dpi=CHART_PREVIEW_DPI, suffix=""):
+        """Queue heatmap, 3D network and timeline charts on the render process"""
         try:
             # Generate heatmap
-            self.generate_similarity_heatmap(report)
+            self.generate_similarity_heatmap(report, dpi, suffix)
             
             # Generate 3D network
-            self.generate_3d_network(report)
+            self.generate_3d_network(report, dpi, suffix)
             
             # Generate timeline
-            self.generate_timeline_visualization(report)
+            self.generate_timeline_visualization(report, dpi, suffix)
             
-            self.log_status("🎨 ADVANCED 3D VISUALIZATIONS GENERATED!")
+            self.log_status("🎨 ADVANCED 3D VISUALIZATIONS QUEUED FOR RENDERING")
         except Exception as e:
             self.log_status(f"⚠️ Visualization generation warning: {str(e)}")
+
+    def chart_rendered(self, label, path, error):
+        if error is not None:
+            self.log_status(f"⚠️ {label} generation error: {str(error)}")
+        else:
+            self.log_status(f"🖼️ {label} READY: {path}")
     
-    def generate_similarity_heatmap(self, report):
+    def generate_similarity_heatmap(self, report, dpi=CHART_PREVIEW_DPI, suffix=""):
         """Generate similarity heatmap visualization"""
-        try:
-            matches = report.get('matches', [])
-            if not matches:
-                return
-                
-            # Extract similarity scores
-            similarities = [match.get('similarity', 0) for match in matches]
-            sources = [match.get('source', 'Unknown') for match in matches]
-            
-            # Create heatmap data
-            fig, ax = plt.subplots(figsize=(12, 8))
-            
-            # Create color gradient based on similarity
-            colors = ['#00ff00', '#ffff00', '#ff0000']  # Green to Yellow to Red
-            cmap = mcolors.LinearSegmentedColormap.from_list("similarity", colors)
-            
-            # Create heatmap
-            y_pos = np.arange(len(similarities))
-            bars = ax.barh(y_pos, similarities, color=cmap(similarities))
-            
-            # Customize appearance
-            ax.set_yticks(y_pos)
-            ax.set_yticklabels(sources)
-            ax.set_xlabel('Similarity Score')
-            ax.set_title('Document Similarity Heatmap', fontsize=14, fontweight='bold', color='white')
-            ax.set_facecolor('#0a0a1a')
-            fig.patch.set_facecolor('#0a0a1a')
-            ax.tick_params(colors='white')
-            ax.spines['bottom'].set_color('white')
-            ax.spines['top'].set_color('white') 
-            ax.spines['right'].set_color('white')
-            ax.spines['left'].set_color('white')
-            
-            # Add value labels
-            for i, (bar, sim) in enumerate(zip(bars, similarities)):
-                ax.text(bar.get_width() + 0.01, bar.get_y() + bar.get_height()/2,
-                       f'{sim:.1%}', ha='left', va='center', color='white', fontweight='bold')
-            
-            plt.tight_layout()
-            plt.savefig('similarity_heatmap.png', dpi=300, bbox_inches='tight', 
-                       facecolor='#0a0a1a', edgecolor='none')
-            plt.close()
-            
-        except Exception as e:
-            print(f"Heatmap generation error: {str(e)}")
+        if not report.get('matches'):
+            return
+        CHART_RENDERER.submit("heatmap", report, f"similarity_heatmap{suffix}.png", dpi,
+                              lambda path, err: self.chart_rendered("HEATMAP", path, err))
     
-    def generate_3d_network(self, report):
+    def generate_3d_network(self, report, dpi=CHART_PREVIEW_DPI, suffix=""):
         """Generate 3D network visualization"""
-        try:
-            matches = report.get('matches', [])
-            if len(matches) < 2:
-                return
-                
-            fig = plt.figure(figsize=(12, 8))
-            ax = fig.add_subplot(111, projection='3d')
-            
-            # Create 3D scatter plot
-            similarities = [match.get('similarity', 0) for match in matches]
-            sources = [match.get('source', 'Unknown') for match in matches]
-            
-            # Generate 3D coordinates
-            x = np.random.rand(len(matches)) * 10
-            y = np.random.rand(len(matches)) * 10
-            z = np.array(similarities) * 10
-            
-            # Create color map based on similarity
-            colors = plt.cm.viridis(np.array(similarities))
-            
-            # Plot points
-            scatter = ax.scatter(x, y, z, c=similarities, cmap='viridis', s=100, alpha=0.7)
-            
-            # Add labels
-            for i, (xi, yi, zi, source) in enumerate(zip(x, y, z, sources)):
-                ax.text(xi, yi, zi, source, fontsize=8, color='white')
-            
-            # Customize 3D plot
-            ax.set_xlabel('X Axis')
-            ax.set_ylabel('Y Axis')
-            ax.set_zlabel('Similarity')
-            ax.set_title('3D Similarity Network', color='white', fontweight='bold')
-            ax.set_facecolor('#0a0a1a')
-            fig.patch.set_facecolor('#0a0a1a')
-            ax.tick_params(colors='white')
-            ax.grid(True, alpha=0.3)
-            
-            # Add colorbar
-            cbar = plt.colorbar(scatter, ax=ax)
-            cbar.set_label('Similarity Score', color='white')
-            cbar.ax.yaxis.set_tick_params(color='white')
-            plt.setp(plt.getp(cbar.ax.axes, 'yticklabels'), color='white')
-            
-            plt.tight_layout()
-            plt.savefig('3d_network.png', dpi=300, bbox_inches='tight', 
-                       facecolor='#0a0a1a', edgecolor='none')
-            plt.close()
-            
-        except Exception as e:
-            print(f"3D Network generation error: {str(e)}")
+        if len(report.get('matches', [])) < 2:
+            return
+        CHART_RENDERER.submit("3d_network", report, f"3d_network{suffix}.png", dpi,
+                              lambda path, err: self.chart_rendered("3D NETWORK", path, err))
     
-    def generate_timeline_visualization(self, report):
+    def generate_timeline_visualization(self, report, dpi=CHART_PREVIEW_DPI, suffix=""):
         """Generate timeline visualization"""
-        try:
-            matches = report.get('matches', [])
-            if not matches:
-                return
-                
-            fig, ax = plt.subplots(figsize=(12, 6))
-            
-            # Create timeline data
-            sources = [match.get('source', 'Unknown') for match in matches]
-            similarities = [match.get('similarity', 0) for match in matches]
-            
-            # Create timeline positions
-            y_pos = np.arange(len(sources))
-            
-            # Create gradient bars
-            colors = plt.cm.RdYlGn_r(np.array(similarities))  # Red to Green (reversed)
-            bars = ax.barh(y_pos, similarities, color=colors, alpha=0.8)
-            
-            # Customize timeline
-            ax.set_yticks(y_pos)
-            ax.set_yticklabels(sources)
-            ax.set_xlabel('Similarity Score')
-            ax.set_title('Document Analysis Timeline', color='white', fontweight='bold')
-            ax.set_facecolor('#0a0a1a')
-            fig.patch.set_facecolor('#0a0a1a')
-            ax.tick_params(colors='white')
-            ax.spines['bottom'].set_color('white')
-            ax.spines['top'].set_color('white') 
-            ax.spines['right'].set_color('white')
-            ax.spines['left'].set_color('white')
-            
-            # Add value annotations
-            for i, (bar, sim) in enumerate(zip(bars, similarities)):
-                ax.text(bar.get_width() + 0.01, bar.get_y() + bar.get_height()/2,
-                       f'{sim:.1%}', ha='left', va='center', color='white', fontweight='bold')
-            
-            plt.tight_layout()
-            plt.savefig('timeline_analysis.png', dpi=300, bbox_inches='tight',
-                       facecolor='#0a0a1a', edgecolor='none')
-            plt.close()
-            
-        except Exception as e:
-            print(f"Timeline generation error: {str(e)}")
+        if not report.get('matches'):
+            return
+        CHART_RENDERER.submit("timeline", report, f"timeline_analysis{suffix}.png", dpi,
+                              lambda path, err: self.chart_rendered("TIMELINE", path, err))
+
+    def export_charts(self):
+        """Render every chart of the current report at full resolution"""
+        if not self.current_report:
+            messagebox.showinfo("📤 EXPORT", "Run a scan before exporting charts.")
+            return
+        suffix = f"_{int(time.time())}"
+        self.log_status(f"📤 EXPORTING CHARTS AT {CHART_EXPORT_DPI} DPI...")
+        self.generate_advanced_visualizations(self.current_report, CHART_EXPORT_DPI, suffix)
+        CHART_RENDERER.submit("overview", self.current_report, f"forensic_viz{suffix}.png", CHART_EXPORT_DPI,
+                              lambda path, err: self.chart_rendered("OVERVIEW", path, err))
     
     def display_modern_matches(self, report, top_match):
         self.matches_text.config(state=tk.NORMAL)
@@ -1247,6 +2160,19 @@ class AdvancedPlagiarismDetectorGUI:
         # Modern header
         self.matches_text.insert(tk.END, f"🎯 QUANTUM ORIGINALITY SCORE: {report['originality_score']}%\n", 'header')
         self.matches_text.insert(tk.END, f"🔍 MULTI-DIMENSIONAL MATCHES: {report['matches_found']}\n\n", 'subheader')
+
+        coverage = report.get('coverage') or {}
+        if coverage.get('sections'):
+            self.matches_text.insert(tk.END, f"🧮 TEXT COVERED BY MATCHES: {coverage['coverage'] * 100:.1f}%\n", 'highlight')
+            for section, share in coverage['sections'].items():
+                self.matches_text.insert(tk.END, f"• {section}: {share * 100:.1f}%\n", 'high' if share > 0.5 else 'value')
+            self.matches_text.insert(tk.END, "\n")
+        
+        failed = {k: v for k, v in report.get('source_status', {}).items() if v.get('status') != 'ok'}
+        for source, status in failed.items():
+            self.matches_text.insert(tk.END, f"⛔ SOURCE {status['status'].upper()}: {source} - {status.get('last_error') or 'no response'}\n", 'high')
+        if failed:
+            self.matches_text.insert(tk.END, "   Results from these sources may be incomplete.\n\n")
         
         if top_match:
             self.matches_text.insert(tk.END, "🏆 QUANTUM TOP MATCH:\n", 'highlight')
@@ -1273,6 +2199,12 @@ class AdvancedPlagiarismDetectorGUI:
                 self.matches_text.insert(tk.END, f"{source} ", 'source')
                 self.matches_text.insert(tk.END, f"({similarity:.1f}%): ", color_tag)
                 self.matches_text.insert(tk.END, f"{title}\n")
+                spans = match.get('spans', [])
+                if spans:
+                    first = spans[0]
+                    source_chars = f"↔ source chars {first['source_start']}-{first['source_end']} " if "source_start" in first else ""
+                    self.matches_text.insert(tk.END, f"   🔗 {len(spans)} passage(s), e.g. document chars {first['start']}-{first['end']} "
+                                                     f"{source_chars}({first['kind']})\n")
         else:
             self.matches_text.insert(tk.END, "✅ QUANTUM ORIGINALITY CONFIRMED - NO SIGNIFICANT MATCHES!\n", 'success')
             
@@ -1479,37 +2411,2165 @@ Powered by quantum computing and advanced neural analysis.
 """
         messagebox.showinfo("About Quantum Detector v4.0", about_text)
 
-class LitePlagiarismDetector:
-    def __init__(self, gui=None):
-        self.gui = gui
-        print("\n🔍 Quantum Plagiarism Detector Ready 🚀")
-        self.setup_nltk()
-        self.authorship_patterns = {}
+class PageContentExtractor:
+    """Streamed page download and single-pass main-content extraction"""
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    }
+    NOISE_TAGS = ["script", "style", "nav", "header", "footer", "aside", "form", "noscript"]
+    MAIN_TAGS = ("article", "main")
+
+    def __init__(self, max_bytes=PAGE_MAX_BYTES, parser=HTML_PARSER):
+        self.max_bytes = max_bytes
+        self.parser = parser
+
+    def is_html(self, content_type):
+        # Plenty of servers omit the header, so only reject what is clearly not a page
+        if not content_type:
+            return True
+        return content_type.split(";")[0].strip().lower() in HTML_CONTENT_TYPES
+
+    def fetch(self, url, timeout=PAGE_TIMEOUT, budget=None):
+        """Download at most max_bytes of a page; returns None for non-HTML content"""
+        if budget is not None:
+            return budget.run(self.download, url, budget.timeout(timeout), budget)
+        return self.download(url, timeout)
+
+    def download(self, url, timeout, budget=None):
+        response = requests.get(url, headers=self.HEADERS, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+            if not self.is_html(response.headers.get("Content-Type")):
+                return None
+
+            body = bytearray()
+            for chunk in response.iter_content(PAGE_CHUNK_BYTES):
+                if budget is not None and budget.expired():
+                    return None  # Abandoned by fetch(); stop reading
+                body += chunk
+                if len(body) >= self.max_bytes:
+                    del body[self.max_bytes:]
+                    break
+            return bytes(body)
+        finally:
+            response.close()
+
+    def extract(self, html):
+        """Return (title, text) of the main content block"""
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, self.parser)
+        title = soup.title.string.strip() if soup.title and soup.title.string else ""
+
+        for tag in soup(self.NOISE_TAGS):
+            tag.decompose()
+
+        block = self.find_main_block(soup)
+        text = block.get_text(" ", strip=True) if block is not None else ""
+        # The tree is full of parent/child cycles; break them now rather than wait for the cycle collector
+        soup.decompose()
+        return title, re.sub(r'\s+', ' ', text).strip()
+
+    def is_candidate(self, tag):
+        if tag.name in self.MAIN_TAGS:
+            return True
+        hints = " ".join(tag.get("class") or []) + " " + (tag.get("id") or "")
+        return bool(CONTENT_HINT_REGEX.search(hints))
+
+    def find_main_block(self, soup):
+        """Pick the single best content container from one walk over the text nodes.
+
+        Every text node credits its length to the content-like containers above it,
+        so nested matches (article > div.content) are scored once instead of being
+        extracted twice. The tightest container holding most of the text wins.
+        """
+        from bs4 import NavigableString
+        candidate = {}
+        lengths = {}
+        nodes = {}
+        for string in soup.find_all(string=True):
+            if type(string) is not NavigableString:
+                continue  # comments, doctypes, CDATA
+            size = len(string.strip())
+            if not size:
+                continue
+            for parent in string.parents:
+                key = id(parent)
+                if key not in candidate:
+                    candidate[key] = parent.name is not None and parent.name != "[document]" and self.is_candidate(parent)
+                if candidate[key]:
+                    lengths[key] = lengths.get(key, 0) + size
+                    nodes[key] = parent
+
+        if lengths:
+            best_key = max(lengths, key=lengths.get)
+            best_len = lengths[best_key]
+            if best_len > 100:
+                # Prefer a nested container that still holds nearly all of the text
+                tight = [k for k, n in lengths.items() if n >= best_len * 0.85]
+                best_key = max(tight, key=lambda k: len(list(nodes[k].parents)))
+                return nodes[best_key]
+
+        return soup.body or soup
+
+class QueryPlanner:
+    """Plans a small set of outbound search queries that covers every segment.
+
+    Key phrases are ranked by TF-IDF across all segments at once, segments whose
+    key phrases overlap are folded into one query. A source whose request
+    budget (by default the query_budget each registered scanner that searches
+    segment queries declares) is
+    smaller than the plan gets the weakest queries folded into their closest
+    neighbour until it fits, so every segment is still searched for.
+    """
+    WORD_REGEX = re.compile(r"[A-Za-z][A-Za-z'-]+")
+    FIT_PHRASES = 200  # Phrase scores a folded query keeps; far more than QUERY_MAX_WORDS ever uses
+
+    def __init__(self, segments, top_phrases=8, budgets=None):
+        self.segments = segments
+        self.top_phrases = top_phrases
+        self.budgets = budgets or {name: scanner.query_budget for name, scanner in SCANNERS.items() if scanner.segment_queries}
+        self.doc_scores = Counter()
+        self.ranked = [self.rank_phrases(c, df) for c, df in self.count_phrases()]
+        self.groups = self.merge_segments()
+        self.fitted = {}
+
+    def ngrams(self, text):
+        words = [w.lower() for w in self.WORD_REGEX.findall(text)]
+        lo, hi = KEYPHRASE_NGRAMS
+        grams = []
+        for n in range(lo, hi + 1):
+            for i in range(len(words) - n + 1):
+                gram = words[i:i + n]
+                if gram[0] in STOPWORDS or gram[-1] in STOPWORDS:
+                    continue
+                if n == 1 and len(gram[0]) < 4:
+                    continue
+                grams.append(" ".join(gram))
+        return grams
+
+    def count_phrases(self):
+        counts = [Counter(self.ngrams(seg.text)) for seg in self.segments]
+        df = Counter()
+        for c in counts:
+            df.update(c.keys())
+        return [(c, df) for c in counts]
+
+    def rank_phrases(self, counts, df):
+        n_docs = len(self.segments)
+        total = sum(counts.values()) or 1
+        scores = {}
+        for gram, tf in counts.items():
+            idf = math.log((1 + n_docs) / (1 + df[gram])) + 1
+            # Longer n-grams are more distinctive search terms
+            scores[gram] = (tf / total) * idf * len(gram.split())
+        self.doc_scores.update(scores)
+        return self.pick(scores, self.top_phrases)
+
+    def pick(self, scores, limit, max_words=None):
+        """Take the best phrases, skipping ones mostly covered by a chosen phrase"""
+        chosen = []
+        covered = set()
+        words_used = 0
+        for gram, score in sorted(scores.items(), key=lambda kv: kv[1], reverse=True):
+            words = set(gram.split())
+            if len(words & covered) * 2 > len(words):
+                continue
+            if max_words and words_used + len(words) > max_words:
+                continue
+            chosen.append((gram, score))
+            covered |= words
+            words_used += len(words)
+            if len(chosen) >= limit or (max_words and words_used >= max_words):
+                break
+        return chosen
 
-    def log(self, message):
-        if self.gui:
-            self.gui.log_status(message)
-        print(message)
+    def merge_segments(self):
+        groups = []
+        for idx, phrases in enumerate(self.ranked):
+            words = {w for gram, _ in phrases for w in gram.split()}
+            if not words:
+                continue
+            best, best_overlap = None, 0.0
+            for group in groups:
+                if len(group["members"]) >= QUERY_GROUP_SIZE:
+                    continue
+                overlap = len(words & group["words"]) / len(words | group["words"])
+                if overlap > best_overlap:
+                    best, best_overlap = group, overlap
+            if best is not None and best_overlap >= QUERY_MERGE_OVERLAP:
+                best["members"].append(idx)
+                best["words"] |= words
+            else:
+                groups.append({"members": [idx], "words": words})
+
+        return self.combine(filter(None, (self.make_entry(group["members"]) for group in groups)))
+
+    def make_entry(self, members, scores=None):
+        """Planned query for the segments at these indexes (scores: their summed phrase scores), None without key phrases"""
+        if scores is None:
+            scores = Counter()
+            for idx in members:
+                scores.update(dict(self.ranked[idx]))
+        phrases = self.pick(scores, limit=len(scores), max_words=QUERY_MAX_WORDS)
+        if not phrases:
+            return None
+        segments = [self.segments[idx] for idx in members]
+        # Overlapping phrases share words; each goes in once
+        terms = list(dict.fromkeys(w for gram, _ in phrases for w in gram.split()))[:QUERY_MAX_WORDS]
+        return {
+            "query": " ".join(terms),
+            "score": round(sum(score for _, score in phrases), 4),
+            "segment_ids": [seg.segment_id for seg in segments],
+            "segments": segments,
+            "members": list(members),
+            "phrase_scores": scores
+        }
 
-    def update_progress(self, message, value=None):
-        if self.gui:
-            self.gui.update_progress(message, value)
+    def combine(self, entries):
+        """Entries whose queries use the same words become one entry for all their segments, best first"""
+        by_key = {}
+        for entry in entries:
+            key = " ".join(sorted(set(entry["query"].split())))
+            kept = by_key.get(key)
+            if kept is None:
+                by_key[key] = entry
+                continue
+            members = kept["members"] + entry["members"]
+            by_key[key] = dict(kept, members=members, segments=[self.segments[idx] for idx in members],
+                               segment_ids=[self.segments[idx].segment_id for idx in members])
+        return sorted(by_key.values(), key=lambda p: p["score"], reverse=True)
+
+    def plan(self, source):
+        """Queries for a source, folded down to its request budget"""
+        budget = self.budgets.get(source)
+        if budget is None or len(self.groups) <= budget:
+            return self.groups
+        if budget not in self.fitted:
+            self.fitted[budget] = self.fit(budget)
+        return self.fitted[budget]
+
+    def fit(self, budget):
+        """Fold the weakest query into the one sharing most of its words until budget queries remain"""
+        plan = [dict(p, phrase_scores=Counter(p["phrase_scores"])) for p in self.groups]  # Scores are summed in place
+        words = [set(p["query"].split()) for p in plan]
+        while len(plan) > max(1, budget):
+            weakest, weakest_words = plan.pop(), words.pop()
+            i = max(range(len(plan)), key=lambda k: len(weakest_words & words[k]))
+            target = plan.pop(i)
+            del words[i]
+            scores = target["phrase_scores"]
+            scores.update(weakest["phrase_scores"])
+            if len(scores) > 2 * self.FIT_PHRASES:
+                scores = Counter(dict(scores.most_common(self.FIT_PHRASES)))
+            entry = self.make_entry(target["members"] + weakest["members"], scores)
+            entry_words = set(entry["query"].split())
+            same = next((k for k, w in enumerate(words) if w == entry_words), None)
+            if same is not None:
+                # Same query as another entry: that entry takes these segments too
+                entry = self.combine([plan.pop(same), entry])[0]
+                del words[same]
+            # Keep the plan ordered by score, best first
+            k = next((k for k, p in enumerate(plan) if p["score"] < entry["score"]), len(plan))
+            plan.insert(k, entry)
+            words.insert(k, entry_words)
+        return plan
+
+    def folded(self):
+        """{source: planned queries folded together to fit its budget}"""
+        return {source: len(self.groups) - len(self.plan(source)) for source in self.budgets
+                if len(self.plan(source)) < len(self.groups)}
+
+    def keyphrases(self, limit=6):
+        """Document-level key phrases, e.g. for title searches"""
+        return [gram for gram, _ in self.pick(self.doc_scores, limit)]
+
+    def summary(self):
+        return {source: len(self.plan(source)) for source in self.budgets}
+
+class SourceUnavailable(Exception):
+    """Raised when a source is rate limited or its circuit is open"""
+
+class BudgetExhausted(Exception):
+    """Raised when a document's scan budget runs out before or during a request; matches found by then ride along"""
+    matches = ()
+
+class ScanBudget:
+    """One wall-clock deadline for a document's requests; overdue ones are abandoned on their pool thread, not waited for"""
+    pool = None
+    pool_lock = threading.Lock()
+
+    def __init__(self, seconds=SCAN_BUDGET):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self):
+        return self.remaining() < SCAN_MIN_REQUEST
+
+    def timeout(self, cap):
+        """A request timeout that does not outlive the budget"""
+        if self.expired():
+            raise BudgetExhausted(f"scan budget of {self.seconds}s used up")
+        return min(cap, self.remaining())
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn, giving up with BudgetExhausted when the deadline passes first"""
+        if self.expired():
+            raise BudgetExhausted(f"scan budget of {self.seconds}s used up")
+        with ScanBudget.pool_lock:
+            if ScanBudget.pool is None:
+                ScanBudget.pool = ThreadPoolExecutor(max_workers=SCAN_BUDGET_WORKERS, thread_name_prefix="scan")
+        future = ScanBudget.pool.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.remaining())
+        except FutureTimeout:
+            raise BudgetExhausted(f"scan budget of {self.seconds}s used up") from None
+
+class TokenBucket:
+    """Token bucket that halves its rate when throttled and creeps back on success"""
+    def __init__(self, rate, burst):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self, now):
+        """Take a token if one is free; otherwise return the seconds to wait"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def slow_down(self, now, retry_after=None):
+        self.rate = max(self.base_rate / 16, self.rate / 2)
+        self.tokens = 0.0
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def recover(self):
+        self.rate = min(self.base_rate, self.rate * 1.25)
+
+class CircuitBreaker:
+    """Opens after repeated failures, then lets a single probe through once the cooldown ends"""
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN, max_cooldown=BREAKER_MAX_COOLDOWN):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        self.probing = False
+
+    def allow(self, now):
+        if self.state == self.OPEN and now >= self.opened_until:
+            self.state = self.HALF_OPEN
+            self.probing = False
+        if self.state == self.OPEN:
+            return False
+        if self.state == self.HALF_OPEN:
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probing = False
+        self.cooldown = self.base_cooldown
+
+    def record_failure(self, now, retry_after=None):
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            # Failed probe: stay open for longer next time
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+        elif self.failures < self.threshold:
+            return
+        self.state = self.OPEN
+        self.probing = False
+        self.opened_until = now + max(self.cooldown, retry_after or 0)
+
+class SourceLimiter:
+    """Process-wide rate limiting and circuit breaking for outbound sources.
+
+    One instance is shared by every scan in the process, so concurrent scans
+    draw from the same token buckets and see the same open circuits.
+    """
+    def __init__(self, limits):
+        self.limits = dict(limits)
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.breakers = {}
+
+    def get_bucket(self, source):
+        if source not in self.buckets:
+            rate, burst = self.limits.get(source, (2.0, 5))
+            self.buckets[source] = TokenBucket(rate, burst)
+            self.breakers[source] = CircuitBreaker()
+        return self.buckets[source], self.breakers[source]
+
+    def acquire(self, source, max_wait=RATE_LIMIT_MAX_WAIT, budget=None):
+        deadline = time.monotonic() + max_wait
+        with self.lock:
+            _, breaker = self.get_bucket(source)
+            if not breaker.allow(time.monotonic()):
+                raise SourceUnavailable(f"{source} circuit open")
+        while True:
+            with self.lock:
+                bucket, _ = self.get_bucket(source)
+                now = time.monotonic()
+                wait = bucket.reserve(now)
+            if wait <= 0:
+                return
+            out_of_budget = budget is not None and wait > budget.remaining()
+            if now + wait > deadline or out_of_budget:
+                with self.lock:
+                    # Hand back a half-open probe we are not going to use
+                    self.breakers[source].probing = False
+                if out_of_budget:
+                    raise BudgetExhausted(f"{source} rate limit wait exceeds the scan budget")
+                raise SourceUnavailable(f"{source} rate limited")
+            time.sleep(wait)
+
+    def record_success(self, source):
+        with self.lock:
+            bucket, breaker = self.get_bucket(source)
+            bucket.recover()
+            breaker.record_success()
+
+    def record_failure(self, source, retry_after=None, throttled=False):
+        with self.lock:
+            bucket, breaker = self.get_bucket(source)
+            now = time.monotonic()
+            if throttled or retry_after:
+                bucket.slow_down(now, retry_after)
+            breaker.record_failure(now, retry_after)
+
+    def state(self, source):
+        with self.lock:
+            return self.get_bucket(source)[1].state
+
+    def available(self, source):
+        """False while the circuit is open and its cooldown has not run out"""
+        with self.lock:
+            breaker = self.get_bucket(source)[1]
+            return breaker.state != CircuitBreaker.OPEN or time.monotonic() >= breaker.opened_until
+
+    def parse_retry_after(self, value):
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(parsedate_to_datetime(value).tzinfo)).total_seconds())
+        except Exception:
+            return None
 
-    # ---------------- NLTK SETUP ----------------
-    def setup_nltk(self):
-        if NLTK_AVAILABLE:
+    def call(self, source, fn, *args, budget=None, **kwargs):
+        """Run fn under the source's limits (for client libraries such as DDGS)"""
+        if budget is None:
+            self.acquire(source)
+            return self.invoke(source, fn, *args, **kwargs)
+        self.acquire(source, budget=budget)
+        return budget.run(self.invoke, source, fn, *args, **kwargs)
+
+    def invoke(self, source, fn, *args, **kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(source, throttled="ratelimit" in type(e).__name__.lower())
+            raise
+        self.record_success(source)
+        return result
+
+    def get(self, source, url, budget=None, **kwargs):
+        """requests.get under the source's limits and budget; 429 and 5xx count as failures and raise HTTPError"""
+        return self.request("GET", source, url, budget, **kwargs)
+
+    def post(self, source, url, budget=None, **kwargs):
+        """requests.post under the source's limits, as get()"""
+        return self.request("POST", source, url, budget, **kwargs)
+
+    def request(self, method, source, url, budget=None, **kwargs):
+        if budget is None:
+            self.acquire(source)
+            return self.fetch(method, source, url, **kwargs)
+        kwargs["timeout"] = budget.timeout(kwargs.get("timeout") or PAGE_TIMEOUT)
+        self.acquire(source, budget=budget)
+        return budget.run(self.fetch, method, source, url, **kwargs)
+
+    def fetch(self, method, source, url, **kwargs):
+        try:
+            r = requests.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.record_failure(source)
+            raise
+        if r.status_code == 429 or r.status_code >= 500:
+            retry_after = self.parse_retry_after(r.headers.get("Retry-After"))
+            self.record_failure(source, retry_after, throttled=r.status_code in (429, 503))
+            if retry_after is not None and retry_after > RATE_LIMIT_MAX_WAIT:
+                raise SourceUnavailable(f"{source} asked to retry after {retry_after:.0f}s")
+            # One bad answer fails only this request; the breaker decides when the source is down
+            raise requests.HTTPError(f"{source} returned HTTP {r.status_code}", response=r)
+        self.record_success(source)
+        return r
+
+SOURCE_LIMITER = SourceLimiter(SOURCE_RATE_LIMITS)
+
+class Segment:
+    """One analysis unit, kept as offsets into the document text rather than a copy of it.
+
+    A segment that could not be located in the document (located False)
+    holds its own text as the buffer instead.
+    """
+    __slots__ = ("segment_id", "section", "buffer", "start", "end", "located")
+
+    def __init__(self, segment_id, section, buffer, start=0, end=None, located=True):
+        self.segment_id = segment_id
+        self.section = section
+        self.buffer = buffer
+        self.start = start
+        self.end = len(buffer) if end is None else end
+        self.located = located
+
+    @classmethod
+    def locate(cls, segment_id, section, text, document, cursor=0):
+        start = document.find(text, cursor)
+        if start < 0:
+            start = document.find(text)
+        if start < 0:
+            return cls(segment_id, section, text, located=False)
+        return cls(segment_id, section, document, start, start + len(text))
+
+    @classmethod
+    def from_json(cls, record, document):
+        if record.get("start", -1) >= 0:
+            return cls(record["segment_id"], record["section"], document, record["start"], record["end"])
+        return cls(record["segment_id"], record["section"], record.get("text", ""), located=False)
+
+    @property
+    def text(self):
+        return self.buffer[self.start:self.end]
+
+    def span(self):
+        """[start, end] in the document, [-1, -1] when not located"""
+        return [self.start, self.end] if self.located else [-1, -1]
+
+    def to_json(self):
+        start, end = self.span()
+        return {"segment_id": self.segment_id, "section": self.section, "text": self.text, "start": start, "end": end}
+
+class WindowHashes:
+    """Rabin-Karp window digests as (digest, start, end) rows over the text they came from"""
+    __slots__ = ("buffer", "rows")
+
+    def __init__(self, buffer, rows):
+        self.buffer = buffer
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def to_json(self):
+        """[hex digest, window text] per window, the report's original shape"""
+        return [[bytes(digest).hex(), " ".join(self.buffer[start:end].split())]
+                for digest, start, end in self.rows.tolist()]
+
+    def offsets(self):
+        return [[bytes(digest).hex(), start, end] for digest, start, end in self.rows.tolist()]
+
+class HeatmapRow:
+    """Heatmap entry for one segment; its text preview is cut from the document when serialised"""
+    __slots__ = ("segment_id", "buffer", "start", "end", "located", "similarity", "risk_level", "color", "matches")
+
+    def __init__(self, segment_id, buffer, start, end, located, similarity, risk_level, color, matches):
+        self.segment_id = segment_id
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+        self.located = located
+        self.similarity = similarity
+        self.risk_level = risk_level
+        self.color = color
+        self.matches = matches
+
+    def to_json(self, preview=True):
+        row = {"segment_id": self.segment_id}
+        if preview:
+            row["text_preview"] = self.buffer[self.start:min(self.end, self.start + 100)] + "..."
+        row.update({
+            "start": self.start if self.located else -1,
+            "end": self.end if self.located else -1,
+            "similarity": self.similarity,
+            "risk_level": self.risk_level,
+            "color": self.color,
+            "matches": self.matches
+        })
+        return row
+
+class Fingerprinter:
+    """Winnowed word k-gram fingerprints with character offsets"""
+    WORD_REGEX = re.compile(r"\w+")
+
+    def __init__(self, k=FINGERPRINT_K, window=FINGERPRINT_WINDOW):
+        self.k = k
+        self.window = window
+
+    def shingles(self, text):
+        """FINGERPRINT_DTYPE array of (hash, char offset) for every k-word shingle"""
+        words = [(m.group(0).lower(), m.start()) for m in self.WORD_REGEX.finditer(text)]
+        if len(words) < self.k:
+            rows = [(zlib.crc32(" ".join(w for w, _ in words).encode()), 0)] if words else []
+        else:
+            rows = [
+                (zlib.crc32(" ".join(w for w, _ in words[i:i + self.k]).encode()), words[i][1])
+                for i in range(len(words) - self.k + 1)
+            ]
+        return np.array(rows, dtype=FINGERPRINT_DTYPE)
+
+    def shingle_end(self, text, start):
+        """Character offset just past the k-word shingle that starts at start"""
+        end = start
+        for i, m in enumerate(self.WORD_REGEX.finditer(text, start)):
+            end = m.end()
+            if i + 1 >= self.k:
+                break
+        return end
+
+    def fingerprints(self, text):
+        """Winnowing: keep the minimum hash of every window of shingles (a FINGERPRINT_DTYPE array)"""
+        shingles = self.shingles(text)
+        if len(shingles) <= self.window:
+            return shingles[[shingles["hash"].argmin()]] if len(shingles) else shingles
+
+        windows = np.lib.stride_tricks.sliding_window_view(shingles["hash"], self.window)
+        # Rightmost minimum, so runs of equal hashes are recorded once
+        picks = np.arange(len(windows)) + self.window - 1 - windows[:, ::-1].argmin(axis=1)
+        keep = np.concatenate(([True], picks[1:] != picks[:-1]))
+        return shingles[picks[keep]]
+
+class PassageAligner:
+    """Seed-and-extend alignment of a submission against one source text.
+
+    Seeds are the k-word runs both texts share, found through a dict of the
+    source's k-grams. Seeds that follow each other within gap words on both
+    sides are chained into one passage, so light edits do not split it, and
+    each passage is then extended word by word past its ends. Cost is linear
+    in the two texts plus the number of seeds.
+    """
+    WORD_REGEX = re.compile(r"\w+")
+
+    def __init__(self, k=ALIGN_SEED_WORDS, gap=ALIGN_GAP_WORDS, min_words=ALIGN_MIN_WORDS,
+                 max_occurrences=ALIGN_MAX_OCCURRENCES):
+        self.k = k
+        self.gap = gap
+        self.min_words = min_words
+        self.max_occurrences = max_occurrences
+
+    def words(self, text):
+        """(lowercased word, start, end) for every word"""
+        return [(m.group(0).lower(), m.start(), m.end()) for m in self.WORD_REGEX.finditer(text or "")]
+
+    def seeds(self, a, b):
+        """(i, j) word positions where a and b share k words, ordered by i"""
+        k = self.k
+        index = {}
+        b_words = [w for w, _, _ in b]
+        for j in range(len(b) - k + 1):
+            index.setdefault(tuple(b_words[j:j + k]), []).append(j)
+        a_words = [w for w, _, _ in a]
+        out = []
+        for i in range(len(a) - k + 1):
+            js = index.get(tuple(a_words[i:i + k]))
+            if js and len(js) <= self.max_occurrences:
+                out.extend((i, j) for j in js)
+        return out
+
+    def chain(self, seeds):
+        """Group seeds into [i_first, j_first, i_last, j_last] passages"""
+        chains, active = [], []
+        for i, j in seeds:
+            active = [c for c in active if i - c[2] <= self.gap]
+            for c in active:
+                di, dj = i - c[2], j - c[3]
+                if 0 < di and 0 < dj <= self.gap and abs(di - dj) <= ALIGN_MAX_SHIFT:
+                    c[2], c[3] = i, j
+                    break
+            else:
+                c = [i, j, i, j]
+                chains.append(c)
+                active.append(c)
+        return chains
+
+    def align(self, text, source, text_words=None):
+        """Matched passages as dicts of character offsets in text (start/end) and source"""
+        a = text_words if text_words is not None else self.words(text)
+        b = self.words(source)
+        if len(a) < self.k or len(b) < self.k:
+            return []
+
+        passages = []
+        for i0, j0, i1, j1 in self.chain(self.seeds(a, b)):
+            i1, j1 = i1 + self.k, j1 + self.k  # exclusive word ends
+            while i0 > 0 and j0 > 0 and a[i0 - 1][0] == b[j0 - 1][0]:
+                i0, j0 = i0 - 1, j0 - 1
+            while i1 < len(a) and j1 < len(b) and a[i1][0] == b[j1][0]:
+                i1, j1 = i1 + 1, j1 + 1
+            if i1 - i0 >= self.min_words:
+                passages.append((i0, i1, j0, j1))
+
+        # A repeated source phrase can align one stretch of text twice; keep the longest
+        kept = []
+        for i0, i1, j0, j1 in sorted(passages, key=lambda p: p[0] - p[1]):
+            if all(i1 <= k0 or i0 >= k1 for k0, k1, _, _ in kept):
+                kept.append((i0, i1, j0, j1))
+        return [{
+            "start": a[i0][1], "end": a[i1 - 1][2],
+            "source_start": b[j0][1], "source_end": b[j1 - 1][2],
+            "words": i1 - i0
+        } for i0, i1, j0, j1 in sorted(kept)]
+
+class PageStore:
+    """Local store of cleaned page text, keyed by URL and content hash.
+
+    Text is kept zlib-compressed next to its precomputed embedding and
+    fingerprints, so a fresh hit needs no download, parsing or encoding.
+    Entries expire after ttl seconds (URLs without usable content after
+    negative_ttl) and the least recently used pages are evicted once the
+    store grows past max_bytes.
+    """
+    def __init__(self, path=PAGE_STORE_PATH, ttl=PAGE_STORE_TTL, max_bytes=PAGE_STORE_MAX_BYTES,
+                 negative_ttl=PAGE_STORE_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_bytes = max_bytes
+        self.writes = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, content_hash TEXT, fetched_at REAL)")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS pages (
+                content_hash TEXT PRIMARY KEY, title TEXT, text BLOB, embedding BLOB, embedder TEXT,
+                fingerprints BLOB, size INTEGER, last_access REAL)""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS pages_lru ON pages(last_access)")
             try:
-                nltk.data.find('tokenizers/punkt')
-                nltk.data.find('taggers/averaged_perceptron_tagger')
-                nltk.data.find('corpora/stopwords')
-            except LookupError:
-                self.log("⚠️  Downloading NLTK resources...")
+                # Stores from before chunked embeddings
+                self.conn.execute("ALTER TABLE pages ADD COLUMN chunk_spans BLOB")
+            except sqlite3.OperationalError:
+                pass
+        self.size = self.count_size()
+
+    def count_size(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    @staticmethod
+    def pack_chunks(chunks):
+        if not chunks or chunks.get("vectors") is None:
+            return None, None
+        return (np.asarray(chunks["vectors"], dtype=EMBEDDING_DTYPE).tobytes(),
+                np.asarray(chunks["spans"], dtype=np.uint32).tobytes())
+
+    def get(self, url):
+        """Fresh entry for url, {"text": ""} for a known useless page, or None"""
+        with self.lock:
+            row = self.conn.execute("SELECT content_hash, fetched_at FROM urls WHERE url = ?", (url,)).fetchone()
+            if not row or time.time() - row[1] > (self.ttl if row[0] else self.negative_ttl):
+                return None
+            if row[0] is None:
+                return {"text": ""}
+            page = self.conn.execute(
+                "SELECT title, text, embedding, embedder, fingerprints, chunk_spans FROM pages WHERE content_hash = ?",
+                (row[0],)
+            ).fetchone()
+            if not page:
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE pages SET last_access = ? WHERE content_hash = ?", (time.time(), row[0]))
+
+        title, text, embedding, embedder, fingerprints, chunk_spans = page
+        chunks = None
+        if embedding and chunk_spans:
+            spans = np.frombuffer(chunk_spans, dtype=np.uint32).reshape(-1, 2)
+            chunks = {"spans": spans.tolist(), "vectors": np.frombuffer(embedding, dtype=EMBEDDING_DTYPE).reshape(len(spans), -1)}
+        return {
+            "content_hash": row[0],
+            "title": title,
+            "text": zlib.decompress(text).decode("utf-8"),
+            "chunks": chunks,
+            "embedder": embedder,
+            "fingerprints": np.frombuffer(fingerprints or b"", dtype=FINGERPRINT_DTYPE)
+        }
+
+    def put(self, url, title, text, chunks=None, embedder=None, fingerprints=()):
+        """Store a page with its chunk spans and embeddings ({"spans", "vectors"})"""
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        blob = zlib.compress(text.encode("utf-8"))
+        emb, spans = self.pack_chunks(chunks)
+        fps = np.asarray(fingerprints, dtype=FINGERPRINT_DTYPE).tobytes() if len(fingerprints) else None
+        size = len(blob) + len(emb or b"") + len(spans or b"") + len(fps or b"")
+        now = time.time()
+        with self.lock, self.conn:
+            # Mirrors of the same page share one row through the content hash
+            added = self.conn.execute(
+                """INSERT OR IGNORE INTO pages (content_hash, title, text, embedding, embedder, fingerprints, size, last_access, chunk_spans)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (content_hash, title, blob, emb, embedder if emb else None, fps, size, now, spans)).rowcount
+            if added:
+                self.size += size
+            else:
+                self.conn.execute("UPDATE pages SET last_access = ? WHERE content_hash = ?", (now, content_hash))
+            self.conn.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?)", (url, content_hash, now))
+        self.evict()
+        return content_hash
+
+    def put_empty(self, url):
+        """Remember that a URL had no usable content"""
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO urls VALUES (?, NULL, ?)", (url, time.time()))
+        self.evict()
+
+    def set_chunks(self, content_hash, chunks, embedder):
+        emb, spans = self.pack_chunks(chunks)
+        grown = len(emb or b"") + len(spans or b"")
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT LENGTH(embedding), LENGTH(chunk_spans) FROM pages WHERE content_hash = ?",
+                                    (content_hash,)).fetchone()
+            if row is None:
+                return
+            grown -= (row[0] or 0) + (row[1] or 0)
+            self.conn.execute("UPDATE pages SET embedding = ?, chunk_spans = ?, embedder = ?, size = size + ? WHERE content_hash = ?",
+                              (emb, spans, embedder, grown, content_hash))
+            self.size += grown
+
+    def evict(self):
+        """Drop the least recently used pages past max_bytes; every PAGE_STORE_SWEEP_EVERY writes also drop expired URLs"""
+        with self.lock, self.conn:
+            self.writes += 1
+            if self.writes % PAGE_STORE_SWEEP_EVERY == 0:
+                now = time.time()
+                self.conn.execute("DELETE FROM urls WHERE fetched_at < ? OR (content_hash IS NULL AND fetched_at < ?)",
+                                  (now - self.ttl, now - self.negative_ttl))
+                # Other processes may share the file; the running total is only this one's view
+                self.size = self.count_size()
+            if self.size <= self.max_bytes:
+                return
+            target = self.size - int(self.max_bytes * 0.9)
+            freed = 0
+            doomed = []
+            for content_hash, size in self.conn.execute("SELECT content_hash, size FROM pages ORDER BY last_access"):
+                doomed.append((content_hash,))
+                freed += size
+                if freed >= target:
+                    break
+            self.conn.executemany("DELETE FROM pages WHERE content_hash = ?", doomed)
+            self.conn.executemany("DELETE FROM urls WHERE content_hash = ?", doomed)
+            self.size -= freed
+
+def canonical_doi(value):
+    """Lower-case bare DOI ("10.xxxx/...") from a DOI, doi: prefix or doi.org URL; None if there is none"""
+    if not value:
+        return None
+    m = DOI_REGEX.search(unquote(str(value)).strip())
+    if not m:
+        return None
+    doi = m.group(0).rstrip('.,;')
+    # A closing paren belongs to the DOI when it closes one inside it, e.g. S0140-6736(02)00123-4
+    while doi.endswith(')') and doi.count(')') > doi.count('('):
+        doi = doi[:-1].rstrip('.,;')
+    return doi.lower()
+
+def canonical_url(value):
+    """Comparable form of a URL, None if empty.
+
+    DOI links (doi.org, publisher /doi/ paths, arXiv) become "doi:<doi>".
+    Otherwise the scheme, www./m. prefixes, default ports, fragment, tracking
+    parameters and trailing slash are dropped and the query is sorted.
+    """
+    if not value:
+        return None
+    doi = canonical_doi(value)
+    if doi:
+        return f"doi:{doi}"
+    parsed = urlparse(str(value).strip())
+    host = re.sub(r"^(www\.|m\.)|:(80|443)$", "", parsed.netloc.lower()).replace(".m.", ".")
+    path = re.sub(r"/+$", "", parsed.path)
+    if host.endswith("arxiv.org"):
+        m = re.match(r"/(?:abs|pdf)/(.+?)(?:v\d+)?(?:\.pdf)?$", path)
+        if m:
+            return f"doi:10.48550/arxiv.{m.group(1).lower()}"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                             if not DEDUP_TRACKING_PARAMS.match(k.lower())))
+    return f"{host}{path}" + (f"?{query}" if query else "")
+
+class DoiCache:
+    """Local SQLite map of DOI -> metadata; misses are cached too, for a shorter time"""
+    def __init__(self, path=DOI_CACHE_PATH, ttl=DOI_CACHE_TTL, negative_ttl=DOI_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS dois (doi TEXT PRIMARY KEY, metadata TEXT, fetched_at REAL)")
+
+    def get_many(self, dois):
+        """{doi: metadata or None (known miss)} for the fresh entries among dois"""
+        now = time.time()
+        found = {}
+        with self.lock:
+            for i in range(0, len(dois), 500):
+                batch = dois[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT doi, metadata, fetched_at FROM dois WHERE doi IN ({','.join('?' * len(batch))})", batch)
+                for doi, metadata, fetched_at in rows:
+                    if now - fetched_at <= (self.ttl if metadata else self.negative_ttl):
+                        found[doi] = json.loads(metadata) if metadata else None
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO dois VALUES (?, ?, ?)",
+                                  [(doi, json.dumps(meta, ensure_ascii=False) if meta else None, now)
+                                   for doi, meta in items.items()])
+
+class DoiResolver:
+    """Metadata and abstracts for many DOIs at once.
+
+    The local cache answers first. The rest go to CrossRef as filter=doi:...
+    queries of up to crossref_batch DOIs, then whatever still lacks an
+    abstract goes to Semantic Scholar's paper batch endpoint. Each DOI is
+    fetched once per cache lifetime, whichever scans or segments cite it.
+    """
+    CROSSREF_ENDPOINT = "https://api.crossref.org/works"
+    S2_ENDPOINT = "https://api.semanticscholar.org/graph/v1/paper/batch"
+    HEADERS = {"User-Agent": "LitePlagiarismScanner/1.0"}
+    TAG_REGEX = re.compile(r"<[^>]+>")  # CrossRef abstracts are JATS XML
+
+    def __init__(self, cache=None, crossref_batch=DOI_CROSSREF_BATCH, s2_batch=DOI_S2_BATCH):
+        self.cache = cache
+        self.crossref_batch = crossref_batch
+        self.s2_batch = s2_batch
+        self.counts = {}
+
+    def clean(self, abstract):
+        return re.sub(r"\s+", " ", self.TAG_REGEX.sub(" ", abstract or "")).strip()
+
+    def crossref(self, dois, budget):
+        r = SOURCE_LIMITER.get("crossref", self.CROSSREF_ENDPOINT, params={
+            "filter": ",".join(f"doi:{d}" for d in dois), "rows": len(dois),
+            "select": "DOI,title,abstract,URL,container-title,issued,author"
+        }, headers=self.HEADERS, timeout=10, budget=budget)
+        out = {}
+        for item in r.json().get("message", {}).get("items", []):
+            doi = canonical_doi(item.get("DOI"))
+            if doi:
+                out[doi] = {
+                    "doi": doi,
+                    "title": " ".join(item.get("title") or []),
+                    "abstract": self.clean(item.get("abstract")),
+                    "url": item.get("URL") or f"https://doi.org/{doi}",
+                    "venue": " ".join(item.get("container-title") or []),
+                    "year": ((item.get("issued") or {}).get("date-parts") or [[None]])[0][0],
+                    "authors": [" ".join(filter(None, (a.get("given"), a.get("family")))) for a in item.get("author", [])[:5]],
+                    "resolved_by": "crossref"
+                }
+        return out
+
+    def semantic_scholar(self, dois, budget):
+        # arXiv DOIs are looked up by arXiv id
+        ids = [f"ARXIV:{d.split('arxiv.', 1)[1]}" if d.startswith("10.48550/arxiv.") else f"DOI:{d}" for d in dois]
+        r = SOURCE_LIMITER.post("semantic_scholar", self.S2_ENDPOINT, params={"fields": "title,abstract,url,venue,year,authors"},
+                                json={"ids": ids}, headers=self.HEADERS, timeout=10, budget=budget)
+        out = {}
+        for doi, item in zip(dois, r.json()):
+            if item:
+                out[doi] = {
+                    "doi": doi,
+                    "title": item.get("title") or "",
+                    "abstract": item.get("abstract") or "",
+                    "url": item.get("url") or f"https://doi.org/{doi}",
+                    "venue": item.get("venue") or "",
+                    "year": item.get("year"),
+                    "authors": [a.get("name") for a in (item.get("authors") or [])[:5]],
+                    "resolved_by": "semantic_scholar"
+                }
+        return out
+
+    def resolve(self, dois, budget=None, mark=None):
+        """{doi: metadata} for the canonical DOIs that could be resolved"""
+        mark = mark or (lambda source, error=None: None)
+        found = self.cache.get_many(dois) if self.cache else {}
+        missing = [d for d in dois if d not in found]
+        fetched, asked = {}, {"crossref": set(), "semantic_scholar": set()}
+        passes = (("crossref", self.crossref, self.crossref_batch, lambda: missing),
+                  ("semantic_scholar", self.semantic_scholar, self.s2_batch,
+                   lambda: [d for d in missing if not (fetched.get(d) or {}).get("abstract")]))
+        for source, lookup, size, pending in passes:
+            todo = pending()
+            for i in range(0, len(todo), size):
+                batch = todo[i:i + size]
+                if not SOURCE_LIMITER.available(source):
+                    break
                 try:
-                    nltk.download('punkt', quiet=True)
-                    nltk.download('averaged_perceptron_tagger', quiet=True)
-                    nltk.download('stopwords', quiet=True)
-                except:
-                    self.log("❌ NLTK download failed - some features disabled")
+                    result = lookup(batch, budget)
+                    mark(source)
+                except BudgetExhausted:
+                    break
+                except Exception as e:
+                    mark(source, e)
+                    continue
+                asked[source].update(batch)
+                for doi, meta in result.items():
+                    # Keep CrossRef's fields and fill in what it lacked (usually the abstract)
+                    fetched[doi] = dict(meta, **{k: v for k, v in (fetched.get(doi) or {}).items() if v})
+
+        # Cached, found or not, only once every pass it needed answered: CrossRef, and Semantic Scholar unless CrossRef had the abstract
+        settled = [d for d in asked["crossref"]
+                   if d in asked["semantic_scholar"] or (fetched.get(d) or {}).get("abstract")]
+        if self.cache and settled:
+            try:
+                self.cache.put_many({d: fetched.get(d) for d in settled})
+            except sqlite3.Error:
+                pass
+        resolved = {d: m for d, m in {**found, **fetched}.items() if m}
+        self.counts = {"dois": len(dois), "cached": sum(1 for m in found.values() if m),
+                       "fetched": len(fetched), "unresolved": len(dois) - len(resolved)}
+        return resolved
+
+def match_segment_ids(m):
+    """Segments a match was found from: all of them for a merged match, none for whole-document matches"""
+    if m.get("segment_ids"):
+        return m["segment_ids"]
+    return [m["segment_id"]] if "segment_id" in m else []
+
+def chunk_pair_segment(m, p):
+    """Segment a chunk pair's "a" span is relative to (web and research hits); None for Wikipedia's, relative to the whole text"""
+    return p["segment_id"] if "segment_id" in p else m.get("segment_id")
+
+class MatchDeduplicator:
+    """Merge hits on the same source into one match with several provenances.
+
+    Two hits are the same source when they share a canonical DOI or URL, or
+    when the MinHash signatures of their snippets estimate at least jaccard
+    shingle overlap. Signatures are bucketed per LSH band and a hit is only
+    checked against the first hit in each of its buckets, so the pass is
+    linear in the number of matches.
+    """
+    FILL_KEYS = ("doi", "title", "metadata")
+
+    def __init__(self, shingle_words=DEDUP_SHINGLE_WORDS, perms=DEDUP_MINHASH_PERMS, bands=DEDUP_LSH_BANDS,
+                 jaccard=DEDUP_JACCARD, min_shingles=DEDUP_MIN_SHINGLES, seed=0):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, 2 ** 63, perms, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, perms, dtype=np.uint64)
+        self.fingerprinter = Fingerprinter(k=shingle_words)
+        self.bands = bands
+        self.rows = perms // bands
+        self.jaccard = jaccard
+        self.min_shingles = min_shingles
+
+    def signature(self, text):
+        """MinHash signature of text's word shingles, None if it has too few"""
+        hashes = np.unique(self.fingerprinter.shingles(text or "")["hash"]).astype(np.uint64)
+        if len(hashes) < self.min_shingles:
+            return None
+        # Multiply-shift hashing: products wrap modulo 2^64, the top 32 bits are the hash
+        return ((np.outer(hashes, self.a) + self.b) >> np.uint64(32)).min(axis=0)
+
+    def keys(self, m):
+        doi = canonical_doi(m.get("doi"))
+        if doi:
+            yield f"doi:{doi}"
+        url = canonical_url(m.get("url"))
+        if url:
+            yield url
+
+    def groups(self, matches):
+        """Lists of indexes into matches, one per distinct source"""
+        parent = list(range(len(matches)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        owners, signatures = {}, {}
+        for i, m in enumerate(matches):
+            for key in self.keys(m):
+                j = owners.setdefault(key, i)
+                parent[find(i)] = find(j)
+            sig = self.signature((m.get("snippet") or "").removesuffix("..."))
+            if sig is None:
+                continue
+            signatures[i] = sig
+            for band in range(self.bands):
+                j = owners.setdefault((band, sig[band * self.rows:(band + 1) * self.rows].tobytes()), i)
+                if find(i) != find(j) and np.mean(signatures[j] == sig) >= self.jaccard:
+                    parent[find(i)] = find(j)
+
+        groups = {}
+        for i in range(len(matches)):
+            groups.setdefault(find(i), []).append(i)
+        return list(groups.values())
+
+    def merge(self, matches):
+        """One match per source: the best-scoring hit's fields, gaps filled from the others, every hit listed under provenance.
+
+        The evidence of every member is kept: its segments under "segment_ids",
+        its chunk pairs (each tagged with the segment and, when there are
+        several source texts, the "source_index" of the one it is relative to)
+        and its source text under "source_texts", so alignment and coverage
+        see all of it.
+        """
+        out = []
+        for group in self.groups(matches):
+            members = sorted((matches[i] for i in group), key=lambda m: m.get("similarity", 0), reverse=True)
+            merged = dict(members[0])
+            segment_ids = sorted({i for m in members for i in match_segment_ids(m)})
+            if segment_ids:
+                merged["segment_ids"] = segment_ids
+            sources = {}
+            for m in members:
+                if m.get("source_text") and m["source_text"] not in sources:
+                    sources[m["source_text"]] = m.get("url")
+            index = {text: i for i, text in enumerate(sources)}
+            pairs = []
+            for m in members:
+                tag = {"source_index": index[m["source_text"]]} if len(sources) > 1 and m.get("source_text") else {}
+                pairs += [dict(p, segment_id=chunk_pair_segment(m, p), **tag) for p in m.get("chunk_pairs", [])]
+            if pairs:
+                merged["chunk_pairs"] = pairs
+            if len(sources) > 1:
+                merged.pop("source_text", None)
+                merged["source_texts"] = [{"url": url, "text": text} for text, url in sources.items()]
+            provenance, seen = [], set()
+            for m in members:
+                for key in self.FILL_KEYS:
+                    if not merged.get(key) and m.get(key):
+                        merged[key] = m[key]
+                hits = m.get("provenance") or [
+                    {"source": m.get("source"), "url": m.get("url"), "similarity": m.get("similarity", 0)}]
+                for hit in hits:
+                    ident = (hit.get("source"), canonical_url(hit.get("url")))
+                    if ident not in seen:
+                        seen.add(ident)
+                        provenance.append(hit)
+            merged["provenance"] = provenance
+            out.append(merged)
+        return out
+
+def json_default(o):
+    """Records serialise through to_json(); numpy scalars become plain numbers; anything else falls back to str"""
+    if hasattr(o, "to_json"):
+        return o.to_json()
+    return o.item() if hasattr(o, "item") else str(o)
+
+class JobStore:
+    """SQLite queue of documents to scan, with a checkpoint row per finished stage.
+
+    Workers claim the highest-priority runnable job under a lease that every
+    checkpoint renews. A job whose lease runs out (crashed or killed worker)
+    counts as a failed attempt; failed attempts are retried with exponential
+    backoff, resuming from the last checkpoint, up to max_attempts.
+    """
+    def __init__(self, path=JOB_STORE_PATH, lease=JOB_LEASE, max_attempts=JOB_MAX_ATTEMPTS):
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, path TEXT, signature TEXT, priority INTEGER, state TEXT, attempts INTEGER,
+                next_run REAL, lease_until REAL, error TEXT, created REAL, updated REAL)""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs(state, priority, next_run)")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS checkpoints (
+                job_id TEXT, stage TEXT, data BLOB, saved REAL, PRIMARY KEY (job_id, stage))""")
+
+    def add(self, path, priority=5, claim=False):
+        """Queue path, or return the unfinished job already queued for the same file contents.
+
+        With claim, the job is leased to the caller straight away (as claim()
+        would), so no batch worker picks it up meanwhile; None when another
+        worker holds a live lease on it.
+        """
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+            signature = f"{st.st_size}:{st.st_mtime_ns}"
+        except OSError:
+            signature = None
+        now = time.time()
+        with self.lock, self.conn:
+            self.expire_leases(now)
+            unfinished = self.conn.execute(
+                "SELECT id, signature, state, lease_until FROM jobs WHERE path = ? AND state IN ('queued', 'running')",
+                (path,)).fetchall()
+            for job_id, old_signature, state, lease_until in unfinished:
+                if old_signature == signature:
+                    if not claim:
+                        return job_id
+                    if state == "running" and lease_until >= now:
+                        return None
+                    self.conn.execute(
+                        "UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_until = ?, updated = ? WHERE id = ?",
+                        (now + self.lease, now, job_id))
+                    return job_id
+                # The file was edited since; its checkpoints describe old contents
+                self.conn.execute("UPDATE jobs SET state = 'failed', error = 'file changed', updated = ? WHERE id = ?",
+                                  (now, job_id))
+                self.conn.execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+            job_id = uuid.uuid4().hex[:12]
+            if claim:
+                self.conn.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, 'running', 1, ?, ?, NULL, ?, ?)",
+                                  (job_id, path, signature, priority, now, now + self.lease, now, now))
+            else:
+                self.conn.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, 'queued', 0, ?, NULL, NULL, ?, ?)",
+                                  (job_id, path, signature, priority, now, now, now))
+            return job_id
+
+    def backoff(self, attempts):
+        return min(JOB_RETRY_MAX, JOB_RETRY_BASE * 2 ** (attempts - 1))
+
+    def expire_leases(self, now):
+        """Stuck jobs (lease run out, e.g. the worker crashed) count as a failed attempt: requeued with backoff or failed (caller holds the lock)"""
+        stuck = self.conn.execute("SELECT id, attempts FROM jobs WHERE state = 'running' AND lease_until < ?", (now,)).fetchall()
+        for job_id, attempts in stuck:
+            if attempts < self.max_attempts:
+                self.conn.execute(
+                    "UPDATE jobs SET state = 'queued', next_run = ?, lease_until = NULL, error = 'lease expired', updated = ? WHERE id = ?",
+                    (now + self.backoff(attempts), now, job_id))
+            else:
+                self.conn.execute("UPDATE jobs SET state = 'failed', error = 'lease expired', updated = ? WHERE id = ?",
+                                  (now, job_id))
+
+    def claim(self):
+        """(job_id, path) of the next runnable job, now leased to the caller, or None"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.expire_leases(now)
+            row = self.conn.execute(
+                """SELECT id, path FROM jobs WHERE state = 'queued' AND next_run <= ?
+                   ORDER BY priority, next_run LIMIT 1""", (now,)).fetchone()
+            if not row:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_until = ?, updated = ? WHERE id = ?",
+                (now + self.lease, now, row[0]))
+            return row
+
+    def save_checkpoint(self, job_id, stage, value):
+        data = zlib.compress(json.dumps(value, ensure_ascii=False, default=json_default).encode("utf-8"))
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)", (job_id, stage, data, now))
+            self.conn.execute("UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ?", (now + self.lease, now, job_id))
+
+    def load_checkpoint(self, job_id, stage):
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM checkpoints WHERE job_id = ? AND stage = ?",
+                                    (job_id, stage)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def complete(self, job_id):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE jobs SET state = 'done', error = NULL, updated = ? WHERE id = ?", (time.time(), job_id))
+            self.conn.execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+
+    def fail(self, job_id, error, retry=True):
+        """Requeue with backoff, or mark failed once attempts run out (or retry is False)"""
+        now = time.time()
+        with self.lock, self.conn:
+            attempts = self.conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            if retry and attempts < self.max_attempts:
+                delay = self.backoff(attempts)
+                self.conn.execute(
+                    "UPDATE jobs SET state = 'queued', next_run = ?, lease_until = NULL, error = ?, updated = ? WHERE id = ?",
+                    (now + delay, str(error)[:500], now, job_id))
+                return delay
+            self.conn.execute("UPDATE jobs SET state = 'failed', error = ?, updated = ? WHERE id = ?",
+                              (str(error)[:500], now, job_id))
+            return None
+
+    def next_wakeup(self):
+        """Seconds until some unfinished job can be claimed, or None when the queue is drained"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MIN(CASE state WHEN 'queued' THEN next_run ELSE lease_until END) FROM jobs "
+                "WHERE state IN ('queued', 'running')").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+class JobCheckpoint:
+    """detect()'s view of one job's stored stages"""
+    def __init__(self, store, job_id):
+        self.store = store
+        self.job_id = job_id
+
+    def load(self, stage):
+        return self.store.load_checkpoint(self.job_id, stage)
+
+    def save(self, stage, value):
+        self.store.save_checkpoint(self.job_id, stage, value)
+
+class ReportLoader:
+    """Reads reports written by save_json in either format"""
+    def __init__(self, document_dir=None):
+        self.document_dir = document_dir  # None: the REPORT_DOCUMENT_DIR next to each report
+
+    def summary(self, path):
+        """Summary fields only; compact reports are read up to the first line"""
+        if not path.endswith(".jsonl"):
+            with open(path, "r", encoding="utf-8") as f:
+                rep = json.load(f)
+            return {k: v for k, v in rep.items() if k not in ("matches", "segments", "forensic_analysis")}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.loads(f.readline())
+
+    def document(self, doc_hash, report_path):
+        document_dir = self.document_dir or os.path.join(os.path.dirname(report_path), REPORT_DOCUMENT_DIR)
+        path = os.path.join(document_dir, f"{doc_hash}.txt.gz")
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+
+    def load(self, path):
+        """Full report in the legacy shape, with segment text restored when the document is available"""
+        if not path.endswith(".jsonl"):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        rep = {"matches": [], "segments": [], "forensic_analysis": {}}
+        text = None
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                kind = record.pop("type", None)
+                if kind == "summary":
+                    rep.update(record)
+                    text = self.document(record.get("document"), path)
+                elif kind == "match":
+                    rep["matches"].append(record)
+                elif kind == "segment":
+                    start, end = record.pop("span")
+                    if text is not None and start >= 0:
+                        record["text"] = text[start:end]
+                    record["start"], record["end"] = start, end
+                    rep["segments"].append(record)
+                elif kind == "forensic":
+                    rep["forensic_analysis"][record["key"]] = record["value"]
+        return rep
+
+class MemoryGovernor:
+    """Watches the process's resident memory against a ceiling.
+
+    check() is called between pipeline steps. Above the soft limit it runs the
+    caller's relieve() (dropping caches) and a garbage collection; whatever
+    level is left is returned, and callers degrade at "hard" and record the
+    step with degrade() so the report says what was cut short. Where the
+    current RSS cannot be read (no psutil or /proc) the level is "unknown"
+    and nothing is degraded; only the peak is reported.
+    """
+    def __init__(self, ceiling_mb=MEMORY_CEILING_MB, soft_ratio=MEMORY_SOFT_RATIO, log=print):
+        self.ceiling_mb = ceiling_mb
+        self.soft_mb = ceiling_mb * soft_ratio
+        self.log = log
+        self.reset()
+
+    def reset(self):
+        self.level = "ok"
+        self.degraded = []
+        self.peak_mb = 0.0
+        self.measure()
+
+    @staticmethod
+    def rss_mb():
+        """Current resident set size in MB, None where it cannot be read"""
+        if PSUTIL:
+            import psutil
+            return psutil.Process().memory_info().rss / 2 ** 20
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    @staticmethod
+    def peak_rss_mb():
+        """Lifetime peak RSS in MB (never goes down, so only good for reporting); 0 where unavailable"""
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux, bytes on macOS
+            return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+        except ImportError:
+            return 0.0
+
+    def measure(self):
+        rss = self.rss_mb()
+        self.peak_mb = max(self.peak_mb, self.peak_rss_mb() if rss is None else rss)
+        return rss
+
+    def check(self, relieve=None):
+        """"ok", "soft" or "hard" after trying to get back under the soft limit; "unknown" without a current RSS"""
+        rss = self.measure()
+        if rss is None:
+            self.level = "unknown"
+            return self.level
+        if rss >= self.soft_mb:
+            if relieve is not None:
+                relieve()
+            gc.collect()
+            rss = self.measure()
+        self.level = "hard" if rss >= self.ceiling_mb else "soft" if rss >= self.soft_mb else "ok"
+        return self.level
+
+    def degrade(self, step, message):
+        if step not in self.degraded:
+            self.degraded.append(step)
+            self.log(f"🧠 MEMORY CEILING ({self.ceiling_mb} MB): {message}")
+
+    def report(self):
+        return {"ceiling_mb": self.ceiling_mb, "peak_mb": round(self.peak_mb, 1), "degraded": self.degraded}
+
+class CoverageTracker:
+    """Union of the character spans matches cover, kept per segment, with a running originality score"""
+    def __init__(self, segments, text_length, min_similarity=0.6):
+        located = sorted((s for s in segments if s.located), key=lambda s: s.start)
+        if not located:
+            located = [Segment(-1, "Document", "", 0, text_length)]
+        self.segments = {s.segment_id: s for s in located}
+        self.order = [s.segment_id for s in located]
+        self.starts = [s.start for s in located]
+        self.intervals = {s.segment_id: ([], []) for s in located}
+        self.covered = {s.segment_id: 0 for s in located}
+        self.partial = {}  # segment_id -> top similarity of whole-segment matches, which cover that share of the rest
+        self.total = sum(s.end - s.start for s in located) or 1
+        self.covered_chars = 0
+        self.min_similarity = min_similarity
+
+    def add(self, start, end):
+        """Cover [start, end) of the document; returns the characters newly covered"""
+        added = 0
+        i = max(0, bisect.bisect_right(self.starts, start) - 1)
+        while i < len(self.order) and self.starts[i] < end:
+            segment = self.segments[self.order[i]]
+            lo, hi = max(start, segment.start), min(end, segment.end)
+            if lo < hi:
+                added += self.insert(segment.segment_id, lo, hi)
+            i += 1
+        self.covered_chars += added
+        return added
+
+    def add_partial(self, start, end, similarity):
+        """Count the segments overlapping [start, end) as covered in proportion to similarity"""
+        i = max(0, bisect.bisect_right(self.starts, start) - 1)
+        while i < len(self.order) and self.starts[i] < end:
+            segment_id = self.order[i]
+            if max(start, self.segments[segment_id].start) < min(end, self.segments[segment_id].end):
+                self.partial[segment_id] = max(self.partial.get(segment_id, 0.0), similarity)
+            i += 1
+
+    def insert(self, segment_id, lo, hi):
+        """Merge [lo, hi) into the segment's sorted starts/ends lists with bisect; returns the characters newly covered"""
+        starts, ends = self.intervals[segment_id]
+        i = bisect.bisect_left(ends, lo)  # First interval reaching lo (touching ones merge)
+        j = bisect.bisect_right(starts, hi)  # Past the last interval starting by hi
+        removed = 0
+        if i < j:
+            removed = sum(ends[k] - starts[k] for k in range(i, j))
+            lo, hi = min(lo, starts[i]), max(hi, ends[j - 1])
+        starts[i:j] = [lo]
+        ends[i:j] = [hi]
+        added = hi - lo - removed
+        self.covered[segment_id] += added
+        return added
+
+    def add_match(self, m):
+        """Fold in one match: only its spans once aligned, else its chunk pairs plus every segment it was found from without any"""
+        if "spans" in m:
+            for span in m["spans"]:
+                if span["kind"] == "exact":
+                    self.add(span["start"], span["end"])
+                elif span["similarity"] >= self.min_similarity:
+                    if span["kind"] == "segment":
+                        self.add_partial(span["start"], span["end"], span["similarity"])
+                    else:
+                        self.add(span["start"], span["end"])
+            return
+
+        paired = set()
+        for p in m.get("chunk_pairs", []):
+            segment_id = chunk_pair_segment(m, p)
+            paired.add(segment_id)
+            if p["similarity"] < self.min_similarity or (segment_id is not None and segment_id not in self.segments):
+                continue
+            offset = self.segments[segment_id].start if segment_id is not None else 0
+            self.add(p["a"][0] + offset, p["a"][1] + offset)
+        if m.get("similarity", 0) >= self.min_similarity:
+            # Paper hits (title or abstract) carry no chunk pairs: their segment counts by similarity
+            for segment_id in match_segment_ids(m):
+                if segment_id in self.segments and segment_id not in paired:
+                    segment = self.segments[segment_id]
+                    self.add_partial(segment.start, segment.end, m["similarity"])
+
+    def segment_covered(self, segment_id):
+        """Characters of the segment counted as covered: its spans plus the weighted share of the rest"""
+        segment = self.segments[segment_id]
+        covered = self.covered[segment_id]
+        return covered + (segment.end - segment.start - covered) * self.partial.get(segment_id, 0.0)
+
+    def covered_total(self):
+        return self.covered_chars + sum(self.segment_covered(i) - self.covered[i] for i in self.partial)
+
+    def coverage(self):
+        return self.covered_total() / self.total
+
+    def segment_coverage(self, segment_id):
+        segment = self.segments.get(segment_id)
+        return self.segment_covered(segment_id) / max(1, segment.end - segment.start) if segment else 0.0
+
+    def uncovered(self, segment_ids):
+        """Share of the given segments' text not covered yet"""
+        total = sum(self.segments[i].end - self.segments[i].start for i in segment_ids if i in self.segments)
+        if not total:
+            return 1.0
+        return 1 - sum(self.segment_covered(i) for i in segment_ids if i in self.segments) / total
+
+    def originality(self):
+        return max(0.0, round(100.0 * (1 - self.coverage()), 1))
+
+    def sections(self):
+        """{section: share of its text covered}, in document order"""
+        totals = {}
+        for segment_id in self.order:
+            segment = self.segments[segment_id]
+            covered, total = totals.get(segment.section, (0, 0))
+            totals[segment.section] = (covered + self.segment_covered(segment_id), total + segment.end - segment.start)
+        return {name: round(covered / max(1, total), 3) for name, (covered, total) in totals.items()}
+
+    def report(self):
+        return {"coverage": round(self.coverage(), 3), "covered_chars": round(self.covered_total()),
+                "total_chars": self.total, "sections": self.sections()}
+
+class StoppingPolicy:
+    """When the matches found so far settle the verdict, so scanning can stop early"""
+    def __init__(self, top_similarity=0.9, coverage=0.5, segment_similarity=0.6):
+        self.top_similarity = top_similarity
+        self.coverage = coverage
+        self.segment_similarity = segment_similarity  # A segment counts as covered from this match similarity
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**config) if config else None
+
+    def satisfied(self, top, coverage):
+        return top >= self.top_similarity and coverage >= self.coverage
+
+class ResultCache:
+    """Process-wide LRU of raw search results keyed by (scanner, query), each kept for ttl seconds"""
+    def __init__(self, size=SCAN_CACHE_SIZE, ttl=SCAN_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+SCAN_CACHE = ResultCache()
+
+class SourceScanner:
+    """A search source the scan scheduler can drive: search() then match(); register subclasses with @register_scanner"""
+    name = None  # Key in SCANNERS, the query plan and task ids
+    api = None  # SOURCE_LIMITER source its requests go through
+    label = "🔎 SCANNING..."  # Progress text while one of its tasks runs
+    rate_limits = {}  # api -> (requests per second, burst), unless SOURCE_RATE_LIMITS overrides it
+    query_budget = 10  # Planned queries per document
+    segment_queries = True  # Searches the planner's segment queries, so the plan is folded to its query_budget
+    batch_size = 1  # Planned queries per task; each task makes one search() call with all of its uncached queries
+    concurrency = 1  # Its tasks in flight at once
+    cost = 1.0  # Relative time per task; cheaper tasks go first at equal promise
+    prior = 0.4  # Expected share of tasks with a match, before any results
+    threshold = 0.25  # Similarity a hit needs to be reported
+
+    def available(self):
+        """False when an optional package it needs is missing"""
+        return True
+
+    def plan(self, planner, text):
+        """Planned queries ({"query", "score", "segment_ids", "segments"}) for this document"""
+        return planner.plan(self.name)
+
+    def search(self, detector, queries):
+        """Raw hits for each query, in order; SourceUnavailable drops the scanner, other errors only these queries"""
+        return [self.search_one(detector, query) for query in queries]
+
+    def search_one(self, detector, query):
+        raise NotImplementedError
+
+    def match(self, detector, planned, hits, text):
+        """Match dicts for one planned query's hits"""
+        raise NotImplementedError
+
+SCANNERS = {}
+
+def register_scanner(scanner):
+    """Add a SourceScanner (class or instance) to every scan; usable as a class decorator"""
+    instance = scanner() if isinstance(scanner, type) else scanner
+    SCANNERS[instance.name] = instance
+    for api, limits in instance.rate_limits.items():
+        SOURCE_LIMITER.limits.setdefault(api, limits)
+    return scanner
+
+@register_scanner
+class WikipediaScanner(SourceScanner):
+    """Article extracts for the document's key phrases, compared with the whole text"""
+    name = api = "wikipedia"
+    label = "🌍 SCANNING WIKIPEDIA DATABASE..."
+    rate_limits = {"wikipedia": (5.0, 10)}
+    query_budget = 6
+    segment_queries = False
+    concurrency = 2
+    cost = 1.0
+    prior = 0.3
+    ENDPOINT = "https://en.wikipedia.org/w/api.php"
+    HEADERS = {"User-Agent": "LitePlagiarismScanner/1.0"}
+    ARTICLES = 2  # Articles read per search
+    EXTRACT_CHARS = 3000
+
+    def plan(self, planner, text):
+        phrases = planner.keyphrases(self.query_budget)
+        phrases = phrases or list(dict.fromkeys(re.findall(r'\b[A-Za-z]{6,}\b', text)))[:self.query_budget]
+        return [{"query": kw, "score": 1 - rank / len(phrases), "segment_ids": [], "segments": []}
+                for rank, kw in enumerate(phrases)]
+
+    def search_one(self, detector, query):
+        r = SOURCE_LIMITER.get(self.api, self.ENDPOINT, params={
+            "action": "query", "list": "search",
+            "format": "json", "srsearch": query
+        }, headers=self.HEADERS, timeout=8, budget=detector.budget)
+
+        hits = []
+        for itm in r.json().get("query", {}).get("search", [])[:self.ARTICLES]:
+            pid = itm["pageid"]
+            r2 = SOURCE_LIMITER.get(self.api, self.ENDPOINT, params={
+                "action": "query",
+                "prop": "extracts",
+                "exchars": self.EXTRACT_CHARS,
+                "pageids": pid,
+                "format": "json",
+                "explaintext": 1
+            }, headers=self.HEADERS, timeout=8, budget=detector.budget)
+            hits.append({"title": itm["title"], "text": r2.json()["query"]["pages"][str(pid)].get("extract", "")})
+        return hits
+
+    def match(self, detector, planned, hits, text):
+        matches = []
+        for hit in hits:
+            compared = detector.long_similarity(text, hit["text"])
+            sim = compared["score"]
+            if sim > self.threshold:
+                detector.log(f"✅ WIKIPEDIA MATCH: {hit['title']} ({sim:.1%})")
+                matches.append({
+                    "source": "Wikipedia",
+                    "title": hit["title"],
+                    "url": f"https://en.wikipedia.org/wiki/{hit['title'].replace(' ', '_')}",
+                    "similarity": round(sim, 3),
+                    "snippet": detector.matched_snippet(hit["text"], compared, 400),
+                    "chunk_pairs": compared["pairs"],
+                    "source_text": hit["text"]
+                })
+        return matches
+
+@register_scanner
+class WebScanner(SourceScanner):
+    """DuckDuckGo results, each page downloaded (or read from the page store) and scored per segment"""
+    name = "web"
+    api = "duckduckgo"
+    label = "🌐 SCANNING WEB SOURCES..."
+    rate_limits = {"duckduckgo": (0.5, 3)}
+    query_budget = 15
+    concurrency = 2
+    cost = 3.0
+    prior = 0.5
+    threshold = 0.15  # Lower threshold for comprehensive detection
+    RESULTS = 10
+
+    def available(self):
+        return DUCKSEARCH
+
+    def search_one(self, detector, query):
+        detector.log(f"🔍 SEARCHING: {query[:150]}...")
+        results = SOURCE_LIMITER.call(self.api, DDGS().text, query, max_results=self.RESULTS, budget=detector.budget)
+        return [{"href": r.get("href", ""), "title": r.get("title", "")} for r in results]
+
+    def match(self, detector, planned, hits, text):
+        matches = []
+        for r in hits:
+            url = r["href"]
+            if not url:
+                continue
+
+            try:
+                page = detector.load_page(url)
+                if not page:
+                    continue
+                content = page["text"]
+
+                # Score the page against every segment this query stands for
+                words_content = {w.lower() for w in re.findall(r'\b\w+\b', content)}
+                final_similarity, segment, compared = 0, None, None
+                for seg in planned["segments"]:
+                    seg_text = seg.text
+                    seg_compared = detector.long_similarity(seg_text, content, page["chunks"])
+
+                    # Also check for keyword matches
+                    words_s = {w.lower() for w in re.findall(r'\b\w+\b', seg_text)}
+                    word_similarity = len(words_s & words_content) / len(words_s) if words_s else 0
+
+                    # Use the higher similarity score
+                    seg_similarity = max(seg_compared["score"], word_similarity)
+                    if segment is None or seg_similarity > final_similarity:
+                        final_similarity, segment, compared = seg_similarity, seg, seg_compared
+
+                if final_similarity > self.threshold:
+                    doi = detector.extract_doi_from_url(url) or (detector.extract_dois(content) or [None])[0]
+                    title = r["title"] or page["title"] or url
+
+                    detector.log(f"✅ WEB MATCH: {title[:100]} ({final_similarity:.1%}) - {url}")
+                    matches.append({
+                        "source": "Website",
+                        "title": title[:200],
+                        "url": url,
+                        "similarity": round(final_similarity, 3),
+                        "snippet": detector.matched_snippet(content, compared, 800),
+                        "doi": doi,
+                        "segment_id": segment.segment_id,
+                        "chunk_pairs": compared["pairs"],
+                        "source_text": content
+                    })
+            except BudgetExhausted as e:
+                e.matches = matches
+                raise
+            except Exception:
+                continue
+        return matches
+
+class PaperScanner(SourceScanner):
+    """Scholarly search API: each hit's abstract (or title) is scored against the closest planned segment"""
+    label = "📚 SCANNING RESEARCH DATABASES..."
+    query_budget = 20
+    concurrency = 2
+    prior = 0.4
+    source_label = None  # "source" of its matches
+
+    def match(self, detector, planned, hits, text):
+        matches = []
+        for item in hits:
+            sim, seg = detector.best_segment(planned, item.get('abstract', '') or item.get('title', ''))
+            if sim > self.threshold:
+                detector.log(f"✅ {self.source_label.upper()} MATCH: {item.get('title','')[:80]} ({sim:.1%})")
+                matches.append({
+                    "source": self.source_label,
+                    "title": item.get("title"),
+                    "url": item.get("url"),
+                    "doi": item.get("doi"),
+                    "similarity": round(sim, 3),
+                    "snippet": (item.get("abstract") or "")[:400] + "...",
+                    "segment_id": seg.segment_id,
+                    "source_text": item.get("abstract") or ""
+                })
+        return matches
+
+@register_scanner
+class CrossRefScanner(PaperScanner):
+    name = api = "crossref"
+    source_label = "CrossRef"
+    rate_limits = {"crossref": (5.0, 10)}
+    ENDPOINT = "https://api.crossref.org/works"
+
+    def search_one(self, detector, query):
+        r = SOURCE_LIMITER.get(self.api, self.ENDPOINT, params={"query.bibliographic": query, "rows": CROSSREF_ROWS},
+                               timeout=8, headers={"User-Agent": "LitePlagiarismScanner/1.0"}, budget=detector.budget)
+        out = []
+        for item in r.json().get("message", {}).get("items", []):
+            title = " ".join(item.get("title", [])) if item.get("title") else ""
+            out.append({"title": title, "doi": item.get("DOI"), "url": item.get("URL"), "abstract": item.get("abstract", "")})
+        return out
+
+@register_scanner
+class SemanticScholarScanner(PaperScanner):
+    name = api = "semantic_scholar"
+    source_label = "SemanticScholar"
+    rate_limits = {"semantic_scholar": (1.0, 3)}
+    concurrency = 1
+    ENDPOINT = "https://api.semanticscholar.org/graph/v1/paper/search"
+
+    def search_one(self, detector, query):
+        r = SOURCE_LIMITER.get(self.api, self.ENDPOINT, params={"query": query, "limit": SEMANTIC_SCHOLAR_LIMIT,
+                                                                "fields": "title,abstract,url,externalIds"},
+                               headers={"User-Agent": "LitePlagiarismScanner/1.0"}, timeout=8, budget=detector.budget)
+        out = []
+        for item in r.json().get("data", []):
+            ext = item.get("externalIds", {}) or {}
+            arxiv_doi = f"10.48550/arXiv.{ext['ArXivId']}" if ext.get("ArXivId") else None
+            out.append({"title": item.get("title", ""), "doi": ext.get("DOI") or arxiv_doi,
+                        "url": item.get("url", ""), "abstract": item.get("abstract", "") or ""})
+        return out
+
+class ScanScheduler:
+    """Runs one document's searches on every enabled scanner as a single prioritised, checkpointed task queue"""
+    PROGRESS = (30, 75)
+
+    def __init__(self, detector, text, planner, segments, budget, policy=None, scanners=None,
+                 concurrency=SCAN_CONCURRENCY, cache=SCAN_CACHE):
+        self.detector = detector
+        self.text = text
+        self.budget = budget
+        self.policy = policy
+        self.concurrency = concurrency
+        self.cache = cache
+        self.segment_similarity = (policy or StoppingPolicy()).segment_similarity
+        self.tracker = CoverageTracker(segments, len(text), self.segment_similarity)
+        self.scanners = self.pick_scanners(scanners)
+        # Beta(2p, 2(1-p)) pseudo-counts: the prior fades as real results come in
+        self.stats = {name: [2 * scanner.prior, 2.0] for name, scanner in self.scanners.items()}
+        self.tasks = self.build_tasks(planner)
+        self.done = set()
+        self.dropped = set()
+        self.results = []
+        self.top = 0.0
+        self.stopped = None
+        self.report = None
+
+    def pick_scanners(self, names):
+        names = names if names is not None else SCANNERS_ENABLED
+        picked = {}
+        for name, scanner in SCANNERS.items():
+            if names is not None and name not in names:
+                continue
+            if not scanner.available():
+                self.detector.log(f"⚠️ {name} scanner not available")
+                continue
+            picked[name] = scanner
+        return picked
+
+    def build_tasks(self, planner):
+        tasks = []
+        for name, scanner in self.scanners.items():
+            planned = scanner.plan(planner, self.text)
+            best = max((p["score"] for p in planned), default=0) or 1
+            size = max(1, scanner.batch_size)
+            for i in range(0, len(planned), size):
+                batch = planned[i:i + size]
+                tasks.append({"id": f"{name}:{i // size}", "source": name, "planned": batch,
+                              "score": max(p["score"] for p in batch) / best,
+                              "segments": sorted({sid for p in batch for sid in p["segment_ids"]})})
+        return tasks
+
+    def coverage(self):
+        return self.tracker.coverage()
+
+    def uncovered(self, task):
+        """Share of the task's segments (the whole text for whole-document scanners) no match covers yet"""
+        if not task["segments"]:
+            return 1 - self.coverage()
+        return self.tracker.uncovered(task["segments"])
+
+    def priority(self, task):
+        """Hit rate so far, query score and uncovered share, per unit of the scanner's cost"""
+        scanner = self.scanners[task["source"]]
+        hits, runs = self.stats[task["source"]]
+        return hits / runs * (0.5 + 0.5 * task["score"]) * self.uncovered(task) / scanner.cost
+
+    def available(self, name):
+        return name not in self.dropped and SOURCE_LIMITER.available(self.scanners[name].api)
+
+    def record(self, task, matches):
+        """Fold a finished task's matches into hit rates, top similarity and coverage"""
+        self.done.add(task["id"])
+        stats = self.stats[task["source"]]
+        stats[0] += 1 if matches else 0
+        stats[1] += 1
+        self.collect(matches)
+
+    def collect(self, matches):
+        self.results += matches
+        for m in matches:
+            self.top = max(self.top, m.get("similarity", 0))
+            self.tracker.add_match(m)
+        if matches:
+            self.detector.update_coverage(self.tracker)
+
+    def execute(self, task):
+        """Search (through the result cache) and match one task; runs on a worker thread"""
+        scanner = self.scanners[task["source"]]
+        queries = [p["query"] for p in task["planned"]]
+        hits = {q: self.cache.get((scanner.name, q)) for q in queries}
+        missing = [q for q in queries if hits[q] is None]
+        if missing:
+            try:
+                found = scanner.search(self.detector, missing)
+                self.detector.mark_source(scanner.api)
+            except BudgetExhausted:
+                raise
+            except Exception as e:
+                self.detector.mark_source(scanner.api, e)
+                if isinstance(e, SourceUnavailable):
+                    raise
+                found = [[] for _ in missing]
+            else:
+                for q, result in zip(missing, found):
+                    self.cache.put((scanner.name, q), result)
+            hits.update(zip(missing, found))
+
+        matches = []
+        for planned in task["planned"]:
+            try:
+                matches += scanner.match(self.detector, planned, hits[planned["query"]], self.text)
+            except BudgetExhausted as e:
+                e.matches = matches + list(e.matches)
+                raise
+        return matches
+
+    def work(self, task):
+        MODELS.reset_timing()
+        matches = self.execute(task)
+        return matches, MODELS.timing()
+
+    def stop_reason(self):
+        if self.policy and self.policy.satisfied(self.top, self.coverage()):
+            return "policy"
+        if self.budget.expired():
+            return "budget"
+        if self.detector.check_memory() == "hard":
+            self.detector.memory.degrade("scan", "scan stopped early")
+            return "memory"
+        return None
+
+    def next_task(self, running):
+        """Most promising runnable task, or None while every candidate's scanner is at its limit"""
+        in_flight = Counter(task["source"] for task in running.values())
+        pending = [t for t in self.tasks
+                   if t["id"] not in self.done and t not in running.values() and self.available(t["source"])
+                   and in_flight[t["source"]] < self.scanners[t["source"]].concurrency]
+        return max(pending, key=self.priority) if pending else None
+
+    def finish(self, task, future):
+        try:
+            matches, timing = future.result()
+        except BudgetExhausted as e:
+            # Cut short: keep what it matched, but leave the task unfinished for a resumed job
+            self.stopped = self.stopped or "budget"
+            self.collect(list(e.matches))
+            return
+        except SourceUnavailable as e:
+            self.detector.log(f"⛔ {task['source'].upper()} UNAVAILABLE: {str(e)}")
+            self.dropped.add(task["source"])
+            return
+        except Exception as e:
+            self.detector.log(f"⚠️ {task['source']} scan error: {str(e)}")
+            matches, timing = [], None
+        MODELS.add_timing(timing)
+        self.record(task, matches)
+        if self.detector.checkpoint is not None:
+            self.detector.checkpoint.save(f"scan:{task['id']}", {"value": matches, "source_status": self.detector.source_status})
+
+    def restore(self):
+        """Replay checkpointed tasks; True when the whole scan had already finished"""
+        checkpoint = self.detector.checkpoint
+        if checkpoint is None:
+            return False
+        saved = checkpoint.load("scan")
+        if saved is not None:
+            self.detector.source_status.update(saved["source_status"])
+            self.results = saved["value"]["results"]
+            self.report = saved["value"]["report"]
+            self.detector.log("⏩ SCAN RESTORED FROM CHECKPOINT")
+            return True
+        replayed = 0
+        for task in self.tasks:
+            saved = checkpoint.load(f"scan:{task['id']}")
+            if saved is not None:
+                self.detector.source_status.update(saved["source_status"])
+                self.record(task, saved["value"])
+                replayed += 1
+        if replayed:
+            self.detector.log(f"⏩ {replayed} SCAN TASKS RESTORED FROM CHECKPOINT")
+        return False
+
+    def run(self):
+        if self.restore():
+            return self.results
+        low, high = self.PROGRESS
+        running = {}
+        pool = ThreadPoolExecutor(max_workers=max(1, self.concurrency), thread_name_prefix="scanner")
+        try:
+            while True:
+                self.stopped = self.stopped or self.stop_reason()
+                while self.stopped is None and len(running) < self.concurrency:
+                    task = self.next_task(running)
+                    if task is None:
+                        break
+                    scanner = self.scanners[task["source"]]
+                    self.detector.update_progress(scanner.label, low + (high - low) * len(self.done) / len(self.tasks))
+                    running[pool.submit(self.work, task)] = task
+                if not running:
+                    self.stopped = self.stopped or "complete"
+                    break
+                # Tasks already running are finished and kept even after a stop
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.finish(running.pop(future), future)
+        finally:
+            pool.shutdown(wait=True)
+
+        self.report = self.summary()
+        messages = {
+            "policy": f"🛑 EARLY STOP: TOP MATCH {self.top:.0%}, {self.coverage():.0%} OF TEXT COVERED",
+            "budget": f"⏳ SCAN BUDGET OF {self.budget.seconds}s REACHED",
+            "memory": "🧠 SCAN STOPPED AT THE MEMORY CEILING",
+            "complete": "✅ ALL PLANNED QUERIES SCANNED",
+        }
+        skipped = len(self.tasks) - len(self.done)
+        if self.stopped == "complete" and skipped:
+            messages["complete"] = f"✅ ALL RUNNABLE QUERIES SCANNED, {skipped} SKIPPED WITH THEIR SOURCE UNAVAILABLE"
+        self.detector.log(f"{messages[self.stopped]} ({len(self.done)}/{len(self.tasks)} TASKS)")
+        if self.detector.checkpoint is not None:
+            self.detector.checkpoint.save("scan", {"value": {"results": self.results, "report": self.report},
+                                                   "source_status": self.detector.source_status})
+        return self.results
+
+    def summary(self):
+        runs = Counter(task_id.split(":")[0] for task_id in self.done)
+        return {
+            "budget": self.budget.seconds,
+            "elapsed": round(self.budget.elapsed(), 2),
+            "scanners": sorted(self.scanners),
+            "tasks_total": len(self.tasks),
+            "tasks_run": len(self.done),
+            "tasks_skipped": len(self.tasks) - len(self.done),
+            "tasks_by_source": dict(runs),
+            "stopped": self.stopped,
+            "top_similarity": round(self.top, 3),
+            "coverage": round(self.coverage(), 3),
+        }
+
+class LitePlagiarismDetector:
+    def __init__(self, gui=None):
+        self.gui = gui
+        print("\n🔍 Quantum Plagiarism Detector Ready 🚀")
+        # Resource checks must not hold up the window
+        threading.Thread(target=self.setup_nltk, daemon=True).start()
+        self.authorship_patterns = {}
+        self.page_extractor = PageContentExtractor()
+        self.deduplicator = MatchDeduplicator()
+        try:
+            self.doi_resolver = DoiResolver(DoiCache())
+        except sqlite3.Error as e:
+            self.doi_resolver = DoiResolver()
+            self.log(f"⚠️ DOI cache disabled: {str(e)}")
+        self.fingerprinter = Fingerprinter()
+        self.aligner = PassageAligner()
+        try:
+            self.page_store = PageStore()
+        except Exception as e:
+            self.page_store = None
+            self.log(f"⚠️ Page store disabled: {str(e)}")
+        self.source_status = {}
+        self.status_lock = threading.Lock()
+        self.checkpoint = None
+        self.chunk_cache = {}
+        self.budget = None
+        self.scan_budget = SCAN_BUDGET
+        self.memory = MemoryGovernor(log=self.log)
+        self.stop_policy = StoppingPolicy.from_config(STOP_POLICY)
+        self.output_dir = ""  # Working directory; the service points this at each job's own directory
+        self.run_id = None
+
+    def log(self, message):
+        if self.gui:
+            self.gui.log_status(message)
+        print(message)
+
+    def update_progress(self, message, value=None):
+        if self.gui:
+            self.gui.update_progress(message, value)
+
+    def update_coverage(self, coverage):
+        """Pass the running originality and per-section coverage to the GUI (scanner threads call this too)"""
+        if self.gui:
+            self.gui.update_coverage(coverage.originality(), coverage.coverage(), coverage.sections())
+
+    def mark_source(self, source, error=None):
+        """Record a request outcome so failed sources show up in the report (scanner threads call this too)"""
+        with self.status_lock:
+            status = self.source_status.setdefault(source, {"attempts": 0, "failures": 0, "last_error": None})
+            status["attempts"] += 1
+            if error is not None:
+                status["failures"] += 1
+                status["last_error"] = str(error)[:200]
+
+    def check_memory(self):
+        """Memory level after dropping this scan's embedding cache if needed"""
+        return self.memory.check(relieve=self.chunk_cache.clear)
+
+    def source_report(self):
+        report = {}
+        for source, status in self.source_status.items():
+            if not status["failures"]:
+                state = "ok"
+            elif status["failures"] >= status["attempts"] or SOURCE_LIMITER.state(source) != CircuitBreaker.CLOSED:
+                state = "unavailable"
+            else:
+                state = "degraded"
+            report[source] = dict(status, status=state)
+        return report
+
+    # ---------------- NLTK SETUP ----------------
+    def setup_nltk(self):
+        backends = TEXT_TOOLS.ensure()
+        if backends != {"tokenizer": "nltk", "tagger": "nltk"}:
+            self.log(f"⚠️  NLTK data not found in {TEXT_TOOLS.data_dir} - using offline "
+                     f"{backends['tokenizer']} tokenizer and {backends['tagger']} tagger")
 
     # ---------------- TEXT EXTRACTION ----------------
     def extract_text(self, fp):
@@ -1526,20 +4586,25 @@ class LitePlagiarismDetector:
         return ""
 
     def extract_pdf(self, fp):
-        txt = ""
+        parts = []
         try:
+            import PyPDF2
             with open(fp, "rb") as f:
                 reader = PyPDF2.PdfReader(f)
-                for p in reader.pages:
+                for i, p in enumerate(reader.pages):
                     t = p.extract_text()
                     if t:
-                        txt += t + " "
+                        parts.append(t)
+                    if (i + 1) % PDF_CHECK_PAGES == 0 and self.check_memory() == "hard":
+                        self.memory.degrade("extract", f"PDF truncated after page {i + 1} of {len(reader.pages)}")
+                        break
         except Exception as e:
             self.log(f"❌ PDF extraction error: {str(e)}")
-        return txt
+        return " ".join(parts)
 
     def extract_docx(self, fp):
         try:
+            import docx
             doc = docx.Document(fp)
             return " ".join(p.text for p in doc.paragraphs)
         except Exception as e:
@@ -1548,32 +4613,62 @@ class LitePlagiarismDetector:
 
     # ---------------- FORENSIC FEATURES ----------------
     def rabin_karp_hash(self, text, window_size=50):
-        """Rabin-Karp hashing for text fragments"""
-        words = text.split()
+        """Rabin-Karp hashing for text fragments, kept as offsets into text (see WindowHashes)"""
+        spans = [(m.start(), m.end()) for m in re.finditer(r'\S+', text)]
+        words = [text[a:b] for a, b in spans]
         hashes = []
-        if len(words) < window_size:
-            window = " ".join(words)
-            hashes.append((hashlib.md5(window.encode()).hexdigest(), window))
-            return hashes
 
-        for i in range(0, len(words) - window_size + 1, max(1, window_size//2)):
-            window = " ".join(words[i:i + window_size])
-            hash_val = hashlib.md5(window.encode()).hexdigest()
-            hashes.append((hash_val, window))
-        return hashes
+        def entry(i, j):
+            digest = hashlib.md5(" ".join(words[i:j]).encode()).digest()
+            return (list(digest), spans[i][0] if spans else 0, spans[j - 1][1] if spans else 0)
+
+        if len(words) < window_size:
+            hashes.append(entry(0, len(words)))
+        else:
+            for i in range(0, len(words) - window_size + 1, max(1, window_size//2)):
+                hashes.append(entry(i, i + window_size))
+        return WindowHashes(text, np.array(hashes, dtype=WINDOW_HASH_DTYPE))
+
+    def text_windows(self, text, size=STYLE_WINDOW_CHARS):
+        """Consecutive slices of at most about size characters, cut after a sentence end where possible"""
+        start = 0
+        while start < len(text):
+            end = min(len(text), start + size)
+            if end < len(text):
+                cut = max(text.rfind(". ", start, end), text.rfind("\n", start, end))
+                if cut > start:
+                    end = cut + 1
+            yield text[start:end]
+            start = end
 
     def analyze_writing_style(self, text):
-        """Stylometric analysis for authorship attribution"""
-        if not NLTK_AVAILABLE or not text.strip():
+        """Stylometric analysis for authorship attribution.
+
+        Reads the text a window at a time and tokenizes each sentence once, so
+        only counters (not token lists for the whole text) are kept.
+        """
+        if not text.strip():
             return {}
 
+        sentence_lengths = []
+        vocab = set()
+        pos_tags = Counter()
+        alpha_words = complex_words = tokens = 0
         try:
-            sentences = sent_tokenize(text)
-            words = word_tokenize(text.lower())
-            pos_tags = [
-                tag for word, tag in pos_tag(word_tokenize(text))
-                if word.isalpha()
-            ]
+            for window in self.text_windows(text):
+                window_tokens = []
+                for sentence in TEXT_TOOLS.sent_tokenize(window):
+                    words = TEXT_TOOLS.word_tokenize(sentence)
+                    sentence_lengths.append(len(words))
+                    window_tokens += words
+                for word, tag in TEXT_TOOLS.pos_tag(window_tokens):
+                    low = word.lower()
+                    vocab.add(low)
+                    if word.isalpha():
+                        pos_tags[tag] += 1
+                        alpha_words += 1
+                        complex_words += len(low) > 6
+                tokens += len(window_tokens)
         except LookupError:
             return {
                 'avg_sentence_length': 0,
@@ -1591,33 +4686,21 @@ class LitePlagiarismDetector:
                 'disabled_reason': f'Analysis error: {str(e)}'
             }
             
-        avg_sentence_length = np.mean([len(word_tokenize(s)) for s in sentences]) if sentences else 0
-        vocab_richness = len(set(words)) / len(words) if words else 0
-        pos_distribution = dict(Counter(pos_tags))
+        avg_sentence_length = np.mean(sentence_lengths) if sentence_lengths else 0
+        vocab_richness = len(vocab) / tokens if tokens else 0
 
         return {
             'avg_sentence_length': round(avg_sentence_length, 2),
             'vocab_richness': round(vocab_richness, 3),
-            'pos_distribution': pos_distribution,
-            'complex_words_ratio': self.calculate_complexity(text)
+            'pos_distribution': dict(pos_tags),
+            'complex_words_ratio': complex_words / alpha_words if alpha_words else 0,
+            'text_backend': TEXT_TOOLS.backends()
         }
 
-    def calculate_complexity(self, text):
-        """Calculate lexical complexity"""
-        if not NLTK_AVAILABLE or not text.strip():
-            return 0
-
-        try:
-            words = [w for w in word_tokenize(text.lower()) if w.isalpha()]
-            complex_words = [w for w in words if len(w) > 6]
-            return len(complex_words) / len(words) if words else 0
-        except:
-            return 0
-
     def detect_author_anomalies(self, text_segments):
         """Detect writing style inconsistencies across document segments."""
         
-        if not NLTK_AVAILABLE or len(text_segments) < 2:
+        if len(text_segments) < 2:
             return {"anomaly_detected": False, "confidence": 0}
 
         styles = []
@@ -1657,12 +4740,35 @@ class LitePlagiarismDetector:
         """Generate data for similarity heatmap visualization"""
         segments = self.make_segments(text)
         heatmap_data = []
+        cursor = 0
 
         for i, segment in enumerate(segments):
+            start = text.find(segment, cursor)
+            if start >= 0:
+                cursor = start + len(segment)
+            # Share of the segment covered by aligned passages (semantic ones weighted by their score)
             segment_similarity = 0
-            for match in matches:
-                sim = self.similarity(segment, match.get('snippet', ''))
-                segment_similarity = max(segment_similarity, sim)
+            matched = []
+            if start >= 0:
+                end = start + len(segment)
+                exact = []
+                for idx, match in enumerate(matches):
+                    for span in match.get("spans", []):
+                        lo, hi = max(start, span["start"]), min(end, span["end"])
+                        if lo >= hi:
+                            continue
+                        matched.append(idx)
+                        if span["kind"] == "exact":
+                            exact.append((lo, hi))
+                        else:
+                            segment_similarity = max(segment_similarity, span["similarity"] * (hi - lo) / len(segment))
+                covered, reach = 0, start
+                for lo, hi in sorted(exact):
+                    lo = max(lo, reach)
+                    if hi > lo:
+                        covered += hi - lo
+                        reach = hi
+                segment_similarity = max(segment_similarity, covered / max(1, len(segment)))
 
             if segment_similarity > 0.7:
                 risk_level = "High"
@@ -1674,13 +4780,12 @@ class LitePlagiarismDetector:
                 risk_level = "Low"
                 color = "green"
 
-            heatmap_data.append({
-                "segment_id": i,
-                "text_preview": segment[:100] + "...",
-                "similarity": round(segment_similarity, 3),
-                "risk_level": risk_level,
-                "color": color
-            })
+            if start >= 0:
+                heatmap_data.append(HeatmapRow(i, text, start, start + len(segment), True, round(segment_similarity, 3),
+                                               risk_level, color, sorted(set(matched))))
+            else:
+                heatmap_data.append(HeatmapRow(i, segment, 0, len(segment), False, round(segment_similarity, 3),
+                                               risk_level, color, sorted(set(matched))))
 
         return heatmap_data
 
@@ -1714,23 +4819,41 @@ class LitePlagiarismDetector:
 
     # ---------------- NEW: DOI extraction & helpers ----------------
     def extract_dois(self, text):
-        """Extract DOIs from arbitrary text using regex"""
-        return list({m.group(0).rstrip('.,;') for m in DOI_REGEX.finditer(text)})
+        """Extract DOIs (canonical form) from arbitrary text using regex"""
+        return list({canonical_doi(m.group(0)) for m in DOI_REGEX.finditer(text)})
 
     def extract_doi_from_url(self, url):
         """Try to extract DOI if present in a URL"""
-        if not url:
-            return None
-        m = DOI_REGEX.search(url)
-        if m:
-            return m.group(0).rstrip('.,;')
-        return None
+        return canonical_doi(url)
 
     # ---------------- ROOT LOGIC ----------------
-    def detect(self, fp):
+    def run_stage(self, stage, compute, restore=None):
+        """Run one detect() stage, or restore it from self.checkpoint when it already finished.
+
+        Checkpoints hold the JSON shape; restore() turns it back into records.
+        """
+        if self.checkpoint is None:
+            return compute()
+        saved = self.checkpoint.load(stage)
+        if saved is not None:
+            self.source_status.update(saved["source_status"])
+            self.log(f"⏩ {stage.upper()} RESTORED FROM CHECKPOINT")
+            return restore(saved["value"]) if restore else saved["value"]
+        value = compute()
+        self.checkpoint.save(stage, {"value": value, "source_status": self.source_status})
+        return value
+
+    def detect(self, fp, checkpoint=None):
+        """Analyse one document; with a checkpoint, finished stages are saved and skipped on resume"""
+        self.run_id = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        self.source_status = {}
+        self.checkpoint = checkpoint
+        self.chunk_cache = {}
+        self.memory.reset()
+        MODELS.reset_timing()
         self.update_progress("📄 LOADING DOCUMENT...", 10)
         self.log(f"📄 ANALYZING FILE: {fp}")
-        text = self.extract_text(fp).strip()
+        text = self.run_stage("extract", lambda: self.extract_text(fp).strip())
         if not text:
             self.log("❌ NO TEXT EXTRACTED FROM DOCUMENT")
             return
@@ -1738,24 +4861,43 @@ class LitePlagiarismDetector:
         self.log(f"📝 EXTRACTED {len(text.split())} WORDS FOR ANALYSIS")
 
         self.update_progress("🔍 ANALYZING DOCUMENT STRUCTURE...", 20)
-        sections = self.sectionize(text)
-        segments_with_meta = self.make_segments_by_section(sections)
-
-        self.update_progress("🌍 SCANNING WIKIPEDIA DATABASE...", 30)
-        results = []
-        results += self.wikipedia_scan(text)
-        
-        self.update_progress("🌐 SCANNING WEB SOURCES...", 50)
-        results += self.website_scan([seg['text'] for seg in segments_with_meta])
-        
-        self.update_progress("📚 SCANNING RESEARCH DATABASES...", 70)
-        results += self.research_scan(segments_with_meta)
+        segments_with_meta = self.run_stage(
+            "sections", lambda: self.attach_offsets(text, self.make_segments_by_section(self.sectionize(text))),
+            restore=lambda saved: [Segment.from_json(s, text) for s in saved])
+
+        planner = QueryPlanner(segments_with_meta or [Segment(0, "Document", text)])
+        plan = ", ".join(f"{name} {n}" for name, n in planner.summary().items())
+        self.log(f"🧭 QUERY PLAN: {len(segments_with_meta)} SEGMENTS → {len(planner.groups)} QUERIES ({plan})")
+        folded = planner.folded()
+        if folded:
+            self.log("🧭 FOLDED TO FIT BUDGETS, NO SEGMENT DROPPED: "
+                     + ", ".join(f"{name} {n} QUERIES MERGED" for name, n in folded.items()))
+
+        # Every source shares one deadline; the most promising queries go first
+        self.budget = ScanBudget(self.scan_budget)
+        scheduler = ScanScheduler(self, text, planner, segments_with_meta, self.budget, self.stop_policy)
+        try:
+            results = scheduler.run()
+        finally:
+            self.budget = None
 
+        results = self.resolve_dois(results, segments_with_meta)
         results = self.clean_results(results)
-        score = self.calc_originality(results)
+
+        self.update_progress("🧩 ALIGNING MATCHED PASSAGES...", 80)
+        self.align_matches(text, results, segments_with_meta)
+        # Final score from the aligned spans: the share of the text no match covers
+        coverage = CoverageTracker(segments_with_meta, len(text), (self.stop_policy or StoppingPolicy()).segment_similarity)
+        for m in results:
+            coverage.add_match(m)
+        self.update_coverage(coverage)
+        score = coverage.originality()
 
         self.update_progress("🔬 RUNNING FORENSIC ANALYSIS...", 85)
-        forensic_data = self.run_forensic_analysis(text, [s['text'] for s in segments_with_meta], fp, results)
+        self.chunk_cache = {}
+        self.check_memory()
+        forensic_data = self.run_stage(
+            "forensics", lambda: self.run_forensic_analysis(text, [s.text for s in segments_with_meta], fp, results))
 
         report = {
             "file": fp,
@@ -1764,10 +4906,22 @@ class LitePlagiarismDetector:
             "matches_found": len(results),
             "matches": results,
             "forensic_analysis": forensic_data,
+            "source_status": self.source_report(),
+            "embedding": MODELS.timing(),
+            "scan": scheduler.report,
+            "coverage": coverage.report(),
+            "memory": self.memory.report(),
             "segments": segments_with_meta
         }
-
-        self.save_json(report)
+        if report["embedding"]:
+            self.log(f"⏱️ EMBEDDING: {report['embedding']['texts_encoded']} TEXTS IN "
+                     f"{report['embedding']['encode_seconds']:.2f}s ({report['embedding']['backend']})")
+        for source, status in report["source_status"].items():
+            if status["status"] != "ok":
+                self.log(f"⚠️ SOURCE {status['status'].upper()}: {source} ({status['failures']}/{status['attempts']} requests failed)")
+        self.log(f"🧠 PEAK MEMORY: {report['memory']['peak_mb']:.0f} MB OF {report['memory']['ceiling_mb']} MB")
+
+        self.save_json(report, text)
         self.save_summary_report(report)
         self.save_visualization(report)
         
@@ -1776,26 +4930,123 @@ class LitePlagiarismDetector:
 
         self.update_progress("✅ ANALYSIS COMPLETE!", 100)
         self.log("🎉 FORENSIC ANALYSIS COMPLETED SUCCESSFULLY!")
+        return report
+
+    def resolve_dois(self, matches, segments):
+        """Resolve every DOI the scan found in one bulk pass and attach the metadata to its matches.
+
+        A paper match scored on a title or short abstract is rescored against
+        its segment once the full abstract is known. Matches sharing a DOI are
+        merged later, by clean_results.
+        """
+        for m in matches:
+            if m.get("doi"):
+                m["doi"] = canonical_doi(m["doi"])
+        dois = sorted({m["doi"] for m in matches if m.get("doi")})
+        if not dois:
+            return matches
+
+        self.update_progress("🔖 RESOLVING DOIS...", 77)
+        metadata = self.run_stage(
+            "doi", lambda: self.doi_resolver.resolve(dois, ScanBudget(DOI_BUDGET), self.mark_source))
+        segments = {s.segment_id: s for s in segments}
+        for m in matches:
+            meta = metadata.get(m["doi"]) if m.get("doi") else None
+            if meta:
+                self.apply_doi_metadata(m, meta, segments)
+
+        self.log(f"🔖 {len(metadata)}/{len(dois)} DOIS RESOLVED ({self.doi_resolver.counts.get('cached', 0)} FROM CACHE)")
+        return matches
+
+    def apply_doi_metadata(self, m, meta, segments):
+        m["metadata"] = {k: meta.get(k) for k in ("title", "venue", "year", "authors", "resolved_by")}
+        m["title"] = m.get("title") or meta.get("title")
+        m["url"] = m.get("url") or meta.get("url")
+        abstract = meta.get("abstract")
+        segment = segments.get(m.get("segment_id"))
+        # Web matches already hold the whole page; paper matches may only have had a title
+        if not abstract or m.get("source") == "Website" or segment is None:
+            return
+        if len(m.get("source_text") or "") >= len(abstract):
+            return
+        sim = self.long_similarity(segment.text, abstract)["score"]
+        m["similarity"] = round(max(m.get("similarity", 0), sim), 3)
+        m["source_text"] = abstract
+        m["snippet"] = abstract[:400] + "..."
+
+    def align_matches(self, text, matches, segments):
+        """Give every match its "spans": where in the submission and the source the text matches.
+
+        Exact spans come from seed-and-extend alignment against the fetched
+        source text; a merged match is aligned against each of its sources'
+        texts and its spans say which source they came from. A match with no
+        shared wording, i.e. a paraphrase, falls back to its best chunk pairs,
+        marked "semantic". The source text is dropped from the match, so each
+        of these spans carries its "source_passage". A match with no source
+        text at all (a title-only paper hit) spans its whole segments, marked
+        "segment".
+        """
+        words = self.aligner.words(text)
+        seg_span = {s.segment_id: s.span() for s in segments}
+        passages = 0
+        for m in matches:
+            sources = m.pop("source_texts", None) or [{"text": m.get("source_text") or m.get("snippet", "")}]
+            m.pop("source_text", None)
+            spans = []
+            for source in sources:
+                extra = {"source_url": source["url"]} if len(sources) > 1 else {}
+                spans += [dict(span, kind="exact", source_passage=source["text"][span["source_start"]:span["source_end"]], **extra)
+                          for span in self.aligner.align(text, source["text"], words)]
+            if not spans:
+                for p in m.get("chunk_pairs", []):
+                    segment_id = chunk_pair_segment(m, p)
+                    offset = seg_span.get(segment_id, (-1, -1))[0] if segment_id is not None else 0
+                    if offset < 0:
+                        continue
+                    source = sources[p.get("source_index", 0)]
+                    extra = {"source_url": source["url"]} if len(sources) > 1 else {}
+                    spans.append({
+                        "start": p["a"][0] + offset, "end": p["a"][1] + offset,
+                        "source_start": p["b"][0], "source_end": p["b"][1],
+                        "source_passage": source["text"][p["b"][0]:p["b"][1]],
+                        "similarity": p["similarity"], "kind": "semantic", **extra
+                    })
+            if not spans and not any(source["text"] for source in sources):
+                for segment_id in match_segment_ids(m):
+                    start, end = seg_span.get(segment_id, (-1, -1))
+                    if start >= 0:
+                        spans.append({"start": start, "end": end, "similarity": m.get("similarity", 0), "kind": "segment"})
+            m.pop("chunk_pairs", None)
+            m["spans"] = spans
+            passages += len(spans)
+        self.log(f"🧩 ALIGNED {passages} PASSAGES ACROSS {len(matches)} MATCHES")
+        return matches
 
     def run_forensic_analysis(self, text, segments, file_path, matches):
         """Run comprehensive forensic analysis"""
+        if self.memory.level == "hard":
+            self.memory.degrade("semantic_analysis", "paraphrase clustering skipped")
+            semantic = {"clusters": [], "paraphrase_risk": 0}
+        else:
+            semantic = self.semantic_clustering(segments)
         return {
             "authorship_analysis": self.detect_author_anomalies(segments),
             "timeline_analysis": self.analyze_timeline_integrity(file_path),
             "writing_style": self.analyze_writing_style(text),
             "heatmap_data": self.generate_heatmap_data(text, matches),
             "text_fingerprints": self.rabin_karp_hash(text),
-            "semantic_analysis": self.semantic_clustering(segments)
+            "semantic_analysis": semantic
         }
 
     def semantic_clustering(self, segments):
         """Cluster segments by semantic similarity to detect paraphrasing patterns"""
-        if not EMBEDS or len(segments) < 3:
+        model = MODELS.semantic() if len(segments) >= 3 else None
+        if model is None:
             return {"clusters": [], "paraphrase_risk": 0}
 
         try:
-            embeddings = SEMANTIC_MODEL.encode(segments)
-            similarities = util.cos_sim(embeddings, embeddings)
+            embeddings = model.encode(segments)
+            similarities = MODELS.cos_sim(embeddings, embeddings)
 
             paraphrase_pairs = []
             for i in range(len(segments)):
@@ -1830,11 +5081,11 @@ class LitePlagiarismDetector:
             r'\backnowledg(e?)ments\b'
         ]
         
-        low = text.lower()
         spans = []
         for h in headings:
-            for m in re.finditer(h, low):
-                spans.append((m.start(), m.group(0)))
+            # Case-insensitive search instead of a lowered copy of the whole text
+            for m in re.finditer(h, text, flags=re.IGNORECASE):
+                spans.append((m.start(), m.group(0).lower()))
         spans.sort()
         sections = []
         if not spans:
@@ -1861,6 +5112,17 @@ class LitePlagiarismDetector:
     def make_segments(self, text):
         return [s.strip() for s in re.split(r'[.!?]', text) if len(s) > 50][:15]
 
+    def attach_offsets(self, text, segments):
+        """Segment records pointing into the document text, from {"segment_id", "section", "text"} dicts"""
+        cursor = 0
+        out = []
+        for seg in segments:
+            record = Segment.locate(seg["segment_id"], seg["section"], seg["text"], text, cursor)
+            if record.located:
+                cursor = record.start
+            out.append(record)
+        return out
+
     def make_segments_by_section(self, sections):
         out = []
         sid = 0
@@ -1878,325 +5140,248 @@ class LitePlagiarismDetector:
         return out[:60]
 
     # ---------------- SIMILARITY ENGINE ----------------
-    def similarity(self, a, b):
-        a, b = (a or "")[:300], (b or "")[:300]
-        sims = []
-
-        if EMBEDS:
-            try:
-                e1 = SEMANTIC_MODEL.encode(a, convert_to_tensor=True)
-                e2 = SEMANTIC_MODEL.encode(b, convert_to_tensor=True)
-                sims.append(util.cos_sim(e1, e2).item())
-            except:
-                pass
-
-        if TFIDF:
-            try:
-                m = VECTORIZER.fit_transform([a, b])
-                sims.append(cosine_similarity(m[0:1], m[1:2])[0][0])
-            except:
-                pass
+    def embedder_id(self):
+        """Identifies stored chunk embeddings; changes whenever they would come out different"""
+        model = MODELS.semantic()
+        return (f"{model.id if model is not None else EMBEDDING_BACKEND}:{CHUNK_TOKENS}:{CHUNK_OVERLAP}:"
+                f"{np.dtype(EMBEDDING_DTYPE).name}")
+
+    def chunk_spans(self, text):
+        """Overlapping (start, end) character spans of about CHUNK_TOKENS model tokens each"""
+        words = [m.span() for m in re.finditer(r'\S+', text or "")]
+        if not words:
+            return []
+        model = MODELS.semantic()
+        limit = min(CHUNK_TOKENS, model.max_tokens - 2) if model is not None else CHUNK_TOKENS
+        ratio = model.tokens_per_word(text) if model is not None else TOKENS_PER_WORD
+        size = max(8, int(limit / ratio))
+        step = max(1, int(size * (1 - CHUNK_OVERLAP)))
 
-        A, B = set(a.lower().split()), set(b.lower().split())
-        if A and B:
-            sims.append(len(A & B) / len(A | B))
-
-        return max(sims) if sims else 0
-
-    # ---------------- SCAN: WIKIPEDIA ----------------
-    def wikipedia_scan(self, text):
-        self.log("🌍 SCANNING WIKIPEDIA DATABASE...")
-        matches = []
-        start = time.time()
-
-        api = "https://en.wikipedia.org/w/api.php"
-        headers = {"User-Agent": "LitePlagiarismScanner/1.0"}
-
-        keywords = list(dict.fromkeys(re.findall(r'\b[A-Za-z]{6,}\b', text)))[:6]
-
-        for kw in keywords:
-            if time.time() - start > SCAN_TIMEOUT:
-                self.log("⏳ WIKIPEDIA SCAN TIMEOUT REACHED")
+        spans = []
+        for i in range(0, len(words), step):
+            j = min(len(words), i + size)
+            spans.append((words[i][0], words[j - 1][1]))
+            if j == len(words):
                 break
-
+        if len(spans) > CHUNK_MAX:
+            keep = np.linspace(0, len(spans) - 1, CHUNK_MAX).round().astype(int)
+            spans = [spans[i] for i in keep]
+        return spans
+
+    def chunk_vectors(self, text, cache=True):
+        """{"spans", "vectors"} for text, all chunks embedded in one batch (vectors None without a model).
+
+        Vectors are unit length and stored as EMBEDDING_DTYPE. With cache, results
+        are kept for the current scan, so the document and each planned segment
+        are encoded once however many sources they meet; fetched pages are not
+        cached, as the page store keeps theirs.
+        """
+        cached = self.chunk_cache.get(text)
+        if cached is not None:
+            return cached
+        spans = self.chunk_spans(text)
+        vectors = None
+        model = MODELS.semantic()
+        if model is not None and spans and self.memory.level == "hard":
+            self.memory.degrade("embeddings", "chunk embeddings skipped, lexical similarity only")
+        elif model is not None and spans:
             try:
-                r = requests.get(api, params={
-                    "action": "query", "list": "search",
-                    "format": "json", "srsearch": kw
-                }, headers=headers, timeout=8)
-
-                for itm in r.json().get("query", {}).get("search", [])[:2]:
-                    pid = itm["pageid"]
-                    title = itm["title"]
-
-                    r2 = requests.get(api, params={
-                        "action": "query",
-                        "prop": "extracts",
-                        "exchars": 3000,
-                        "pageids": pid,
-                        "format": "json",
-                        "explaintext": 1
-                    }, headers=headers, timeout=8)
-
-                    ext = r2.json()["query"]["pages"][str(pid)].get("extract", "")
-                    sim = self.similarity(text, ext)
-
-                    if sim > 0.25:
-                        self.log(f"✅ WIKIPEDIA MATCH: {title} ({sim:.1%})")
-                        matches.append({
-                            "source": "Wikipedia",
-                            "title": title,
-                            "url": f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
-                            "similarity": round(sim, 3),
-                            "snippet": ext[:400] + "..."
-                        })
-            except:
-                continue
-
-        return matches
-
-    # ---------------- SCAN: WEBSITES ----------------
-    def website_scan(self, segments_texts):
-        self.log("🌐 SCANNING WEB SOURCES...")
-        matches = []
-        start = time.time()
-
-        if not DUCKSEARCH:
-            self.log("⚠️ DuckDuckGo search not available")
-            return matches
-
-        try:
-            ddg = DDGS()
-            
-            # Use longer queries for better results
-            for s in segments_texts:
-                if time.time() - start > SCAN_TIMEOUT:
-                    self.log("⏳ WEB SCAN TIMEOUT REACHED")
-                    break
-
-                try:
-                    # Use longer query for better search results
-                    query = s[:300] if len(s) > 300 else s
-                    self.log(f"🔍 SEARCHING: {query[:150]}...")
-                    
-                    results = ddg.text(query, max_results=10)  # Increased results
-                    
-                    for r in results:
-                        url = r.get("href", "")
-                        if not url:
-                            continue
-
-                        try:
-                            # Enhanced web scraping with better content extraction
-                            headers = {
-                                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                                "Accept-Language": "en-US,en;q=0.5",
-                                "Accept-Encoding": "gzip, deflate",
-                                "Connection": "keep-alive",
-                                "Upgrade-Insecure-Requests": "1",
-                            }
-                            
-                            response = requests.get(url, headers=headers, timeout=25)
-                            response.raise_for_status()
-                            
-                            soup = BeautifulSoup(response.content, 'html.parser')
-                            
-                            # Remove script and style elements
-                            for script in soup(["script", "style", "nav", "header", "footer", "aside", "form"]):
-                                script.decompose()
-                            
-                            # Extract main content - comprehensive approach
-                            content_parts = []
-                            
-                            # Try multiple content extraction strategies
-                            content_selectors = [
-                                'article', 'main', 
-                                '[class*="content"]', '[class*="main"]', '[class*="post"]', 
-                                '[class*="article"]', '[class*="story"]', '[class*="body"]',
-                                '.entry-content', '.post-content', '.article-content',
-                                '.story-content', '.news-content', '.content-area',
-                                '#content', '#main', '#article'
-                            ]
-                            
-                            for selector in content_selectors:
-                                elements = soup.select(selector)
-                                for elem in elements:
-                                    text = elem.get_text(" ", strip=True)
-                                    if len(text) > 100:
-                                        content_parts.append(text)
-                            
-                            # If no specific content found, use body
-                            if not content_parts:
-                                body = soup.find('body')
-                                if body:
-                                    # Remove unwanted elements
-                                    for unwanted in body.find_all(['nav', 'header', 'footer', 'aside', 'script', 'style', 'form']):
-                                        unwanted.decompose()
-                                    body_text = body.get_text(" ", strip=True)
-                                    if len(body_text) > 200:
-                                        content_parts.append(body_text)
-                            
-                            # Combine all content parts
-                            content = " ".join(content_parts)
-                            
-                            # Clean up the content
-                            content = re.sub(r'\s+', ' ', content)
-                            content = content.strip()
-                            
-                            if len(content) < 150:  # Skip if content is too short
-                                continue
-                                
-                            # Calculate similarity
-                            sim = self.similarity(s, content)
-                            
-                            # Also check for keyword matches
-                            words_s = set(re.findall(r'\b\w+\b', s.lower()))
-                            words_content = set(re.findall(r'\b\w+\b', content.lower()))
-                            common_words = words_s.intersection(words_content)
-                            word_similarity = len(common_words) / len(words_s) if words_s else 0
-
-                            # Use the higher similarity score
-                            final_similarity = max(sim, word_similarity)
-
-                            if final_similarity > 0.15:  # Lower threshold for comprehensive detection
-                                doi = self.extract_doi_from_url(url) or (self.extract_dois(content) or [None])[0]
-                                title = r.get("title", "") or (soup.title.string if soup.title else url)
-                                
-                                self.log(f"✅ WEB MATCH: {title[:100]} ({final_similarity:.1%}) - {url}")
-                                matches.append({
-                                    "source": "Website",
-                                    "title": title[:200],
-                                    "url": url,
-                                    "similarity": round(final_similarity, 3),
-                                    "snippet": content[:800] + "...",
-                                    "doi": doi
-                                })
-                        except Exception as e:
-                            continue
-                        
-                except Exception as e:
-                    continue
-                    
-        except Exception as e:
-            self.log(f"⚠️ DuckDuckGo search error: {str(e)}")
-            
-        return matches
-
-    # ---------------- SCAN: Research papers (CrossRef + Semantic Scholar) ----------------
-    def crossref_search(self, query):
-        out = []
-        try:
-            api = "https://api.crossref.org/works"
-            r = requests.get(api, params={"query.bibliographic": query, "rows": CROSSREF_ROWS}, timeout=8,
-                             headers={"User-Agent": "LitePlagiarismScanner/1.0"})
-            data = r.json().get("message", {}).get("items", [])
-            for item in data:
-                doi = item.get("DOI")
-                title = " ".join(item.get("title", [])) if item.get("title") else ""
-                url = item.get("URL")
-                abstract = item.get("abstract", "")
-                out.append({"title": title, "doi": doi, "url": url, "abstract": abstract})
-        except:
-            pass
-        return out
-
-    def semantic_scholar_search(self, query):
-        out = []
-        try:
-            api = "https://api.semanticscholar.org/graph/v1/paper/search"
-            r = requests.get(api, params={"query": query, "limit": SEMANTIC_SCHOLAR_LIMIT,
-                                          "fields": "title,abstract,url,externalIds"},
-                             headers={"User-Agent": "LitePlagiarismScanner/1.0"}, timeout=8)
-            js = r.json()
-            for item in js.get("data", []):
-                title = item.get("title", "")
-                abstract = item.get("abstract", "") or ""
-                url = item.get("url", "")
-                ext = item.get("externalIds", {}) or {}
-                doi = ext.get("DOI") or ext.get("ArXivId") or None
-                out.append({"title": title, "doi": doi, "url": url, "abstract": abstract})
-        except:
-            pass
-        return out
-
-    def research_scan(self, segments_with_meta):
-        self.log("📚 SCANNING RESEARCH DATABASES...")
-        matches = []
-        start = time.time()
-
-        for seg in segments_with_meta:
-            if time.time() - start > SCAN_TIMEOUT:
-                self.log("⏳ RESEARCH SCAN TIMEOUT REACHED")
-                break
-
-            q = seg['text'][:200]
-            # CrossRef
+                vectors = model.encode([text[s:e] for s, e in spans])
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+                vectors = vectors.astype(EMBEDDING_DTYPE)
+            except Exception:
+                vectors = None
+        chunks = {"spans": spans, "vectors": vectors}
+        if cache:
+            self.chunk_cache[text] = chunks
+        return chunks
+
+    def lexical_matrix(self, a_texts, b_texts):
+        """Chunk-by-chunk TF-IDF cosine (one fit for both sides), or word Jaccard without scikit-learn"""
+        tfidf = MODELS.tfidf()
+        if tfidf is not None:
+            make_vectorizer, _ = tfidf
             try:
-                cr = self.crossref_search(q)
-                for item in cr:
-                    sim = self.similarity(seg['text'], item.get('abstract', '') or item.get('title', ''))
-                    if sim > 0.25:
-                        self.log(f"✅ CROSSREF MATCH: {item.get('title','')[:80]} ({sim:.1%})")
-                        matches.append({
-                            "source": "CrossRef",
-                            "title": item.get("title"),
-                            "url": item.get("url"),
-                            "doi": item.get("doi"),
-                            "similarity": round(sim, 3),
-                            "snippet": (item.get("abstract") or "")[:400] + "..."
-                        })
-            except:
-                pass
+                m = make_vectorizer().fit_transform(a_texts + b_texts)
+                return (m[:len(a_texts)] @ m[len(a_texts):].T).toarray()
+            except ValueError:
+                pass  # Only stop words / empty text
+        A = [set(t.lower().split()) for t in a_texts]
+        B = [set(t.lower().split()) for t in b_texts]
+        return np.array([[len(x & y) / len(x | y) if x and y else 0 for y in B] for x in A])
+
+    def long_similarity(self, a, b, b_chunks=None):
+        """Similarity of two texts of any length, and the chunk pairs behind it.
+
+        Returns {"score", "pairs"}; each pair holds the character spans of a
+        matched chunk in a and b and their similarity. Chunk scores take the
+        higher of embedding and TF-IDF cosine.
+        """
+        a_chunks = self.chunk_vectors(a)
+        b_chunks = b_chunks if b_chunks is not None else self.chunk_vectors(b)
+        a_spans, b_spans = a_chunks["spans"], b_chunks["spans"]
+        if not a_spans or not b_spans:
+            return {"score": 0, "pairs": []}
+
+        matrix = self.lexical_matrix([a[s:e] for s, e in a_spans], [b[s:e] for s, e in b_spans])
+        if a_chunks["vectors"] is not None and b_chunks["vectors"] is not None:
+            # float16 storage, float32 arithmetic
+            a_vec = np.asarray(a_chunks["vectors"], dtype=np.float32)
+            b_vec = np.asarray(b_chunks["vectors"], dtype=np.float32)
+            matrix = np.maximum(matrix, np.minimum(a_vec @ b_vec.T, 1.0))
+
+        best_b = matrix.argmax(axis=1)
+        best = matrix[np.arange(len(a_spans)), best_b]
+        if LONG_SIMILARITY_AGGREGATE == "alignment":
+            # Each chunk of the shorter side matched to its best partner
+            score = best.mean() if len(a_spans) <= len(b_spans) else matrix.max(axis=0).mean()
+        else:
+            score = best.max()
 
-            # Semantic Scholar
-            try:
-                ss = self.semantic_scholar_search(q)
-                for item in ss:
-                    sim = self.similarity(seg['text'], item.get('abstract', '') or item.get('title', ''))
-                    if sim > 0.25:
-                        self.log(f"✅ SEMANTIC SCHOLAR MATCH: {item.get('title','')[:80]} ({sim:.1%})")
-                        matches.append({
-                            "source": "SemanticScholar",
-                            "title": item.get("title"),
-                            "url": item.get("url"),
-                            "doi": item.get("doi"),
-                            "similarity": round(sim, 3),
-                            "snippet": (item.get("abstract") or "")[:400] + "..."
-                        })
-            except:
-                pass
+        pairs = [
+            {"a": list(a_spans[i]), "b": list(b_spans[best_b[i]]), "similarity": round(float(best[i]), 3)}
+            for i in np.argsort(-best)[:LONG_MATCH_PAIRS] if best[i] >= LONG_MATCH_THRESHOLD
+        ]
+        return {"score": float(score), "pairs": pairs}
+
+    # ---------------- SCAN HELPERS (used by the source scanners) ----------------
+    def matched_snippet(self, text, compared, length):
+        """Snippet from the best matched chunk of text (the b side), else its start"""
+        start = compared["pairs"][0]["b"][0] if compared["pairs"] else 0
+        return text[start:start + length] + "..."
+
+    def load_page(self, url):
+        """Cleaned page text with its chunk embeddings, from the page store when fresh"""
+        store = self.page_store
+        page = store.get(url) if store else None
+        if page is not None:
+            if not page["text"]:
+                return None
+            if page["chunks"] is None or page["embedder"] != self.embedder_id():
+                page["chunks"] = self.chunk_vectors(page["text"], cache=False)
+                if page["chunks"]["vectors"] is not None:
+                    store.set_chunks(page["content_hash"], page["chunks"], self.embedder_id())
+            return page
+
+        # Streamed download, capped in size; non-HTML is skipped before the body is read
+        html = self.page_extractor.fetch(url, budget=self.budget)
+        title, content = self.page_extractor.extract(html) if html else ("", "")
+        del html
+        if len(content) < 150:  # Skip if content is too short
+            if store:
+                store.put_empty(url)
+            return None
 
-        return matches
+        page = {"title": title, "text": content, "chunks": self.chunk_vectors(content, cache=False)}
+        if store:
+            try:
+                store.put(url, title, content, page["chunks"], self.embedder_id(),
+                          self.fingerprinter.fingerprints(content))
+            except sqlite3.Error as e:
+                self.log(f"⚠️ Page store write failed: {str(e)}")
+        return page
+
+    def best_segment(self, planned, candidate_text):
+        """Return (similarity, segment) for the planned segment closest to a search hit"""
+        best_sim, best_seg = 0, None
+        for seg in planned["segments"]:
+            sim = self.long_similarity(seg.text, candidate_text)["score"]
+            if best_seg is None or sim > best_sim:
+                best_sim, best_seg = sim, seg
+        return best_sim, best_seg
 
     # ---------------- OUTPUT ----------------
     def clean_results(self, r):
-        seen = set()
-        out = []
-        for m in r:
-            key = (m.get("url") or m.get("doi") or m.get("title") or str(m.get("snippet")) )[:200]
-            if key not in seen:
-                seen.add(key)
-                out.append(m)
+        """Merge hits on the same source (by DOI, URL or near-identical snippet) and rank by similarity"""
+        out = self.deduplicator.merge(r)
+        if len(out) < len(r):
+            self.log(f"🧹 {len(r) - len(out)} DUPLICATE HITS MERGED INTO {len(out)} MATCHES")
         return sorted(out, key=lambda x: x.get("similarity", 0), reverse=True)
 
-    def calc_originality(self, R):
-        if not R:
-            return 100.0
-        penalty = sum(m.get("similarity", 0) * 100 for m in R) / len(R)
-        return max(0.0, round(100.0 - penalty, 1))
+    def output_path(self, kind, ext):
+        """forensic_<kind>_<run id>.<ext> under output_dir; one scan's files share its run id, so concurrent scans never collide"""
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+        run_id = self.run_id or f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        return os.path.join(self.output_dir, f"forensic_{kind}_{run_id}.{ext}")
+
+    def save_json(self, rep, text=None):
+        if REPORT_FORMAT == "jsonl" and text is not None:
+            return self.save_compact_report(rep, text)
 
-    def save_json(self, rep):
-        fn = f"forensic_report_{int(time.time())}.json"
+        fn = self.output_path("report", "json")
         try:
             with open(fn, "w", encoding='utf-8') as f:
-                json.dump(rep, f, indent=2, ensure_ascii=False)
+                json.dump(rep, f, indent=2, ensure_ascii=False, default=json_default)
             self.log(f"💾 JSON REPORT SAVED: {fn}")
         except Exception as e:
             self.log(f"❌ Failed to save JSON: {str(e)}")
 
+    def store_document(self, text):
+        """Keep the submitted text once under output_dir, gzip-compressed, named by its SHA-256"""
+        doc_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        document_dir = os.path.join(self.output_dir, REPORT_DOCUMENT_DIR)
+        os.makedirs(document_dir, exist_ok=True)
+        path = os.path.join(document_dir, f"{doc_hash}.txt.gz")
+        if not os.path.exists(path):
+            with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(path + ".tmp", path)
+        return doc_hash
+
+    def save_compact_report(self, rep, text):
+        """Stream the report as JSON Lines, one record per line.
+
+        The first line is the summary, so ReportLoader.summary() can stop there.
+        Text from the submission is written as [start, end] offsets into the
+        document stored under its hash, not copied into the report.
+        """
+        fn = self.output_path("report", "jsonl")
+        try:
+            doc_hash = self.store_document(text)
+            forensic = rep.get("forensic_analysis", {}) or {}
+            with open(fn, "w", encoding="utf-8") as f:
+                def emit(record):
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=json_default))
+                    f.write("\n")
+
+                emit({
+                    "type": "summary",
+                    "format": "compact-v1",
+                    "document": doc_hash,
+                    "document_chars": len(text),
+                    "file": rep.get("file"),
+                    "analysis_time": rep.get("analysis_time"),
+                    "originality_score": rep.get("originality_score"),
+                    "matches_found": rep.get("matches_found"),
+                    "source_status": rep.get("source_status", {}),
+                    "embedding": rep.get("embedding"),
+                    "scan": rep.get("scan"),
+                    "coverage": rep.get("coverage"),
+                    "memory": rep.get("memory"),
+                    "segment_count": len(rep.get("segments", []))
+                })
+                for m in rep.get("matches", []):
+                    record = dict(m, type="match")
+                    if record.get("snippet"):
+                        record["snippet"] = record["snippet"][:COMPACT_SNIPPET_CHARS]
+                    emit(record)
+                for seg in rep.get("segments", []):
+                    emit({"type": "segment", "segment_id": seg.segment_id, "section": seg.section, "span": seg.span()})
+                for key, value in forensic.items():
+                    if key == "text_fingerprints":
+                        # Restored checkpoints hold the JSON shape; recompute the offsets then
+                        value = (value if isinstance(value, WindowHashes) else self.rabin_karp_hash(text)).offsets()
+                    elif key == "heatmap_data":
+                        value = [row.to_json(preview=False) if isinstance(row, HeatmapRow)
+                                 else {k: v for k, v in row.items() if k != "text_preview"} for row in value]
+                    emit({"type": "forensic", "key": key, "value": value})
+            self.log(f"💾 COMPACT REPORT SAVED: {fn}")
+        except Exception as e:
+            self.log(f"❌ Failed to save compact report: {str(e)}")
+
     def save_summary_report(self, rep):
-        fn = f"forensic_summary_{int(time.time())}.txt"
+        fn = self.output_path("summary", "txt")
         try:
             with open(fn, "w", encoding="utf-8") as f:
                 f.write("📌 LITE++ FORENSIC PLAGIARISM SUMMARY\n")
@@ -2206,6 +5391,10 @@ class LitePlagiarismDetector:
                 f.write(f"Originality Score: {rep['originality_score']}%\n")
                 f.write(f"Matches Found: {rep['matches_found']}\n\n")
 
+                for source, status in rep.get("source_status", {}).items():
+                    if status.get("status") != "ok":
+                        f.write(f"SOURCE {status['status'].upper()}: {source} ({status['failures']}/{status['attempts']} requests failed: {status.get('last_error')})\n")
+
                 f.write("MATCHES:\n")
                 for m in rep["matches"]:
                     f.write(f"- {m.get('source','?')} ({m.get('similarity',0)*100:.1f}%): {m.get('url') or m.get('doi') or m.get('title','')}\n")
@@ -2240,7 +5429,7 @@ class LitePlagiarismDetector:
             from reportlab.lib import colors
             from reportlab.lib.units import mm
 
-            fn = f"forensic_report_{int(time.time())}.pdf"
+            fn = self.output_path("report", "pdf")
             doc = SimpleDocTemplate(fn, pagesize=A4,
                                     rightMargin=18*mm, leftMargin=18*mm,
                                     topMargin=18*mm, bottomMargin=18*mm)
@@ -2299,42 +5488,614 @@ class LitePlagiarismDetector:
                 pdf.cell(0, 10, "AI-Powered Forensic Plagiarism Report", ln=1)
                 pdf.set_font("Arial", "", 12)
                 pdf.multi_cell(0, 8, f"File: {safe_text(rep.get('file'))}\nTime: {safe_text(rep.get('analysis_time'))}\nOriginality Score: {safe_text(rep.get('originality_score'))}%\nMatches Found: {safe_text(rep.get('matches_found'))}")
-                fn = f"forensic_report_{int(time.time())}.pdf"
+                fn = self.output_path("report", "pdf")
                 pdf.output(fn)
                 self.log(f"📄 PDF REPORT SAVED (FPDF2): {fn}")
             except:
                 self.log("❌ PDF GENERATION FAILED")
 
-    def save_visualization(self, rep):
+    def save_visualization(self, rep, dpi=CHART_PREVIEW_DPI):
+        fn = self.output_path("viz", "png")
+
+        def done(path, error):
+            if error is not None:
+                self.log(f"❌ Failed to save visualization: {str(error)}")
+            else:
+                self.log(f"📊 VISUALIZATION SAVED: {path}")
+
+        try:
+            CHART_RENDERER.submit("overview", rep, fn, dpi, done)
+        except Exception as e:
+            self.log(f"❌ Failed to queue visualization: {str(e)}")
+
+# ---------------- EMBEDDING CHECK ----------------
+def check_embeddings(names):
+    """Print each backend's agreement with the fp32 reference and its speed"""
+    reference = EmbeddingBackend("torch")
+    for name in names:
+        try:
+            backend = reference if name == "torch" else EmbeddingBackend(name)
+        except Exception as e:
+            print(f"❌ {name}: {str(e)}")
+            continue
+        result = backend.accuracy_check(None if backend is reference else reference)
+        print(f"🧪 {name}: " + ", ".join(f"{k}={v}" for k, v in result.items() if k != "backend"))
+
+# ---------------- BATCH MODE ----------------
+def expand_batch_paths(paths):
+    """Files as given, plus every supported document under any directory"""
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(BATCH_EXTENSIONS):
+                        yield os.path.join(folder, name)
+        else:
+            yield path
+
+def batch_worker(store):
+    detector = LitePlagiarismDetector()
+    while True:
+        job = store.claim()
+        if job is None:
+            wait = store.next_wakeup()
+            if wait is None:
+                return
+            time.sleep(min(wait, 5) + 0.1)
+            continue
+
+        job_id, path = job
+        print(f"📦 JOB {job_id}: {path}")
         try:
-            originality = rep.get("originality_score", 0)
-            matches = rep.get("matches_found", 0)
-
-            if originality is None:
-                originality = 0
-            if matches is None:
-                matches = 0
-
-            plt.figure(figsize=(10, 6))
-            plt.bar(["Originality Score", "Matches Found"],
-                    [originality, matches], color=['#00ff00', '#ff4444'])
-            plt.title("Document Plagiarism Overview", fontsize=14, fontweight='bold')
-            plt.ylabel("Value", fontweight='bold')
-            plt.grid(True, alpha=0.3)
-
-            fn = f"forensic_viz_{int(time.time())}.png"
-            plt.savefig(fn, dpi=300, bbox_inches="tight", facecolor='#0a0a0a')
-            plt.close()
-
-            self.log(f"📊 VISUALIZATION SAVED: {fn}")
+            report = detector.detect(path, JobCheckpoint(store, job_id))
         except Exception as e:
-            self.log(f"❌ Failed to save visualization: {str(e)}")
+            delay = store.fail(job_id, e)
+            if delay is None:
+                print(f"❌ JOB {job_id} FAILED FOR GOOD: {str(e)}")
+            else:
+                print(f"🔁 JOB {job_id} FAILED ({str(e)}), RETRY IN {delay}s")
+            continue
+        if report is None:
+            store.fail(job_id, "no text extracted", retry=False)
+        else:
+            store.complete(job_id)
+
+def run_batch(paths, workers=SERVICE_WORKERS, priority=5):
+    """Queue paths (none to just resume) and work the job store until it is drained"""
+    store = JobStore()
+    added = [store.add(path, priority) for path in expand_batch_paths(paths)]
+    print(f"📦 {len(added)} DOCUMENTS QUEUED, JOB STORE: {store.counts()}")
+    MODELS.warm_up()
+    threads = [threading.Thread(target=batch_worker, args=(store,), name=f"batch-{i}") for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    CHART_RENDERER.shutdown()
+    print(f"🏁 BATCH FINISHED: {store.counts()}")
+
+# ---------------- COHORT MODE ----------------
+_COHORT_DETECTOR = None
+
+def _cohort_init():
+    global _COHORT_DETECTOR
+    _COHORT_DETECTOR = LitePlagiarismDetector()
+
+def _cohort_prepare(path):
+    """Text and fingerprints of one submission (runs in a worker process)"""
+    text = _COHORT_DETECTOR.extract_text(path).strip()
+    return text, _COHORT_DETECTOR.fingerprinter.fingerprints(text)
+
+class CohortAnalyzer:
+    """Pairwise overlap across a set of submissions without comparing every pair.
+
+    Candidates come from an inverted index of winnowed fingerprints (pairs that
+    share at least min_shared non-boilerplate fingerprints) and, when the
+    embedding model is available, from each document's nearest neighbours by
+    averaged passage embedding. Only candidates are verified: containment,
+    Jaccard, semantic similarity and the aligned shared passages. Pairs above
+    the cluster threshold are joined into clusters with union-find.
+    """
+    def __init__(self, workers=COHORT_WORKERS, log=print):
+        self.workers = workers
+        self.log = log
+        self.fingerprinter = Fingerprinter()
+        self.names = []
+        self.texts = []
+        self.prints = []
+        self.boilerplate = set()
+
+    def load(self, paths):
+        self.names = list(paths)
+        jobs = len(self.names)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_cohort_init) as pool:
+                prepared = list(pool.map(_cohort_prepare, self.names, chunksize=max(1, jobs // (self.workers * 8))))
+        except (OSError, BrokenProcessPool) as e:
+            self.log(f"⚠️ Worker processes unavailable ({str(e)}), preparing in-process")
+            _cohort_init()
+            prepared = [_cohort_prepare(path) for path in self.names]
+        self.texts = [text for text, _ in prepared]
+        self.prints = [fps for _, fps in prepared]
+        empty = sum(1 for text in self.texts if not text)
+        self.log(f"🧬 {jobs} SUBMISSIONS FINGERPRINTED ({empty} WITHOUT TEXT)")
+
+    def fingerprint_candidates(self):
+        """{(i, j): shared fingerprint count} from the inverted index"""
+        index = {}
+        for doc, fps in enumerate(self.prints):
+            for h in np.unique(fps["hash"]).tolist():
+                index.setdefault(h, []).append(doc)
+
+        max_df = max(COHORT_MIN_DOC_FREQ_CAP, int(len(self.prints) * COHORT_MAX_DOC_FREQ))
+        self.boilerplate = {h for h, docs in index.items() if len(docs) > max_df}
+        shared = Counter()
+        for docs in index.values():
+            if 2 <= len(docs) <= max_df:
+                shared.update(itertools.combinations(docs, 2))
+        return {pair: n for pair, n in shared.items() if n >= COHORT_MIN_SHARED}
+
+    def document_embeddings(self):
+        """Unit-length mean passage embedding per document, or None without a model"""
+        model = MODELS.semantic()
+        if model is None:
+            return None
+        passages, owners = [], []
+        for doc, text in enumerate(self.texts):
+            words = text.split()
+            step = max(60, len(words) // COHORT_EMBED_PASSAGES)
+            for start in range(0, min(len(words), step * COHORT_EMBED_PASSAGES), step):
+                passages.append(" ".join(words[start:start + 60]))
+                owners.append(doc)
+        if not passages:
+            return None
+        vectors = np.asarray(model.encode(passages, batch_size=64), dtype=np.float32)
+        docs = np.zeros((len(self.texts), vectors.shape[1]), dtype=np.float32)
+        np.add.at(docs, np.asarray(owners), vectors)
+        norms = np.linalg.norm(docs, axis=1, keepdims=True)
+        return docs / np.where(norms == 0, 1, norms)
+
+    def semantic_candidates(self, embeddings):
+        """{(i, j): cosine} for each document's nearest neighbours above the threshold"""
+        found = {}
+        k = min(COHORT_SEMANTIC_NEIGHBOURS, len(embeddings) - 1)
+        if k < 1:
+            return found
+        for start in range(0, len(embeddings), 512):
+            block = embeddings[start:start + 512] @ embeddings.T
+            for row, sims in enumerate(block):
+                doc = start + row
+                sims[doc] = -1
+                for other in np.argpartition(-sims, k)[:k]:
+                    if sims[other] >= COHORT_SEMANTIC_THRESHOLD:
+                        found[(min(doc, other), max(doc, other))] = float(sims[other])
+        return found
+
+    def passages(self, a, b):
+        """Aligned character spans of the fingerprints a and b share"""
+        in_b = {}
+        for h, offset in self.prints[b].tolist():
+            in_b.setdefault(h, []).append(offset)
+        hits = sorted((offset, h) for h, offset in self.prints[a].tolist() if h in in_b and h not in self.boilerplate)
+
+        spans = []
+        for offset, h in hits:
+            if spans and offset - spans[-1]["a_last"] <= COHORT_PASSAGE_GAP:
+                spans[-1]["a_last"] = offset
+                spans[-1]["b"].extend(in_b[h])
+            else:
+                spans.append({"a_start": offset, "a_last": offset, "b": list(in_b[h])})
+
+        out = []
+        for span in spans:
+            a_end = self.fingerprinter.shingle_end(self.texts[a], span["a_last"])
+            b_start, b_last = min(span["b"]), max(span["b"])
+            out.append({
+                "a_start": span["a_start"], "a_end": a_end,
+                "b_start": b_start, "b_end": self.fingerprinter.shingle_end(self.texts[b], b_last),
+                "text": self.texts[a][span["a_start"]:a_end][:COMPACT_SNIPPET_CHARS]
+            })
+        return out
+
+    def verify(self, a, b, shared, semantic):
+        sa = set(self.prints[a]["hash"].tolist()) - self.boilerplate
+        sb = set(self.prints[b]["hash"].tolist()) - self.boilerplate
+        common = len(sa & sb)
+        containment = common / max(1, min(len(sa), len(sb)))
+        jaccard = common / max(1, len(sa | sb))
+        return {
+            "a": self.names[a],
+            "b": self.names[b],
+            "shared_fingerprints": common,
+            "containment": round(containment, 3),
+            "jaccard": round(jaccard, 3),
+            "semantic": round(semantic, 3) if semantic is not None else None,
+            "score": round(max(containment, semantic or 0), 3),
+            "passages": self.passages(a, b) if shared else []
+        }
+
+    def clusters(self, pairs):
+        """Connected components of pairs scoring at least COHORT_CLUSTER_THRESHOLD"""
+        parent = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        edges = [p for p in pairs if p["score"] >= COHORT_CLUSTER_THRESHOLD]
+        for p in edges:
+            parent[find(p["a"])] = find(p["b"])
+
+        groups = {}
+        for name in parent:
+            groups.setdefault(find(name), []).append(name)
+        out = []
+        for members in groups.values():
+            members = sorted(members)
+            member_set = set(members)
+            out.append({
+                "members": members,
+                "edges": [{"a": p["a"], "b": p["b"], "score": p["score"]}
+                          for p in edges if p["a"] in member_set]
+            })
+        return sorted(out, key=lambda c: -len(c["members"]))
+
+    def run(self, paths):
+        t0 = time.perf_counter()
+        self.load(paths)
+
+        candidates = self.fingerprint_candidates()
+        self.log(f"🔗 {len(candidates)} FINGERPRINT CANDIDATE PAIRS")
+        semantic = {}
+        embeddings = self.document_embeddings()
+        if embeddings is not None:
+            semantic = self.semantic_candidates(embeddings)
+            self.log(f"🧠 {len(semantic)} SEMANTIC CANDIDATE PAIRS")
+
+        pairs = []
+        for a, b in set(candidates) | set(semantic):
+            sim = float(embeddings[a] @ embeddings[b]) if embeddings is not None else None
+            pairs.append(self.verify(a, b, candidates.get((a, b), 0), sim))
+        pairs.sort(key=lambda p: -p["score"])
+
+        n = len(self.names)
+        return {
+            "analysis_time": datetime.now().isoformat(),
+            "documents": n,
+            "possible_pairs": n * (n - 1) // 2,
+            "verified_pairs": len(pairs),
+            "seconds": round(time.perf_counter() - t0, 1),
+            "pairs": pairs,
+            "clusters": self.clusters(pairs)
+        }
+
+def run_cohort(paths, workers=COHORT_WORKERS):
+    paths = list(expand_batch_paths(paths))
+    report = CohortAnalyzer(workers).run(paths)
+    fn = f"cohort_report_{int(time.time())}.json"
+    with open(fn, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=json_default)
+    print(f"🏁 {report['documents']} SUBMISSIONS, {report['verified_pairs']} OF {report['possible_pairs']} PAIRS VERIFIED "
+          f"IN {report['seconds']}s, {len(report['clusters'])} CLUSTERS → {fn}")
+    for pair in report["pairs"][:10]:
+        print(f"   {pair['score']:.0%}  {os.path.basename(pair['a'])} ↔ {os.path.basename(pair['b'])}")
+    return report
+
+# ---------------- SERVICE MODE ----------------
+class ServiceJob:
+    """One submitted document; doubles as the detector's gui sink while it runs"""
+    def __init__(self, job_id, path, filename, priority):
+        self.id = job_id
+        self.path = path
+        self.filename = filename
+        self.priority = priority
+        self.state = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.progress = (None, 0)
+        self.originality = None
+        self.events = []
+        self.report = None
+        self.error = None
+        self.cond = threading.Condition()
+
+    def emit(self, kind, **data):
+        with self.cond:
+            self.events.append(dict(data, type=kind, seq=len(self.events)))
+            self.cond.notify_all()
+
+    # Detector callbacks (called from the worker thread)
+    def log_status(self, message):
+        self.emit("log", message=message)
+
+    def update_progress(self, message, value=None):
+        if value is not None:
+            self.progress = (message, value)
+        self.emit("progress", message=message, value=value)
+
+    def update_coverage(self, originality, coverage, sections):
+        self.originality = originality
+        self.emit("coverage", originality=originality, coverage=round(coverage, 3), sections=sections)
+
+    def display_results(self, report):
+        pass  # The report is taken from detect()'s return value
+
+    def done(self):
+        return self.state in ("done", "failed")
+
+    def wait_events(self, start, timeout):
+        """Events after index start, waiting up to timeout for new ones"""
+        with self.cond:
+            if len(self.events) <= start and not self.done():
+                self.cond.wait(timeout)
+            return self.events[start:]
+
+    def status(self, with_report=False):
+        out = {
+            "job_id": self.id,
+            "file": self.filename,
+            "priority": self.priority,
+            "state": self.state,
+            "stage": self.progress[0],
+            "progress": self.progress[1],
+            "originality": self.originality,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "error": self.error
+        }
+        if with_report and self.report is not None:
+            out["report"] = self.report
+        return out
+
+class DetectionService:
+    """Priority job queue served by a fixed pool of warm detector workers.
+
+    Each worker owns one LitePlagiarismDetector for the life of the process, so
+    per-scan state is never shared; models (MODELS), the source limiter and the
+    chart renderer are process-wide and stay loaded between jobs.
+    """
+    def __init__(self, workers=SERVICE_WORKERS, upload_dir=SERVICE_UPLOAD_DIR):
+        self.workers = workers
+        self.upload_dir = upload_dir
+        self.queue = queue.PriorityQueue()
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+        self.running = 0
+        self.completed = 0
+        os.makedirs(upload_dir, exist_ok=True)
+
+    def start(self):
+        MODELS.warm_up(lambda summary, seconds: print(f"🧠 AI MODELS {summary.upper()} ({seconds:.1f}s)"))
+        for i in range(self.workers):
+            threading.Thread(target=self.worker, name=f"detector-{i}", daemon=True).start()
+
+    def submit(self, data, filename, priority=5):
+        """Store an upload and queue it; lower priority numbers run first"""
+        job_id = uuid.uuid4().hex[:12]
+        filename = os.path.basename(filename or "document.txt")
+        job_dir = os.path.join(self.upload_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        path = os.path.join(job_dir, filename)
+        with open(path, "wb") as f:
+            f.write(data)
+
+        job = ServiceJob(job_id, path, filename, priority)
+        with self.lock:
+            self.jobs[job_id] = job
+            self.prune()
+        self.queue.put((priority, next(self.counter), job_id))
+        job.emit("queued", position=self.queue.qsize())
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def prune(self):
+        """Drop the oldest finished jobs beyond SERVICE_KEEP_JOBS (caller holds the lock)"""
+        finished = sorted((j for j in self.jobs.values() if j.done()), key=lambda j: j.finished)
+        for job in finished[:max(0, len(finished) - SERVICE_KEEP_JOBS)]:
+            del self.jobs[job.id]
+            shutil.rmtree(os.path.dirname(job.path), ignore_errors=True)
+
+    def worker(self):
+        detector = LitePlagiarismDetector()
+        while True:
+            _, _, job_id = self.queue.get()
+            job = self.get(job_id)
+            if job is None:
+                continue
+            with self.lock:
+                self.running += 1
+            job.state, job.started = "running", time.time()
+            job.emit("started")
+            detector.gui = job
+            # Reports and charts go next to the upload (and are pruned with it), not into the working directory
+            detector.output_dir = os.path.dirname(job.path)
+            try:
+                report = detector.detect(job.path)
+                if report is None:
+                    raise ValueError("No text could be extracted from the document")
+                report["file"] = job.filename
+                # Round-trip once so every client sees plain JSON types
+                job.report = json.loads(json.dumps(report, default=json_default))
+                job.state = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.state = "failed"
+            finally:
+                detector.gui = None
+                job.finished = time.time()
+                with self.lock:
+                    self.running -= 1
+                    self.completed += 1
+                job.emit(job.state, error=job.error)
+
+    def health(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "running": self.running,
+                "queued": self.queue.qsize(),
+                "completed": self.completed,
+                "models": dict(MODELS.status)
+            }
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """Routes for the local API.
+
+    POST /jobs?filename=paper.pdf&priority=1   raw document bytes, or JSON {"text", "filename", "priority"}
+    GET  /jobs/<id>                            status, plus the report once done
+    GET  /jobs/<id>/events                     progress as Server-Sent Events, ending with done/failed
+    GET  /health                               queue and model state
+    """
+    service = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Job events already cover what the console needs
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = [p for p in urlparse(self.path).path.split("/") if p]
+        if parts == ["health"]:
+            return self.send_json(200, self.service.health())
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.service.get(parts[1])
+            if job is None:
+                return self.send_json(404, {"error": "unknown job"})
+            if len(parts) == 2:
+                return self.send_json(200, job.status(with_report=True))
+            if parts[2] == "events":
+                return self.stream_events(job)
+        self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            return self.send_json(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            return self.send_json(400, {"error": "Content-Length must be an integer"})
+        if length <= 0 or length > SERVICE_MAX_UPLOAD_BYTES:
+            return self.send_json(413 if length > 0 else 400, {"error": f"body must be 1..{SERVICE_MAX_UPLOAD_BYTES} bytes"})
+        body = self.rfile.read(length)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        filename, priority = query.get("filename"), query.get("priority", 5)
+        if (self.headers.get("Content-Type") or "").startswith("application/json"):
+            try:
+                payload = json.loads(body)
+                body = payload["text"].encode("utf-8")
+            except Exception:
+                return self.send_json(400, {"error": "JSON uploads need a \"text\" field"})
+            if not isinstance(payload.get("filename") or "", str):
+                return self.send_json(400, {"error": "filename must be a string"})
+            filename = payload.get("filename") or filename or "document.txt"
+            priority = payload.get("priority", priority)
+            if not filename.lower().endswith(".txt"):
+                filename += ".txt"
+        if not filename:
+            return self.send_json(400, {"error": "raw uploads need ?filename= (.pdf, .docx or .txt)"})
+        filename = os.path.basename(filename.replace("\\", "/").strip())
+        if filename in ("", ".", ".."):
+            return self.send_json(400, {"error": "filename must name a file"})
+        try:
+            priority = int(priority)
+        except (TypeError, ValueError):
+            return self.send_json(400, {"error": "priority must be an integer"})
+
+        job = self.service.submit(body, filename, priority)
+        self.send_json(202, {
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}",
+            "events_url": f"/jobs/{job.id}/events"
+        })
+
+    def stream_events(self, job):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        sent = 0
+        try:
+            while True:
+                events = job.wait_events(sent, SERVICE_KEEPALIVE)
+                if not events:
+                    self.wfile.write(b": keepalive\n\n")
+                for event in events:
+                    data = json.dumps(event, ensure_ascii=False, default=json_default)
+                    self.wfile.write(f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n".encode("utf-8"))
+                sent += len(events)
+                self.wfile.flush()
+                if job.done() and sent >= len(job.events):
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away; the job keeps running
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, workers=SERVICE_WORKERS):
+    service = DetectionService(workers)
+    service.start()
+    handler = type("BoundServiceRequestHandler", (ServiceRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"🛰️ DETECTION SERVICE LISTENING ON http://{host}:{port} ({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        CHART_RENDERER.shutdown()
 
 def main():
+    parser = argparse.ArgumentParser(description="Quantum plagiarism detector")
+    parser.add_argument("--serve", action="store_true", help="run the local HTTP/JSON detection service instead of the GUI")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS)
+    parser.add_argument("--batch", nargs="+", metavar="PATH", help="queue documents or folders in the job store and scan them")
+    parser.add_argument("--resume", action="store_true", help="finish the jobs left in the job store by an earlier run")
+    parser.add_argument("--priority", type=int, default=5, help="batch priority, lower runs first")
+    parser.add_argument("--cohort", nargs="+", metavar="PATH", help="compare a set of submissions (files or folders) with each other")
+    parser.add_argument("--check-embeddings", nargs="*", metavar="BACKEND",
+                        help=f"compare embedding backends with torch on the bundled paraphrase set ({', '.join(EMBEDDING_BACKENDS)})")
+    args = parser.parse_args()
+    if args.check_embeddings is not None:
+        check_embeddings(args.check_embeddings or [EMBEDDING_BACKEND])
+        return
+    if args.cohort:
+        run_cohort(args.cohort)
+        return
+    if args.batch or args.resume:
+        run_batch(args.batch or [], args.workers, args.priority)
+        return
+    if args.serve:
+        serve(args.host, args.port, args.workers)
+        return
+
     try:
         root = tk.Tk()
         app = AdvancedPlagiarismDetectorGUI(root)
         root.mainloop()
+        CHART_RENDERER.shutdown()
     except Exception as e:
         print(f"❌ Application failed to start: {str(e)}")
         print("💡 Please check if all required dependencies are installed:")